@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the extraction API
+Drives /extract-audio-info, /extract-audio (binary and return_url) and /files against
+synthetic media from media_standin.py, at one or more concurrency levels, and reports
+latency percentiles, throughput and the server's CPU and memory use.
+
+Results are written as JSON; pass an earlier file to --compare to see regressions
+between commits:
+
+    python3 benchmark_suite.py --launch --output before.json
+    git checkout my-branch
+    python3 benchmark_suite.py --launch --output after.json --compare before.json
+
+--launch starts the stand-in and a uvicorn server from src/ on this machine. Without it,
+point --base-url/--media-url at a running server started with EXTRA_ALLOWED_URLS covering
+the stand-in (and pass --server-pid to sample its CPU/RSS).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+from media_standin import start_standin
+
+BASE_URL = "http://localhost:8000"  # Change to your server URL
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+SCENARIOS = ('info', 'extract', 'extract_url', 'files')
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def _process_tree(root_pid: int) -> List[int]:
+    """``root_pid`` and all its descendants (extraction workers, ffmpeg), from /proc"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; fields after it are fixed
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    pids, pending = [], [root_pid]
+    while pending:
+        pid = pending.pop()
+        pids.append(pid)
+        pending.extend(children.get(pid, []))
+    return pids
+
+def _read_usage(pid: int):
+    """(CPU seconds, RSS bytes) of one process, or None once it is gone"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{pid}/statm') as f:
+            rss_pages = int(f.read().split()[1])
+    except (OSError, IndexError):
+        return None
+    # utime, stime, cutime, cstime: reaped children (short-lived ffmpeg runs) count too
+    cpu = sum(int(value) for value in fields[11:15]) / CLOCK_TICKS
+    return cpu, rss_pages * os.sysconf('SC_PAGE_SIZE')
+
+class ResourceSampler:
+    """Samples CPU time and RSS of a server process tree while a scenario runs"""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self._cpu: Dict[int, float] = {}
+        self._cpu_start: Dict[int, float] = {}
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = 0
+        for pid in _process_tree(self.pid):
+            usage = _read_usage(pid)
+            if usage is None:
+                continue
+            cpu, pid_rss = usage
+            self._cpu_start.setdefault(pid, cpu)
+            self._cpu[pid] = cpu
+            rss += pid_rss
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        if self.pid and os.path.isdir('/proc'):
+            self._sample()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+
+    def summary(self, elapsed: float) -> Optional[Dict[str, float]]:
+        if not self._thread:
+            return None
+        cpu_seconds = sum(self._cpu[pid] - self._cpu_start[pid] for pid in self._cpu)
+        return {
+            "cpu_seconds": round(cpu_seconds, 2),
+            "cpu_cores": round(cpu_seconds / elapsed, 2) if elapsed else 0.0,
+            "peak_rss_mb": round(self.peak_rss / 1024 / 1024, 1),
+        }
+
+class Runner:
+    """Issues one kind of request per scenario and times it"""
+
+    def __init__(self, base_url: str, media_url: str, media: str, audio_format: str, unique: bool):
+        self.base_url = base_url.rstrip('/')
+        self.media_url = media_url
+        self.media = media
+        self.audio_format = audio_format
+        self.unique = unique
+        self.files_path = None
+        self._local = threading.local()
+
+    def session(self) -> requests.Session:
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def source_url(self) -> str:
+        # A leading path segment gives a new URL (a cache miss) for the same stand-in media
+        prefix = f"{uuid.uuid4().hex[:12]}/" if self.unique else ''
+        return f"{self.media_url}{prefix}{self.media}"
+
+    def prepare(self, scenario: str):
+        """Warm up the stand-in and, for /files, produce a file to download"""
+        response = self.session().post(f"{self.base_url}/extract-audio", json={
+            "url": f"{self.media_url}{self.media}", "format": self.audio_format, "return_url": True
+        }, timeout=600)
+        response.raise_for_status()
+        if scenario == 'files':
+            self.files_path = response.json()['download_url']
+
+    def request(self, scenario: str) -> tuple[float, int, int]:
+        """Run one request and return (seconds, status code, bytes received)"""
+        start = time.perf_counter()
+        if scenario == 'files':
+            response = self.session().get(f"{self.base_url}{self.files_path}", stream=True, timeout=600)
+        elif scenario == 'info':
+            response = self.session().post(f"{self.base_url}/extract-audio-info",
+                                           json={"url": self.source_url()}, stream=True, timeout=600)
+        else:
+            response = self.session().post(f"{self.base_url}/extract-audio", json={
+                "url": self.source_url(), "format": self.audio_format, "return_url": scenario == 'extract_url'
+            }, stream=True, timeout=600)
+        received = 0
+        with response:
+            for chunk in response.iter_content(chunk_size=256 * 1024):
+                received += len(chunk)
+        return time.perf_counter() - start, response.status_code, received
+
+def run_scenario(runner: Runner, scenario: str, concurrency: int, total_requests: int,
+                 server_pid: Optional[int]) -> Dict:
+    print(f"\n⏱️  {scenario}: {total_requests} requests at concurrency {concurrency}")
+
+    def safe_request(_):
+        try:
+            return runner.request(scenario)
+        except requests.RequestException:
+            return 0.0, 0, 0
+
+    with ResourceSampler(server_pid) as sampler:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(safe_request, range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    statuses: Dict[str, int] = {}
+    for _, status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    latencies = sorted(seconds for seconds, status, _ in results if 200 <= status < 300)
+    result = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "ok": len(latencies),
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mb_per_s": round(sum(r[2] for r in results) / elapsed / 1024 / 1024, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        },
+        "server": sampler.summary(elapsed),
+    }
+
+    print(f"   Status codes: {statuses}")
+    print(f"   Requests/s:   {result['requests_per_s']}  ({result['mb_per_s']} MB/s)")
+    print(f"   Latency:      p50 {result['latency_ms']['p50']} ms, p95 {result['latency_ms']['p95']} ms, "
+          f"p99 {result['latency_ms']['p99']} ms")
+    if result['server']:
+        print(f"   Server:       {result['server']['cpu_cores']} cores, peak RSS {result['server']['peak_rss_mb']} MB")
+    return result
+
+def compare(previous: Dict, current: Dict, threshold: float):
+    """Print per-scenario deltas against an earlier run, flagging regressions beyond ``threshold``"""
+    print(f"\n📊 Compared with {previous.get('git_sha', '?')} ({previous.get('started_at', '?')})")
+    if previous.get('config') != current['config']:
+        print(f"   ⚠️  Different settings: {previous.get('config')} vs {current['config']}")
+    earlier = {(r['scenario'], r['concurrency']): r for r in previous.get('results', [])}
+    regressions = 0
+    for result in current['results']:
+        before = earlier.get((result['scenario'], result['concurrency']))
+        if not before:
+            continue
+        checks = [
+            ('p50', before['latency_ms']['p50'], result['latency_ms']['p50'], True),
+            ('p95', before['latency_ms']['p95'], result['latency_ms']['p95'], True),
+            ('p99', before['latency_ms']['p99'], result['latency_ms']['p99'], True),
+            ('req/s', before['requests_per_s'], result['requests_per_s'], False),
+        ]
+        parts = []
+        for label, old, new, lower_is_better in checks:
+            change = (new - old) / old * 100 if old else 0.0
+            worse = change > threshold if lower_is_better else change < -threshold
+            regressions += worse
+            parts.append(f"{label} {old}→{new} ({change:+.0f}%){' ❌' if worse else ''}")
+        print(f"   {result['scenario']} @{result['concurrency']}: " + ', '.join(parts))
+    print(f"   {'❌ ' + str(regressions) + ' regression(s)' if regressions else '✅ No regressions'} "
+          f"beyond {threshold:.0f}%")
+    return regressions
+
+def git_sha() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SRC_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def launch_server(port: int, media_url: str, extra_env: Dict[str, str]) -> subprocess.Popen:
+    """Start uvicorn from src/ allowing the stand-in, and wait until /health answers"""
+    host_path = media_url.split('://', 1)[1]
+    env = {
+        **os.environ,
+        'EXTRA_ALLOWED_URLS': host_path,
+        'RATE_LIMIT_ENABLED': 'false',
+        # Leave the stand-in unpaced; real platforms keep their limits
+        'UPSTREAM_RATE_LIMITS': ','.join(filter(None, [os.getenv('UPSTREAM_RATE_LIMITS'), f"{host_path.split(':')[0]}=0"])),
+        **extra_env,
+    }
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port)],
+        cwd=SRC_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with {server.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=2).ok:
+                return server
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("Server did not become healthy within 60s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--media-url', help="Stand-in /media/ URL (default: start one in this process)")
+    parser.add_argument('--launch', action='store_true', help="Start the API from src/ for the run")
+    parser.add_argument('--port', type=int, default=8077, help="Port for --launch")
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help="Extra environment for --launch (repeatable)")
+    parser.add_argument('--server-pid', type=int, help="Sample CPU/RSS of this process tree")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--concurrency', default='1,4,16', help="Comma-separated concurrency levels")
+    parser.add_argument('--requests', type=int, default=50, help="Requests per scenario and level")
+    parser.add_argument('--media', default='60s-aac.m4a', help="Stand-in media name, e.g. 300s-opus.webm")
+    parser.add_argument('--format', default='mp3', help="Requested audio format")
+    parser.add_argument('--unique', action='store_true',
+                        help="Use a new URL per request so every extraction misses the audio cache")
+    parser.add_argument('--output', help="JSON results file (default: benchmark-<git sha>.json)")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    print("🚀 Extraction API Benchmark Suite")
+    print("=" * 60)
+
+    standin = None
+    media_url = args.media_url
+    if not media_url:
+        standin, media_url = start_standin(port=0)
+        print(f"🎞️  Stand-in media at {media_url}")
+
+    server = None
+    base_url, server_pid = args.base_url, args.server_pid
+    if args.launch:
+        extra_env = dict(item.split('=', 1) for item in args.env)
+        server = launch_server(args.port, media_url, extra_env)
+        base_url, server_pid = f"http://127.0.0.1:{args.port}", server.pid
+        print(f"🖥️  Launched API at {base_url} (pid {server.pid})")
+
+    report = {
+        "git_sha": git_sha(),
+        "started_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "host": {"python": platform.python_version(), "cpus": os.cpu_count(), "machine": platform.machine()},
+        "config": {"media": args.media, "format": args.format, "unique": args.unique,
+                   "requests": args.requests, "env": args.env},
+        "results": [],
+    }
+    try:
+        runner = Runner(base_url, media_url, args.media, args.format, args.unique)
+        for scenario in (s.strip() for s in args.scenarios.split(',')):
+            if scenario not in SCENARIOS:
+                print(f"❌ Unknown scenario {scenario}")
+                continue
+            runner.prepare(scenario)
+            for concurrency in (int(c) for c in args.concurrency.split(',')):
+                report['results'].append(run_scenario(runner, scenario, concurrency, args.requests, server_pid))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+        if standin:
+            standin.shutdown()
+
+    output = args.output or f"benchmark-{report['git_sha'] or 'unknown'}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
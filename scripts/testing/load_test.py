@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generator for the extraction API
+Sends a weighted mix of info, binary extract, return_url extract and /files requests at a
+target arrival rate, whether or not earlier requests have finished, and reports latency
+percentiles corrected for coordinated omission, errors by status and the saturation point.
+
+Latency is measured from when a request was *scheduled* to be sent, so time spent queued
+behind a slow server (or a saturated client) counts; the uncorrected service time is
+reported alongside it.
+
+    # One rate for 60 s against a running server
+    python3 load_test.py --base-url http://localhost:8000 --media-url http://127.0.0.1:8765/media/ --rate 20
+
+    # Step through rates to find where the server saturates, with its own stand-in and server
+    python3 load_test.py --launch --rates 5,10,20,40,80 --duration 30 --mix info=2,extract_url=1,files=4
+
+Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from benchmark_suite import git_sha, launch_server
+from media_standin import start_standin
+
+BASE_URL = "http://localhost:8000"  # Change to your server URL
+OPERATIONS = ('info', 'extract', 'extract_url', 'files', 'files_range', 'files_conditional')
+DEFAULT_MIX = 'info=3,extract=1,extract_url=2,files=4'
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (about 1% relative error), in the spirit of HdrHistogram"""
+
+    GROWTH = 1.01
+    MIN_SECONDS = 1e-4
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        index = max(0, int(math.log(max(seconds, self.MIN_SECONDS) / self.MIN_SECONDS, self.GROWTH)))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: 'LatencyHistogram'):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the ``pct``th percentile, in seconds"""
+        if not self.total:
+            return 0.0
+        target = max(1, math.ceil(pct / 100 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self.MIN_SECONDS * self.GROWTH ** (index + 1), self.max)
+        return self.max
+
+    def summary_ms(self) -> Dict[str, float]:
+        summary = {f"p{pct:g}": round(self.percentile(pct) * 1000, 1) for pct in (50, 90, 99, 99.9)}
+        summary['max'] = round(self.max * 1000, 1)
+        return summary
+
+class OperationStats:
+    """Outcomes of one kind of request during a run"""
+
+    def __init__(self):
+        self.corrected = LatencyHistogram()
+        self.service = LatencyHistogram()
+        self.statuses: Dict[str, int] = {}
+        self.ok = 0
+        self.bytes = 0
+
+    def record(self, status: str, scheduled: float, sent: float, finished: float, received: int):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.bytes += received
+        if status.startswith('2') or status == '304':
+            self.ok += 1
+            self.corrected.record(finished - scheduled)
+            self.service.record(finished - sent)
+
+class LoadGenerator:
+    """Fires requests at scheduled arrival times without waiting for earlier ones"""
+
+    def __init__(self, client: httpx.AsyncClient, media_url: str, media: str, audio_format: str,
+                 mix: Dict[str, float], unique_fraction: float, max_inflight: int):
+        self.client = client
+        self.media_url = media_url
+        self.media = media
+        self.audio_format = audio_format
+        self.operations = list(mix)
+        self.weights = [mix[op] for op in self.operations]
+        self.unique_fraction = unique_fraction
+        self.max_inflight = max_inflight
+        self.files_path = None
+        self.file_size = 0
+        self.etag = ''
+        self.inflight = 0
+        self.peak_inflight = 0
+
+    async def prepare(self):
+        """Warm the stand-in and publish a file for the /files operations"""
+        response = await self.client.post('/extract-audio', json={
+            "url": f"{self.media_url}{self.media}", "format": self.audio_format, "return_url": True
+        }, timeout=600)
+        response.raise_for_status()
+        self.files_path = response.json()['download_url']
+        head = await self.client.head(self.files_path)
+        self.file_size = int(head.headers.get('content-length', 0))
+        self.etag = head.headers.get('etag', '')
+
+    def source_url(self) -> str:
+        # A leading path segment gives a new URL (a cache miss) for the same stand-in media
+        if random.random() < self.unique_fraction:
+            return f"{self.media_url}{uuid.uuid4().hex[:12]}/{self.media}"
+        return f"{self.media_url}{self.media}"
+
+    async def _send(self, operation: str) -> Tuple[str, int]:
+        if operation == 'info':
+            request = self.client.build_request('POST', '/extract-audio-info', json={"url": self.source_url()})
+        elif operation in ('extract', 'extract_url'):
+            request = self.client.build_request('POST', '/extract-audio', json={
+                "url": self.source_url(), "format": self.audio_format, "return_url": operation == 'extract_url'
+            })
+        else:
+            headers = {}
+            if operation == 'files_range' and self.file_size > 1:
+                # Resume-style request from somewhere in the first half
+                headers['Range'] = f"bytes={random.randrange(self.file_size // 2)}-"
+            elif operation == 'files_conditional':
+                headers['If-None-Match'] = self.etag
+            request = self.client.build_request('GET', self.files_path, headers=headers)
+        response = await self.client.send(request, stream=True)
+        received = 0
+        try:
+            async for chunk in response.aiter_raw():
+                received += len(chunk)
+        finally:
+            await response.aclose()
+        return str(response.status_code), received
+
+    async def _fire(self, operation: str, scheduled: float, stats: Dict[str, OperationStats]):
+        if self.inflight >= self.max_inflight:
+            # Open loop: never wait for a slot, count the arrival as shed by the client
+            stats[operation].record('client_overload', scheduled, scheduled, scheduled, 0)
+            return
+        self.inflight += 1
+        self.peak_inflight = max(self.peak_inflight, self.inflight)
+        sent = time.perf_counter()
+        try:
+            status, received = await self._send(operation)
+        except httpx.TimeoutException:
+            status, received = 'timeout', 0
+        except httpx.HTTPError as e:
+            status, received = type(e).__name__, 0
+        finally:
+            self.inflight -= 1
+        stats[operation].record(status, scheduled, sent, time.perf_counter(), received)
+
+    async def run(self, rate: float, duration: float, arrivals: str) -> Dict:
+        """Offer ``rate`` requests/s for ``duration`` seconds and summarise the outcome"""
+        stats = {op: OperationStats() for op in self.operations}
+        tasks = []
+        self.peak_inflight = 0
+        start = time.perf_counter()
+        scheduled = start
+        max_lag = 0.0
+        while True:
+            gap = random.expovariate(rate) if arrivals == 'poisson' else 1 / rate
+            scheduled += gap
+            if scheduled - start >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # The generator itself fell behind; latency is still counted from ``scheduled``
+                max_lag = max(max_lag, -delay)
+            operation = random.choices(self.operations, self.weights)[0]
+            tasks.append(asyncio.create_task(self._fire(operation, scheduled, stats)))
+        sent_for = time.perf_counter() - start
+        await asyncio.gather(*tasks)
+        drained_for = time.perf_counter() - start
+
+        total = OperationStats()
+        for op_stats in stats.values():
+            total.corrected.merge(op_stats.corrected)
+            total.service.merge(op_stats.service)
+            total.ok += op_stats.ok
+            total.bytes += op_stats.bytes
+            for status, count in op_stats.statuses.items():
+                total.statuses[status] = total.statuses.get(status, 0) + count
+        return {
+            "offered_rate": rate,
+            "requests": len(tasks),
+            "achieved_rate": round(total.ok / drained_for, 2) if drained_for else 0.0,
+            "error_rate": round(1 - total.ok / len(tasks), 4) if tasks else 0.0,
+            "duration_s": round(sent_for, 2),
+            "drain_s": round(drained_for - sent_for, 2),
+            "peak_inflight": self.peak_inflight,
+            "generator_max_lag_ms": round(max_lag * 1000, 1),
+            "mb_per_s": round(total.bytes / drained_for / 1024 / 1024, 2) if drained_for else 0.0,
+            "latency_ms": total.corrected.summary_ms(),
+            "service_ms": total.service.summary_ms(),
+            "statuses": total.statuses,
+            "operations": {
+                op: {
+                    "requests": sum(s.statuses.values()),
+                    "ok": s.ok,
+                    "statuses": s.statuses,
+                    "latency_ms": s.corrected.summary_ms(),
+                    "service_ms": s.service.summary_ms(),
+                }
+                for op, s in stats.items()
+            },
+        }
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse "info=3,files=4" into {operation: weight}"""
+    mix = {}
+    for item in spec.split(','):
+        operation, _, weight = item.partition('=')
+        operation = operation.strip()
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation {operation!r} (expected one of {', '.join(OPERATIONS)})")
+        mix[operation] = float(weight) if weight else 1.0
+    return {op: weight for op, weight in mix.items() if weight > 0}
+
+def is_saturated(result: Dict, slo_ms: float, max_error_rate: float) -> Optional[str]:
+    """Why a rate step counts as past saturation, or None"""
+    if result['error_rate'] > max_error_rate:
+        return f"error rate {result['error_rate']:.1%}"
+    if result['latency_ms']['p99'] > slo_ms:
+        return f"p99 {result['latency_ms']['p99']} ms > {slo_ms:g} ms"
+    if result['achieved_rate'] < 0.9 * result['offered_rate'] * (1 - result['error_rate']):
+        return f"achieved {result['achieved_rate']}/s of {result['offered_rate']:g}/s"
+    return None
+
+def print_step(result: Dict):
+    latency, service = result['latency_ms'], result['service_ms']
+    print(f"   Requests:     {result['requests']} ({result['achieved_rate']}/s ok, "
+          f"{result['error_rate']:.1%} errors, peak in flight {result['peak_inflight']})")
+    print(f"   Statuses:     {result['statuses']}")
+    print(f"   Latency:      p50 {latency['p50']} ms, p90 {latency['p90']} ms, p99 {latency['p99']} ms, "
+          f"p99.9 {latency['p99.9']} ms, max {latency['max']} ms")
+    print(f"   Service time: p50 {service['p50']} ms, p99 {service['p99']} ms (uncorrected)")
+    for operation, op in result['operations'].items():
+        print(f"     {operation:<17} {op['requests']:>5} sent, {op['ok']:>5} ok, "
+              f"p50 {op['latency_ms']['p50']} ms, p99 {op['latency_ms']['p99']} ms, {op['statuses']}")
+    if result['generator_max_lag_ms'] > 50:
+        print(f"   ⚠️  Generator fell up to {result['generator_max_lag_ms']} ms behind schedule")
+
+async def run_load(args, base_url: str, media_url: str) -> Dict:
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+    timeout = httpx.Timeout(args.timeout, pool=None)
+    report = {
+        "git_sha": git_sha(),
+        "started_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "config": {"mix": mix, "media": args.media, "format": args.format, "arrivals": args.arrivals,
+                   "unique_fraction": args.unique_fraction, "duration": args.duration,
+                   "slo_ms": args.slo_ms, "max_error_rate": args.max_error_rate},
+        "steps": [],
+        "saturation": None,
+    }
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        generator = LoadGenerator(client, media_url, args.media, args.format, mix,
+                                  args.unique_fraction, args.max_inflight)
+        await generator.prepare()
+        rates = [float(rate) for rate in args.rates.split(',')] if args.rates else [args.rate]
+        for rate in rates:
+            print(f"\n🔥 {rate:g} requests/s for {args.duration:g}s ({args.arrivals} arrivals)")
+            result = await generator.run(rate, args.duration, args.arrivals)
+            print_step(result)
+            reason = is_saturated(result, args.slo_ms, args.max_error_rate)
+            result['saturated'] = reason
+            report['steps'].append(result)
+            if reason:
+                print(f"   🧱 Saturated: {reason}")
+                if report['saturation'] is None:
+                    sustained = [step['offered_rate'] for step in report['steps'] if not step['saturated']]
+                    report['saturation'] = {"offered_rate": rate, "reason": reason,
+                                            "max_sustained_rate": max(sustained) if sustained else None}
+                if not args.keep_going:
+                    break
+            if args.pause:
+                await asyncio.sleep(args.pause)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--media-url', help="Stand-in /media/ URL (default: start one in this process)")
+    parser.add_argument('--launch', action='store_true', help="Start the API from src/ for the run")
+    parser.add_argument('--port', type=int, default=8077, help="Port for --launch")
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help="Extra environment for --launch (repeatable)")
+    parser.add_argument('--rate', type=float, default=10.0, help="Arrival rate in requests/s")
+    parser.add_argument('--rates', help="Comma-separated rates to step through (overrides --rate)")
+    parser.add_argument('--duration', type=float, default=60.0, help="Seconds per rate")
+    parser.add_argument('--pause', type=float, default=2.0, help="Seconds between rate steps")
+    parser.add_argument('--arrivals', choices=('poisson', 'uniform'), default='poisson')
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help=f"Weighted operations from {', '.join(OPERATIONS)} (default: {DEFAULT_MIX})")
+    parser.add_argument('--media', default='60s-aac.m4a', help="Stand-in media name, e.g. 300s-opus.webm")
+    parser.add_argument('--format', default='mp3', help="Requested audio format")
+    parser.add_argument('--unique-fraction', type=float, default=0.0,
+                        help="Share of extractions sent to a new URL (audio cache miss)")
+    parser.add_argument('--max-inflight', type=int, default=256,
+                        help="Connections; arrivals beyond this are shed as client_overload")
+    parser.add_argument('--timeout', type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument('--slo-ms', type=float, default=10000.0, help="p99 above this counts as saturated")
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help="Error rate that counts as saturated")
+    parser.add_argument('--keep-going', action='store_true', help="Keep stepping after saturation")
+    parser.add_argument('--output', help="Write the report as JSON")
+    args = parser.parse_args()
+
+    print("🚀 Open-Loop Load Test")
+    print("=" * 60)
+
+    standin = None
+    media_url = args.media_url
+    if not media_url:
+        standin, media_url = start_standin(port=0)
+        print(f"🎞️  Stand-in media at {media_url}")
+
+    server = None
+    base_url = args.base_url
+    if args.launch:
+        server = launch_server(args.port, media_url, dict(item.split('=', 1) for item in args.env))
+        base_url = f"http://127.0.0.1:{args.port}"
+        print(f"🖥️  Launched API at {base_url} (pid {server.pid})")
+
+    try:
+        report = asyncio.run(run_load(args, base_url, media_url))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+        if standin:
+            standin.shutdown()
+
+    saturation = report['saturation']
+    if saturation:
+        print(f"\n🧱 Saturation at {saturation['offered_rate']:g} requests/s ({saturation['reason']}); "
+              f"highest sustained rate: {saturation['max_sustained_rate']}")
+    else:
+        print("\n✅ No saturation at the rates tested")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to {args.output}")
+
+if __name__ == "__main__":
+    sys.exit(main())
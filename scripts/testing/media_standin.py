@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Local media stand-in for offline benchmarks
+Serves synthetic media generated with ffmpeg lavfi, extracted by yt-dlp's generic extractor
+
+Media URLs look like /media/[<anything>/]<duration>s-<audio codec>[-<video codec>].<ext>:
+    /media/30s-aac.m4a            30 s AAC in MP4
+    /media/run7/42/120s-opus.webm 120 s Opus in WebM (leading segments are ignored)
+    /media/10s-aac-h264.mp4       10 s AAC + H.264 video
+Segments before the file name make URLs unique (audio cache misses) without new media.
+
+Point the API at it with EXTRA_ALLOWED_URLS=127.0.0.1:8765/media/ (and ideally
+UPSTREAM_RATE_LIMITS=127.0.0.1=0 so the upstream pacer does not throttle the stand-in).
+"""
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Tuple
+
+SPEC_RE = re.compile(r'^(\d+)s-([a-z0-9]+)(?:-([a-z0-9]+))?\.([a-z0-9]+)$')
+
+AUDIO_CODECS = {
+    'aac': ['-c:a', 'aac', '-b:a', '128k'],
+    'opus': ['-c:a', 'libopus', '-b:a', '96k'],
+    'mp3': ['-c:a', 'libmp3lame', '-b:a', '128k'],
+    'vorbis': ['-c:a', 'libvorbis', '-q:a', '4'],
+    'flac': ['-c:a', 'flac'],
+    'pcm': ['-c:a', 'pcm_s16le'],
+}
+
+VIDEO_CODECS = {
+    'h264': ['-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p'],
+    'vp9': ['-c:v', 'libvpx-vp9', '-deadline', 'realtime', '-cpu-used', '8'],
+}
+
+CONTENT_TYPES = {
+    'm4a': 'audio/mp4',
+    'mp4': 'video/mp4',
+    'webm': 'video/webm',
+    'mkv': 'video/x-matroska',
+    'mp3': 'audio/mpeg',
+    'ogg': 'audio/ogg',
+    'flac': 'audio/flac',
+    'wav': 'audio/wav',
+}
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def parse_spec(name: str) -> Optional[Tuple[int, str, Optional[str], str]]:
+    """Parse "30s-aac-h264.mp4" into (30, 'aac', 'h264', 'mp4'), or None"""
+    match = SPEC_RE.match(name)
+    if not match:
+        return None
+    duration, audio_codec, video_codec, ext = match.groups()
+    if audio_codec not in AUDIO_CODECS or (video_codec and video_codec not in VIDEO_CODECS):
+        return None
+    if ext not in CONTENT_TYPES or not 0 < int(duration) <= 3600:
+        return None
+    return int(duration), audio_codec, video_codec, ext
+
+class MediaLibrary:
+    """Synthetic media files generated on first use and kept in ``cache_dir``"""
+
+    def __init__(self, cache_dir: str, ffmpeg: str = 'ffmpeg'):
+        self.cache_dir = cache_dir
+        self.ffmpeg = ffmpeg
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._locks = {}
+
+    def path_for(self, name: str) -> Optional[str]:
+        """Path of the media file for a spec name, generating it if needed"""
+        spec = parse_spec(name)
+        if spec is None:
+            return None
+        path = os.path.join(self.cache_dir, name)
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if not os.path.exists(path):
+                self._generate(spec, path)
+        return path
+
+    def _generate(self, spec: Tuple[int, str, Optional[str], str], path: str):
+        duration, audio_codec, video_codec, ext = spec
+        # A sweep plus some noise, so encoders have real work to do
+        cmd = [self.ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+               '-f', 'lavfi', '-i', f"sine=frequency=220:beep_factor=4:duration={duration}:sample_rate=48000",
+               '-f', 'lavfi', '-i', f"anoisesrc=color=pink:amplitude=0.05:duration={duration}:sample_rate=48000"]
+        if video_codec:
+            cmd += ['-f', 'lavfi', '-i', f"testsrc2=size=640x360:rate=30:duration={duration}"]
+        cmd += ['-filter_complex', '[0:a][1:a]amix=inputs=2[a]', '-map', '[a]']
+        if video_codec:
+            cmd += ['-map', '2:v'] + VIDEO_CODECS[video_codec]
+        cmd += AUDIO_CODECS[audio_codec] + ['-ac', '2']
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.gen-', suffix=f'.{ext}')
+        os.close(fd)
+        try:
+            subprocess.run(cmd + [tmp_path], check=True, capture_output=True, timeout=600)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+class MediaHandler(BaseHTTPRequestHandler):
+    """GET/HEAD for /media/... with single byte-range support"""
+
+    library: MediaLibrary = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # Probing clients hang up once they have seen enough, even on idle keep-alive connections
+            pass
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body: bool):
+        path = self.path.split('?', 1)[0]
+        if not path.startswith('/media/'):
+            self._send_error(404)
+            return
+        try:
+            file_path = self.library.path_for(os.path.basename(path))
+        except (subprocess.SubprocessError, OSError) as e:
+            self._send_error(500, str(e))
+            return
+        if file_path is None:
+            self._send_error(404)
+            return
+
+        size = os.path.getsize(file_path)
+        start, end = 0, size - 1
+        status = 200
+        match = RANGE_RE.match(self.headers.get('Range', ''))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                start = max(0, size - int(match.group(2)))
+            if start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{size}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header('Content-Type', CONTENT_TYPES[os.path.splitext(file_path)[1].lstrip('.')])
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if not send_body:
+            return
+
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(256 * 1024, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def _send_error(self, status: int, message: str = ''):
+        body = message.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_standin(host: str = '127.0.0.1', port: int = 8765, cache_dir: Optional[str] = None) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stand-in on a background thread; returns (server, base URL of /media/)"""
+    if not shutil.which('ffmpeg'):
+        raise RuntimeError("ffmpeg is required to generate stand-in media")
+    library = MediaLibrary(cache_dir or os.path.join(tempfile.gettempdir(), 'media_standin'))
+    handler = type('BoundMediaHandler', (MediaHandler,), {'library': library})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/media/"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cache-dir', help="Where generated media is kept (default: <tmp>/media_standin)")
+    parser.add_argument('--pregenerate', default='', help="Comma-separated media names to generate up front")
+    args = parser.parse_args()
+
+    server, media_url = start_standin(args.host, args.port, args.cache_dir)
+    for name in filter(None, (name.strip() for name in args.pregenerate.split(','))):
+        server.RequestHandlerClass.library.path_for(name)
+    print(f"🎞️  Serving synthetic media at {media_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -160,58 +160,6 @@ def test_video_extraction_with_cookies():
         print(f"   ❌ Audio extraction connection error: {e}")
         return False
 
-def test_high_volume_simulation():
-    """Simulate high-volume requests like from n8n"""
-    print("\n🚀 Testing high-volume simulation (n8n scenario)...")
-    
-    test_urls = [
-        "https://www.youtube.com/shorts/dQw4w9WgXcQ",
-        "https://youtu.be/dQw4w9WgXcQ",
-        # Add more test URLs if available
-    ]
-    
-    results = []
-    
-    for i, url in enumerate(test_urls, 1):
-        print(f"\n   Request {i}/{len(test_urls)}: {url}")
-        
-        payload = {
-            "url": url,
-            "format": "mp3",
-            "quality": "192",
-            "return_url": True
-        }
-        
-        try:
-            start_time = time.time()
-            response = requests.post(f"{BASE_URL}/extract-audio-info", json=payload, timeout=30)
-            processing_time = time.time() - start_time
-            
-            if response.status_code == 200:
-                data = response.json()
-                success = data.get('success', False)
-                print(f"      ✅ Success in {processing_time:.2f}s")
-                results.append({"url": url, "success": True, "time": processing_time})
-            else:
-                print(f"      ❌ Failed: {response.status_code}")
-                results.append({"url": url, "success": False, "time": processing_time})
-                
-        except Exception as e:
-            print(f"      ❌ Error: {e}")
-            results.append({"url": url, "success": False, "time": 0})
-        
-        # Small delay to not overwhelm the server
-        time.sleep(1)
-    
-    # Summary
-    successful = sum(1 for r in results if r["success"])
-    avg_time = sum(r["time"] for r in results if r["success"]) / max(successful, 1)
-    
-    print(f"\n   📊 Summary: {successful}/{len(results)} successful")
-    print(f"   ⏱️  Average processing time: {avg_time:.2f} seconds")
-    
-    return successful == len(results)
-
 def main():
     """Run all cookie management tests"""
     print("🧪 Cookie Management System Test Suite")
@@ -237,7 +185,6 @@ def main():
         ("Cookie Status", test_cookie_status),
         ("Cookie Refresh", test_cookie_refresh),
         ("Video Extraction", test_video_extraction_with_cookies),
-        ("High Volume Simulation", test_high_volume_simulation),
     ]
     
     results = []
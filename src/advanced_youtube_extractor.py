@@ -7,15 +7,79 @@ import os
 import random
 import time
 import json
-from typing import Optional, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, Dict, Any, Callable, List, Tuple
 
 import yt_dlp
 
+from cookie_manager import get_cookie_manager
+from metadata_cache import get_metadata_cache
+from metrics import count_strategy_outcome, time_stage
+from upstream_pacer import PacedYoutubeDL, DeadlineExceeded
+from ydl_options import apply_deadline
+from strategy_stats import get_strategy_stats
+from video_keys import get_video_key
+
+class _Race:
+    """Shared state of one hedged strategy race"""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._instances = set()
+
+    def register(self, ydl: yt_dlp.YoutubeDL) -> bool:
+        """Track a running attempt; returns False if the race is already over"""
+        with self._lock:
+            if self.cancelled.is_set():
+                return False
+            self._instances.add(ydl)
+            return True
+
+    def unregister(self, ydl: yt_dlp.YoutubeDL):
+        with self._lock:
+            self._instances.discard(ydl)
+
+    def cancel(self):
+        """Stop the losing attempts by closing their network handlers"""
+        with self._lock:
+            self.cancelled.set()
+            instances = list(self._instances)
+        for ydl in instances:
+            try:
+                ydl.close()
+            except Exception:
+                pass
+
 class AdvancedYouTubeExtractor:
-    """Advanced YouTube extractor with multiple fallback strategies"""
+    """Advanced YouTube extractor with multiple fallback strategies
+
+    By default the strategies are raced: the first one starts immediately
+    and, if it has not succeeded after ``hedge_delay`` seconds (or as soon
+    as it fails), the next one is started alongside it, with at most
+    ``max_concurrency`` attempts in flight. The first success wins and the
+    remaining attempts are cancelled. ``race=False`` restores the original
+    one-at-a-time behaviour.
+
+    The order (and whether a strategy is tried at all) is learned per
+    platform from recent outcomes, see ``strategy_stats.StrategyStats``.
+    Upstream requests are paced by the shared upstream pacer and stop once
+    ``deadline`` (a ``time.time()`` timestamp) has passed. Unless a fixed
+    ``cookies_path`` is given, every attempt leases the healthiest jar from
+    the cookie manager's pool and reports back how it went.
+    """
     
-    def __init__(self, cookies_path: str = None):
-        self.cookies_path = cookies_path or 'cookies.txt'
+    def __init__(self, cookies_path: str = None, race: Optional[bool] = None,
+                 hedge_delay: Optional[float] = None, max_concurrency: Optional[int] = None,
+                 deadline: Optional[float] = None):
+        self.cookies_path = cookies_path
+        self.deadline = deadline
+        self.race = race if race is not None else os.getenv('STRATEGY_RACE', 'true').lower() == 'true'
+        self.hedge_delay = hedge_delay if hedge_delay is not None else float(os.getenv('STRATEGY_HEDGE_DELAY_SECONDS', '3'))
+        self.max_concurrency = max(1, max_concurrency if max_concurrency is not None
+                                   else int(os.getenv('STRATEGY_MAX_CONCURRENCY', '2')))
+        self._local = threading.local()
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -36,14 +100,13 @@ class AdvancedYouTubeExtractor:
             'user_agent': random.choice(self.user_agents),
             'referer': 'https://www.youtube.com/',
             'origin': 'https://www.youtube.com',
-            'sleep_interval': random.uniform(1, 3),
-            'max_sleep_interval': random.uniform(5, 8),
             'socket_timeout': 60,
             'retries': 2,
         }
+        apply_deadline(opts, self.deadline)
         
-        # Add cookies if available
-        if os.path.exists(self.cookies_path):
+        # Add cookies if available (pooled cookies are added per attempt)
+        if self.cookies_path and os.path.exists(self.cookies_path):
             opts['cookiefile'] = self.cookies_path
         
         return opts
@@ -153,53 +216,171 @@ class AdvancedYouTubeExtractor:
             'no_warnings': True,
             'user_agent': random.choice(self.user_agents),
         }
+        apply_deadline(opts, self.deadline)
         
         # Only add cookies if they exist
-        if os.path.exists(self.cookies_path):
+        if self.cookies_path and os.path.exists(self.cookies_path):
             opts['cookiefile'] = self.cookies_path
         
         return self._try_extract(url, opts)
     
     def _try_extract(self, url: str, opts: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Try to extract with given options"""
+        if self.cookies_path:
+            return self._try_extract_with(url, opts, None)
+        
+        with get_cookie_manager().lease(url) as cookie_lease:
+            if cookie_lease.path:
+                opts['cookiefile'] = cookie_lease.path
+                opts['cookie_jar'] = cookie_lease.cookies
+            return self._try_extract_with(url, opts, cookie_lease)
+    
+    def _try_extract_with(self, url: str, opts: Dict[str, Any], cookie_lease) -> Optional[Dict[str, Any]]:
+        race = getattr(self._local, 'race', None)
         try:
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                info = ydl.extract_info(url, download=False)
+            with PacedYoutubeDL(opts) as ydl:
+                if race and not race.register(ydl):
+                    if cookie_lease:
+                        cookie_lease.discard()
+                    return None
+                try:
+                    info = ydl.extract_info(url, download=False)
+                finally:
+                    if race:
+                        race.unregister(ydl)
                 return info
+        except DeadlineExceeded:
+            if cookie_lease:
+                cookie_lease.discard()
+            raise
         except Exception as e:
-            print(f"   ❌ Failed: {str(e)[:100]}...")
+            if race and race.cancelled.is_set():
+                if cookie_lease:
+                    cookie_lease.discard()
+            else:
+                print(f"   ❌ Failed: {str(e)[:100]}...")
+                if cookie_lease:
+                    cookie_lease.report_error(str(e))
             return None
     
+    def _strategies(self, platform: str) -> List[Tuple[str, Callable[[str], Optional[Dict[str, Any]]]]]:
+        """Strategies in the order they should be attempted, best first according to recent outcomes"""
+        strategies = {
+            'web': self.strategy_1_web_client,
+            'android': self.strategy_2_android_client,
+            'ios': self.strategy_3_ios_client,
+            'tv': self.strategy_4_tv_client,
+            'embedded': self.strategy_5_embedded_client,
+            'minimal': self.strategy_6_minimal_client,
+        }
+        order = get_strategy_stats().order(platform, list(strategies))
+        return [(name, strategies[name]) for name in order]
+    
+    def _run_attempt(self, race: Optional[_Race], name: str, strategy: Callable[[str], Optional[Dict[str, Any]]],
+                     url: str, platform: str) -> Optional[Dict[str, Any]]:
+        """Run one strategy and feed its outcome into the strategy stats and metrics"""
+        if race and race.cancelled.is_set():
+            return None
+        self._local.race = race
+        started_at = time.monotonic()
+        result = None
+        out_of_time = False
+        try:
+            result = strategy(url)
+            return result
+        except DeadlineExceeded:
+            out_of_time = True
+            raise
+        finally:
+            self._local.race = None
+            cancelled = bool(race and race.cancelled.is_set())
+            # Attempts cut short because another strategy won (or time ran out) say nothing about this one
+            if result or not (out_of_time or cancelled):
+                get_strategy_stats().record(platform, name, bool(result), time.monotonic() - started_at)
+            outcome = 'success' if result else 'deadline' if out_of_time else 'cancelled' if cancelled else 'failure'
+            count_strategy_outcome(platform, name, outcome)
+    
+    def _race_strategies(self, url: str, platform: str,
+                         strategies: List[Tuple[str, Callable]]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Run strategies as hedged attempts; returns (name, info) of the first success"""
+        race = _Race()
+        pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='strategy')
+        pending = {}
+        remaining = list(strategies)
+
+        def launch():
+            name, strategy = remaining.pop(0)
+            pending[pool.submit(self._run_attempt, race, name, strategy, url, platform)] = name
+
+        try:
+            launch()
+            while pending:
+                can_hedge = remaining and len(pending) < self.max_concurrency
+                done, _ = wait(pending, timeout=self.hedge_delay if can_hedge else None,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except DeadlineExceeded:
+                        raise
+                    except Exception as e:
+                        print(f"   ❌ Strategy {name} failed: {str(e)[:100]}...")
+                        result = None
+                    if result:
+                        return name, result
+
+                # Either an attempt failed or the hedge delay expired
+                if remaining and len(pending) < self.max_concurrency:
+                    if not done:
+                        print(f"   ⏱️  No answer after {self.hedge_delay:.1f}s, hedging with the next strategy...")
+                    launch()
+            return None
+        finally:
+            race.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _sequential_strategies(self, url: str, platform: str,
+                               strategies: List[Tuple[str, Callable]]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Run strategies one after another; returns (name, info) of the first success"""
+        for name, strategy in strategies:
+            try:
+                result = self._run_attempt(None, name, strategy, url, platform)
+                if result:
+                    return name, result
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                print(f"   ❌ Strategy {name} failed: {str(e)[:100]}...")
+                continue
+        return None
+    
+    @time_stage('fallback')
     def extract_info(self, url: str) -> Optional[Dict[str, Any]]:
         """Extract video info using multiple strategies"""
         print(f"\n🎯 Extracting info for: {url}")
         print("=" * 60)
         
-        strategies = [
-            self.strategy_1_web_client,
-            self.strategy_2_android_client,
-            self.strategy_3_ios_client,
-            self.strategy_4_tv_client,
-            self.strategy_5_embedded_client,
-            self.strategy_6_minimal_client,
-        ]
+        metadata_cache = get_metadata_cache()
+        cached_info = metadata_cache.get(url, require_formats=True)
+        if cached_info:
+            print("✅ Using cached info (stream URLs still valid)")
+            return cached_info
         
-        for i, strategy in enumerate(strategies, 1):
-            try:
-                result = strategy(url)
-                if result:
-                    print(f"✅ SUCCESS with Strategy {i}!")
-                    return result
-                
-                # Add delay between strategies to avoid rate limiting
-                if i < len(strategies):
-                    delay = random.uniform(2, 5)
-                    print(f"   ⏱️  Waiting {delay:.1f}s before next strategy...")
-                    time.sleep(delay)
-                    
-            except Exception as e:
-                print(f"   ❌ Strategy {i} failed: {str(e)[:100]}...")
-                continue
+        platform, _ = get_video_key(url)
+        strategies = self._strategies(platform)
+        print(f"   Strategy order: {', '.join(name for name, _ in strategies)}")
+        if self.race and self.max_concurrency > 1:
+            outcome = self._race_strategies(url, platform, strategies)
+        else:
+            outcome = self._sequential_strategies(url, platform, strategies)
+        
+        if outcome:
+            name, result = outcome
+            print(f"✅ SUCCESS with {name} strategy!")
+            result = yt_dlp.YoutubeDL.sanitize_info(result, remove_private_keys=True)
+            metadata_cache.put(url, result)
+            return result
         
         print("❌ All strategies failed")
         return None
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Persistent Audio Result Cache for the Social Media Audio Extractor
+Content-addressed on-disk cache of extracted audio with size cap and LRU/TTL eviction
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Metadata fields kept next to each cached file (the full info dict is not needed to serve a hit)
+CACHED_INFO_FIELDS = ('id', 'title', 'duration', 'uploader', 'upload_date', 'extractor_key', 'webpage_url')
+
+class AudioCache:
+    """On-disk cache of extracted audio files keyed by (platform, video id, format, quality)
+
+    Each entry is two files in ``cache_dir``: ``<key>.<format>`` with the audio
+    and ``<key>.json`` with its metadata. Both are written to a temporary name
+    and renamed into place, so concurrent workers sharing the directory never
+    see a partial entry. The sidecar's mtime records the last access and drives
+    LRU eviction; ``created_at`` inside the sidecar drives TTL expiry.
+    """
+
+    def __init__(self, cache_dir: str, max_size_bytes: int = 1024 * 1024 * 1024, ttl_seconds: int = 24 * 3600):
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = max_size_bytes
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._stores = 0
+
+        logger.info(f"Audio cache initialized at {self.cache_dir} "
+                    f"(max {max_size_bytes // (1024 * 1024)} MB, ttl {ttl_seconds}s)")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size_bytes > 0
+
+    @staticmethod
+    def make_key(platform: str, video_id: str, output_format: str, quality: str, variant: Optional[str] = None) -> str:
+        """Build the content address for an extraction result (``variant``: e.g. an output profile)"""
+        raw = f"{platform}:{video_id}:{output_format}:{quality}"
+        if variant:
+            raw += f":{variant}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+    def _meta_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _read_meta(self, meta_path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _remove_entry(self, meta_path: Path, meta: Optional[Dict[str, Any]]) -> int:
+        """Remove an entry and return the number of bytes freed"""
+        freed = 0
+        if meta and meta.get('filename'):
+            audio_path = self.cache_dir / meta['filename']
+            try:
+                freed = audio_path.stat().st_size
+                audio_path.unlink()
+            except FileNotFoundError:
+                pass
+        try:
+            meta_path.unlink()
+        except FileNotFoundError:
+            pass
+        return freed
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Return (audio_path, info) for a cached result, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        meta_path = self._meta_path(key)
+        meta = self._read_meta(meta_path)
+        if meta is None:
+            self._count('_misses')
+            return None
+
+        audio_path = self.cache_dir / meta['filename']
+        if time.time() - meta.get('created_at', 0) > self.ttl_seconds or not audio_path.exists():
+            self._remove_entry(meta_path, meta)
+            self._count('_evictions')
+            self._count('_misses')
+            return None
+
+        # Touch the sidecar so LRU eviction sees this access
+        try:
+            os.utime(meta_path, None)
+        except OSError:
+            pass
+
+        self._count('_hits')
+        return str(audio_path), meta.get('info', {})
+
+    def put(self, key: str, source_path: str, info: Dict[str, Any]) -> Optional[str]:
+        """Copy an extracted file into the cache and return its cached path"""
+        if not self.enabled:
+            return None
+
+        output_format = os.path.splitext(source_path)[1].lstrip('.') or 'bin'
+        filename = f"{key}.{output_format}"
+        audio_path = self.cache_dir / filename
+
+        try:
+            fd, tmp_audio = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{key}.", suffix='.part')
+            os.close(fd)
+            shutil.copyfile(source_path, tmp_audio)
+            os.replace(tmp_audio, audio_path)
+
+            meta = {
+                'key': key,
+                'filename': filename,
+                'created_at': time.time(),
+                'size': audio_path.stat().st_size,
+                'info': {field: info.get(field) for field in CACHED_INFO_FIELDS},
+            }
+            fd, tmp_meta = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{key}.", suffix='.part')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_meta, self._meta_path(key))
+        except OSError as e:
+            logger.error(f"Failed to store {source_path} in audio cache: {e}")
+            return None
+
+        self._count('_stores')
+        self.evict()
+        return str(audio_path)
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under the size cap"""
+        now = time.time()
+        entries = []
+        total_size = 0
+        evicted = 0
+
+        for meta_path in self.cache_dir.glob('*.json'):
+            meta = self._read_meta(meta_path)
+            if meta is None:
+                continue
+            if now - meta.get('created_at', 0) > self.ttl_seconds:
+                self._remove_entry(meta_path, meta)
+                evicted += 1
+                continue
+            try:
+                last_access = meta_path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            size = meta.get('size', 0)
+            total_size += size
+            entries.append((last_access, size, meta_path, meta))
+
+        if total_size > self.max_size_bytes:
+            for last_access, size, meta_path, meta in sorted(entries, key=lambda e: e[0]):
+                if total_size <= self.max_size_bytes:
+                    break
+                self._remove_entry(meta_path, meta)
+                total_size -= size
+                evicted += 1
+
+        if evicted:
+            self._count('_evictions', evicted)
+            logger.info(f"Audio cache evicted {evicted} entries ({total_size} bytes remain)")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get audio cache statistics"""
+        with self._lock:
+            hits, misses = self._hits, self._misses
+            stats = {
+                "enabled": self.enabled,
+                "cache_dir": str(self.cache_dir),
+                "hits": hits,
+                "misses": misses,
+                "evictions": self._evictions,
+                "stores": self._stores,
+                "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+            }
+        stats.update({
+            "max_size_bytes": self.max_size_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        })
+        return stats
+
+# Global audio cache instance
+_audio_cache = None
+
+def get_audio_cache() -> AudioCache:
+    """Get or create global audio cache instance"""
+    global _audio_cache
+    if _audio_cache is None:
+        cache_dir = os.getenv('AUDIO_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'audio_cache'))
+        max_size_mb = int(os.getenv('AUDIO_CACHE_MAX_MB', '1024'))
+        ttl_hours = float(os.getenv('AUDIO_CACHE_TTL_HOURS', '24'))
+        _audio_cache = AudioCache(cache_dir, max_size_mb * 1024 * 1024, int(ttl_hours * 3600))
+    return _audio_cache
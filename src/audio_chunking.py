@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Audio Chunking for the Social Media Audio Extractor
+Splits long audio into N-second chunks at nearby silence and encodes the chunks in parallel
+"""
+
+import os
+import shutil
+import subprocess
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from stream_pipeline import STREAM_ENCODERS
+
+logger = logging.getLogger(__name__)
+
+# The energy scan works on a low-rate mono decode; silence detection needs nothing finer
+SCAN_SAMPLE_RATE = 8000
+FRAME_SECONDS = 0.02
+# Energy is averaged over this many frames so a single quiet frame inside speech does not win
+SMOOTHING_FRAMES = 10
+
+# How far a split point may move from the exact multiple of the chunk length, looking for silence
+SNAP_FRACTION = 0.1
+MAX_SNAP_SECONDS = 5.0
+
+# Parallel ffmpeg encodes per chunking job (each encode is single-threaded)
+CHUNK_ENCODE_WORKERS = int(os.getenv('CHUNK_ENCODE_WORKERS', '0')) or os.cpu_count() or 2
+
+def frame_energy(audio_path: str) -> np.ndarray:
+    """RMS energy of consecutive ``FRAME_SECONDS`` frames of a file, decoded to mono PCM"""
+    cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', audio_path, '-vn',
+           '-ac', '1', '-ar', str(SCAN_SAMPLE_RATE), '-f', 's16le', 'pipe:1']
+    result = subprocess.run(cmd, capture_output=True, check=True)
+    samples = np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32)
+
+    frame_size = int(SCAN_SAMPLE_RATE * FRAME_SECONDS)
+    frames = samples[:len(samples) // frame_size * frame_size].reshape(-1, frame_size)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+def find_split_points(energy: np.ndarray, chunk_seconds: float) -> List[float]:
+    """Split times (seconds) near every multiple of ``chunk_seconds``, snapped to the quietest spot"""
+    total_frames = len(energy)
+    chunk_frames = chunk_seconds / FRAME_SECONDS
+    if total_frames <= chunk_frames * (1 + SNAP_FRACTION):
+        return []
+
+    smoothed = np.convolve(energy, np.ones(SMOOTHING_FRAMES) / SMOOTHING_FRAMES, mode='same')
+    snap_frames = int(min(chunk_seconds * SNAP_FRACTION, MAX_SNAP_SECONDS) / FRAME_SECONDS)
+
+    splits = []
+    previous = 0
+    target = chunk_frames
+    while target < total_frames - snap_frames:
+        low = max(int(target) - snap_frames, previous + 1)
+        high = min(int(target) + snap_frames + 1, total_frames)
+        split = low + int(np.argmin(smoothed[low:high]))
+        splits.append(split * FRAME_SECONDS)
+        previous = split
+        # The next target is measured from this split, so chunks stay close to chunk_seconds
+        target = split + chunk_frames
+    return splits
+
+def _encode_chunk(source_path: str, output_path: str, start: float, end: Optional[float],
+                  output_format: str, quality: str):
+    codec_args, muxer = STREAM_ENCODERS[output_format]
+    cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-ss', f"{start:.3f}"]
+    if end is not None:
+        cmd += ['-to', f"{end:.3f}"]
+    cmd += ['-i', source_path, '-vn', '-threads', '1', *codec_args]
+    if output_format not in ('wav', 'flac'):
+        cmd += ['-b:a', f"{quality}k"]
+    cmd += ['-f', muxer, output_path]
+    subprocess.run(cmd, capture_output=True, check=True)
+
+def split_audio_file(source_path: str, chunk_seconds: float, output_dir: str, name_prefix: str,
+                     quality: str = "192") -> List[Dict[str, Any]]:
+    """Split ``source_path`` into chunks written to ``output_dir`` as ``<name_prefix>-NNN.<ext>``
+
+    Split points snap to the quietest moment within a few seconds of each
+    multiple of ``chunk_seconds``. Chunks are re-encoded in the source's
+    format (so cuts are sample-accurate), several ffmpeg processes at a time.
+    Returns one ``{index, start, end, duration, filename, file_size}`` per chunk.
+    """
+    output_format = os.path.splitext(source_path)[1].lstrip('.')
+    if output_format not in STREAM_ENCODERS:
+        raise ValueError(f"Chunking is not supported for format: {output_format}")
+
+    energy = frame_energy(source_path)
+    total = len(energy) * FRAME_SECONDS
+    bounds = [0.0, *find_split_points(energy, chunk_seconds), None]
+    chunks = []
+    for index, (start, end) in enumerate(zip(bounds, bounds[1:])):
+        filename = f"{name_prefix}-{index:03d}.{output_format}"
+        chunks.append({
+            "index": index,
+            "start": round(start, 3),
+            "end": round(end if end is not None else total, 3),
+            "duration": round((end if end is not None else total) - start, 3),
+            "filename": filename,
+        })
+
+    if len(chunks) == 1:
+        # Short enough already; no need to re-encode
+        shutil.copyfile(source_path, os.path.join(output_dir, chunks[0]['filename']))
+    else:
+        try:
+            with ThreadPoolExecutor(max_workers=min(CHUNK_ENCODE_WORKERS, len(chunks))) as pool:
+                futures = [
+                    pool.submit(_encode_chunk, source_path, os.path.join(output_dir, chunk['filename']),
+                                start, end, output_format, quality)
+                    for chunk, (start, end) in zip(chunks, zip(bounds, bounds[1:]))
+                ]
+                for future in futures:
+                    future.result()
+        except Exception:
+            # Leaving the pool waited for the other encodes, so nothing is still writing
+            for chunk in chunks:
+                try:
+                    os.remove(os.path.join(output_dir, chunk['filename']))
+                except FileNotFoundError:
+                    pass
+            raise
+
+    for chunk in chunks:
+        chunk['file_size'] = os.path.getsize(os.path.join(output_dir, chunk['filename']))
+    logger.info(f"Split {os.path.basename(source_path)} into {len(chunks)} chunks of ~{chunk_seconds:g}s")
+    return chunks
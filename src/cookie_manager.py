@@ -4,154 +4,555 @@ Dynamic Cookie Manager for YouTube Audio Extractor
 Handles automatic cookie refresh, validation, and hot-reloading
 """
 
+import io
 import os
 import time
+import errno
+import select
+import shutil
+import struct
+import ctypes
+import ctypes.util
 import threading
 import logging
+import http.cookiejar
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Iterator, NamedTuple
 from datetime import datetime, timedelta
 import subprocess
 import tempfile
 
+from yt_dlp.cookies import YoutubeDLCookieJar
+
+from metrics import count_bot_detection, count_cookie_refresh
+from video_keys import is_youtube_url
+
 logger = logging.getLogger(__name__)
 
+# Error messages that may mean YouTube wants proof we are not a bot (broad: only picks the fallback path)
+BOT_DETECTION_KEYWORDS = ['bot', 'sign in', 'confirm', 'not available']
+
+# Error messages that definitely mean the account was flagged or rate limited; these cool a jar down
+COOLDOWN_KEYWORDS = ["confirm you're not a bot", "confirm you’re not a bot", '429', 'too many requests']
+
+# Error messages that mean this account is being throttled
+THROTTLE_KEYWORDS = ['429', 'too many requests', '403', 'forbidden']
+
+def is_bot_detection(message: str) -> bool:
+    """Whether an extraction error looks like YouTube's bot detection"""
+    message = message.lower()
+    return any(keyword in message for keyword in BOT_DETECTION_KEYWORDS)
+
+def is_account_flagged(message: str) -> bool:
+    """Whether an extraction error means the cookie jar's account should rest"""
+    message = message.lower()
+    return any(keyword in message for keyword in COOLDOWN_KEYWORDS)
+
+# inotify events that mean a jar file has been completely written, replaced or removed
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_DELETE = 0x00000200
+_INOTIFY_EVENT = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+class _DirectoryWatcher:
+    """Blocking wait for files in a directory to be finished or replaced (Linux inotify)
+    
+    Only close-after-write and rename events are watched, so a writer that
+    is still mid-file never wakes the watcher.
+    """
+    
+    def __init__(self, directory: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"Cannot watch {directory}")
+    
+    def wait(self, timeout: float) -> List[str]:
+        """Names of the files that changed, or an empty list after ``timeout`` seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+        names = []
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(data):
+            _, _, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            names.append(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+            offset += length
+        return names
+    
+    def close(self):
+        os.close(self.fd)
+
+def parse_cookie_file(path: Path) -> Tuple[Tuple[int, int, int], YoutubeDLCookieJar]:
+    """Parse a Netscape cookie file into memory
+    
+    Returns the file's (inode, mtime, size) signature alongside the jar.
+    Raises OSError if the file changed while it was being read, so a
+    half-written file is never published.
+    """
+    before = os.stat(path)
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    after = os.stat(path)
+    signature = (after.st_ino, after.st_mtime_ns, after.st_size)
+    if (before.st_ino, before.st_mtime_ns, before.st_size) != signature:
+        raise OSError(errno.EAGAIN, f"{path} changed while it was being read")
+    
+    cookies = YoutubeDLCookieJar()
+    cookies.load(io.StringIO(text))
+    return signature, cookies
+
+class CookieSnapshot(NamedTuple):
+    """Immutable view of one cookie jar, replaced wholesale by the background refresher"""
+    path: Optional[str]  # cookie file the jar was parsed from, None when there is none
+    cookies: Optional[YoutubeDLCookieJar]  # parsed jar; shared and never mutated
+    modified: Optional[float]
+    valid: Optional[bool]
+    validated_at: Optional[datetime]
+    refreshed_at: Optional[datetime]
+    writable: bool
+
+class _JarHealth:
+    """Mutable per-jar load and error counters (guarded by the manager's health lock)"""
+    
+    def __init__(self):
+        self.in_use = 0
+        self.successes = 0.0  # exponentially decayed
+        self.failures = 0.0
+        self.requests = 0
+        self.bot_detections = 0
+        self.cooldown_until = 0.0
+        self.last_error = None
+    
+    @property
+    def error_rate(self) -> float:
+        return self.failures / (self.successes + self.failures + 1)
+
+class CookieLease:
+    """A cookie jar checked out for one extraction; its outcome feeds the jar's health score"""
+    
+    def __init__(self, manager: 'CookieManager', jar: Optional[CookieSnapshot], tracked: bool = True):
+        self.manager = manager
+        self.path = jar.path if jar else None
+        self.cookies = jar.cookies if jar else None
+        # Outcomes for other sites say nothing about the YouTube account
+        self._reported = not tracked
+    
+    def report_error(self, message: str):
+        """Record a failed extraction with this jar (a bot challenge or 429 puts it in cooldown)"""
+        if not self._reported:
+            self._reported = True
+            self.manager.report(self.path, error=message)
+    
+    def report_success(self):
+        if not self._reported:
+            self._reported = True
+            self.manager.report(self.path)
+    
+    def discard(self):
+        """Release without recording an outcome (e.g. the attempt was cancelled)"""
+        self._reported = True
+
 class CookieManager:
-    """Manages YouTube cookies with automatic refresh and validation"""
+    """Manages a pool of YouTube cookie jars with automatic refresh, validation and health scoring
     
-    def __init__(self, cookie_path: str = "cookies.txt", refresh_interval_hours: int = 12):
+    The pool is every ``*.txt`` file in ``cookie_dir`` (or just
+    ``cookie_path`` when no directory is configured), so throughput can
+    grow with the number of accounts. Each jar has its own validation state,
+    decayed error rate, cooldown and concurrency limit; ``lease`` hands out
+    the healthiest jar that is not cooling down or at its limit. Jars that
+    hit YouTube's bot challenge or a 429 cool down for ``cooldown_seconds``.
+    
+    Each file is parsed once into an in-memory ``YoutubeDLCookieJar`` that
+    every YoutubeDL instance copies (see ``PacedYoutubeDL``) instead of
+    re-reading the file. Request handlers only read ``snapshot``, a tuple
+    of ``CookieSnapshot`` swapped in with a single reference assignment,
+    plus in-memory counters, so the hot path does no I/O and never waits on
+    validation. An inotify watcher re-parses a jar as soon as it has been
+    closed after writing or renamed into place (the interval check is the
+    fallback where inotify is unavailable); a file that changes while being
+    read, or fails to parse, leaves the previous jar in place. Validating
+    against YouTube and refreshing ``cookie_path`` from a browser happen on
+    the background refresher thread; callers that see trouble can nudge it
+    with ``request_check``.
+    A ``passive`` manager (used by extraction worker processes) only tracks
+    the files and leaves validation and refresh to the API process.
+    Health, cooldowns and validation results are per process: a passive
+    manager never learns that the API process found a jar invalid, and
+    each uvicorn or pool worker cools jars down on its own errors only.
+    """
+    
+    def __init__(self, cookie_path: str = "cookies.txt", refresh_interval_hours: int = 12,
+                 check_interval_seconds: int = 60, validation_interval_minutes: int = 30,
+                 passive: bool = False, cookie_dir: Optional[str] = None,
+                 jar_concurrency: int = 4, cooldown_seconds: int = 900):
         self.cookie_path = Path(cookie_path)
+        self.cookie_dir = Path(cookie_dir) if cookie_dir else None
         self.refresh_interval = timedelta(hours=refresh_interval_hours)
+        self.check_interval = check_interval_seconds
+        self.validation_interval = timedelta(minutes=validation_interval_minutes)
+        self.passive = passive
+        self.jar_concurrency = jar_concurrency
+        self.cooldown_seconds = cooldown_seconds
         self.last_refresh = None
-        self.last_modified = None
-        self._lock = threading.Lock()
-        self._cookies_valid = None
-        self._last_validation = None
+        self.last_modified: Dict[str, Optional[float]] = {}
+        self._lock = threading.Lock()  # serializes background work only, never taken on the request path
+        self._reload_lock = threading.RLock()  # serializes parsing and snapshot publication
+        self._health_lock = threading.Lock()  # guards in-memory counters, never held across I/O
+        self._health: Dict[str, _JarHealth] = {}
+        self._validation: Dict[str, Tuple[Optional[bool], Optional[datetime]]] = {}
+        self._last_refresh_attempt = None
+        self._parsed: Dict[str, Tuple[Tuple[int, int, int], YoutubeDLCookieJar]] = {}
+        self.snapshot: Tuple[CookieSnapshot, ...] = ()
+        self._reload_jars()
         
-        # Auto-refresh thread
+        # Auto-refresh and file watcher threads
         self._stop_refresh = threading.Event()
+        self._check_requested = threading.Event()
         self._refresh_thread = None
+        self._watch_thread = None
         
-        logger.info(f"Cookie manager initialized with path: {self.cookie_path}")
+        logger.info(f"Cookie manager initialized with path: {self.cookie_dir or self.cookie_path} "
+                    f"({len(self.snapshot)} jar(s))")
     
     def start_auto_refresh(self):
         """Start automatic cookie refresh thread"""
         if self._refresh_thread and self._refresh_thread.is_alive():
             return
-            
+        
         self._stop_refresh.clear()
         self._refresh_thread = threading.Thread(target=self._auto_refresh_loop, daemon=True)
         self._refresh_thread.start()
         logger.info("Auto-refresh thread started")
+        
+        watch_dir = self.cookie_dir or self.cookie_path.parent
+        try:
+            watcher = _DirectoryWatcher(watch_dir)
+        except (OSError, AttributeError) as e:
+            logger.info(f"Not watching {watch_dir} for cookie changes ({e}); relying on the interval check")
+        else:
+            self._watch_thread = threading.Thread(target=self._watch_loop, args=(watcher,), daemon=True)
+            self._watch_thread.start()
     
     def stop_auto_refresh(self):
         """Stop automatic cookie refresh thread"""
         if self._refresh_thread:
             self._stop_refresh.set()
+            self._check_requested.set()
             self._refresh_thread.join(timeout=5)
             logger.info("Auto-refresh thread stopped")
+        if self._watch_thread:
+            self._watch_thread.join(timeout=5)
+    
+    def request_check(self):
+        """Ask the background refresher to re-check the cookies soon (never blocks)"""
+        self._check_requested.set()
     
     def _auto_refresh_loop(self):
-        """Background thread for automatic cookie refresh"""
-        while not self._stop_refresh.wait(timeout=3600):  # Check every hour
+        """Background thread: track the files, validate and refresh, publish snapshots"""
+        while not self._stop_refresh.is_set():
             try:
-                if self._should_refresh_cookies():
-                    logger.info("Auto-refreshing cookies...")
-                    self.refresh_cookies()
+                self._background_check()
             except Exception as e:
                 logger.error(f"Auto-refresh failed: {e}")
+            self._check_requested.wait(timeout=self.check_interval)
+            self._check_requested.clear()
+    
+    def _watch_loop(self, watcher: _DirectoryWatcher):
+        """Watcher thread: re-parse jars as soon as their files are rewritten"""
+        try:
+            while not self._stop_refresh.is_set():
+                names = watcher.wait(timeout=1.0)
+                if any(self._is_jar_name(name) for name in names):
+                    try:
+                        self._reload_jars()
+                    except Exception as e:
+                        logger.error(f"Cookie reload failed: {e}")
+        finally:
+            watcher.close()
+    
+    def _is_jar_name(self, name: str) -> bool:
+        if self.cookie_dir:
+            return name.endswith('.txt') and not name.startswith('.')
+        return name == self.cookie_path.name
+    
+    def _reload_jars(self):
+        """Re-parse jar files that changed on disk and publish a new snapshot"""
+        with self._reload_lock:
+            paths = [str(jar_path) for jar_path in self._jar_paths()]
+            for key in list(self._parsed):
+                if key not in paths:
+                    del self._parsed[key]
+            for key in paths:
+                previous = self._parsed.get(key)
+                try:
+                    signature = os.stat(key)
+                    signature = (signature.st_ino, signature.st_mtime_ns, signature.st_size)
+                    if previous and previous[0] == signature:
+                        continue
+                    self._parsed[key] = parse_cookie_file(Path(key))
+                except FileNotFoundError:
+                    self._parsed.pop(key, None)
+                    continue
+                except (OSError, ValueError, http.cookiejar.LoadError) as e:
+                    # Keep serving the previous jar; the next close/rename event retries
+                    logger.warning(f"Could not load cookies from {key}, keeping previous jar: {e}")
+                    continue
+                if key in self.last_modified:
+                    logger.info(f"Cookies file {key} was modified externally, will revalidate")
+                self.last_modified[key] = self._parsed[key][0][1] / 1e9
+                self._validation.pop(key, None)
+            self.snapshot = self._build_snapshot(check_writable=True)
+    
+    def _publish_snapshot(self):
+        with self._reload_lock:
+            self.snapshot = self._build_snapshot(check_writable=True)
+    
+    def _background_check(self):
+        with self._lock:
+            # Safety net for missed or unavailable inotify events (unchanged files are not re-parsed)
+            self._reload_jars()
+            
+            if self.passive:
+                return
+            
+            for jar in self.snapshot:
+                if jar.path and self._validation_due(jar.path):
+                    self._validate_jar(jar.path)
+            self._publish_snapshot()
+            
+            if not self._primary_writable():
+                return
+            
+            # Don't hammer the browser extraction after a failed attempt
+            if self._last_refresh_attempt and datetime.now() - self._last_refresh_attempt < timedelta(minutes=15):
+                return
+            
+            if self._should_refresh_cookies():
+                logger.info("Auto-refreshing cookies...")
+                self._last_refresh_attempt = datetime.now()
+                self._refresh_locked()
+    
+    def _validation_due(self, path: str) -> bool:
+        valid, validated_at = self._validation.get(path, (None, None))
+        return valid is None or validated_at is None or datetime.now() - validated_at > self.validation_interval
+    
+    def _primary_writable(self) -> bool:
+        # Refreshing rewrites the file, which needs a writable directory
+        return os.access(self.cookie_path.parent, os.W_OK)
+    
+    def _jar_paths(self) -> List[Path]:
+        if not self.cookie_dir:
+            return [self.cookie_path]
+        try:
+            jars = sorted(p for p in self.cookie_dir.glob('*.txt') if not p.name.startswith('.'))
+        except OSError:
+            jars = []
+        return jars or [self.cookie_path]
+    
+    def _build_snapshot(self, check_writable: bool) -> Tuple[CookieSnapshot, ...]:
+        writable = check_writable and self._primary_writable()
+        jars = []
+        for jar_path in self._jar_paths():
+            signature, cookies = self._parsed.get(str(jar_path), (None, None))
+            valid, validated_at = self._validation.get(str(jar_path), (None, None))
+            jars.append(CookieSnapshot(
+                path=str(jar_path) if cookies is not None else None,
+                cookies=cookies,
+                modified=signature[1] / 1e9 if signature else None,
+                valid=valid,
+                validated_at=validated_at,
+                refreshed_at=self.last_refresh if jar_path == self.cookie_path else None,
+                writable=writable and jar_path == self.cookie_path
+            ))
+        return tuple(jars)
     
     def _should_refresh_cookies(self) -> bool:
         """Check if cookies should be refreshed"""
         if not self.cookie_path.exists():
             return True
-            
+        
         # Check if file is too old
         file_age = datetime.now() - datetime.fromtimestamp(self.cookie_path.stat().st_mtime)
         if file_age > self.refresh_interval:
             return True
-            
+        
         # Check if cookies are invalid
         if not self.validate_cookies():
             return True
-            
+        
         return False
     
-    def get_cookies_path(self) -> str:
-        """Get current cookies file path, refreshing if needed"""
-        with self._lock:
-            # Check if file was modified externally
-            if self.cookie_path.exists():
-                try:
-                    current_modified = self.cookie_path.stat().st_mtime
-                    if self.last_modified != current_modified:
-                        self.last_modified = current_modified
-                        self._cookies_valid = None  # Force revalidation
-                        logger.info("Cookies file was modified externally, will revalidate")
-                except PermissionError as e:
-                    logger.warning(f"Cannot access cookie file stats: {e}")
-            
-            # Check if we can write to the cookies directory
-            try:
-                # Test write permissions
-                test_file = self.cookie_path.parent / ".write_test"
-                test_file.touch()
-                test_file.unlink()
-            except (PermissionError, OSError) as e:
-                logger.error(f"No write permissions for cookie directory: {e}")
-                logger.info("Cookie auto-refresh disabled due to read-only filesystem")
-                return str(self.cookie_path) if self.cookie_path.exists() else None
-            
-            # Refresh if needed and we have write permissions
-            if self._should_refresh_cookies():
-                logger.warning("Cookies need refresh, attempting automatic refresh...")
-                try:
-                    self.refresh_cookies()
-                except Exception as e:
-                    logger.error(f"Failed to refresh cookies: {e}")
+    def _health_of(self, path: str) -> _JarHealth:
+        health = self._health.get(path)
+        if health is None:
+            health = self._health[path] = _JarHealth()
+        return health
+    
+    def _pick_jar(self, reserve: bool) -> Optional[CookieSnapshot]:
+        """Choose the healthiest usable jar (in-memory only; never blocks on I/O)
+
+        A jar that failed validation is only a last resort: a single failed
+        check (possibly a network error) must not leave every request
+        without cookies until the next validation.
+        """
+        now = time.time()
+        with self._health_lock:
+            best, best_score = None, None
+            overflow, overflow_load = None, None
+            last_resort, last_resort_load = None, None
+            for jar in self.snapshot:
+                if jar.path is None:
+                    continue
+                health = self._health_of(jar.path)
+                if health.cooldown_until > now:
+                    continue
+                if jar.valid is False:
+                    if last_resort_load is None or health.in_use < last_resort_load:
+                        last_resort, last_resort_load = jar, health.in_use
+                    continue
+                if health.in_use >= self.jar_concurrency:
+                    # Remember the least loaded jar in case every jar is at its limit
+                    if overflow_load is None or health.in_use < overflow_load:
+                        overflow, overflow_load = jar, health.in_use
+                    continue
+                score = (1 - health.error_rate) / (1 + health.in_use)
+                if best_score is None or score > best_score:
+                    best, best_score = jar, score
             
-            return str(self.cookie_path)
+            chosen = best or overflow or last_resort
+            if chosen and reserve:
+                self._health_of(chosen.path).in_use += 1
+            return chosen
+    
+    def get_jar(self) -> Optional[CookieSnapshot]:
+        """Get the healthiest cookie jar right now (snapshot read, no I/O, no reservation)"""
+        return self._pick_jar(reserve=False)
+    
+    def get_cookies_path(self) -> Optional[str]:
+        """Get the file behind the healthiest cookie jar right now"""
+        jar = self._pick_jar(reserve=False)
+        return jar.path if jar else None
+    
+    @contextmanager
+    def lease(self, url: str) -> Iterator[CookieLease]:
+        """Check out the healthiest jar for one extraction of ``url``
+        
+        The jar counts against its concurrency limit until the block exits.
+        For YouTube URLs, an exception leaving the block is recorded as that
+        jar's failure; otherwise the extraction counts as a success unless
+        the caller already reported an error. Other sites do not affect jar
+        health. ``lease.path`` is None when every jar is cooling down;
+        ``lease.cookies`` is the parsed jar.
+        """
+        cookie_lease = CookieLease(self, self._pick_jar(reserve=True), tracked=is_youtube_url(url))
+        try:
+            yield cookie_lease
+        except Exception as e:
+            cookie_lease.report_error(str(e))
+            raise
+        else:
+            cookie_lease.report_success()
+        finally:
+            if cookie_lease.path:
+                with self._health_lock:
+                    health = self._health_of(cookie_lease.path)
+                    health.in_use = max(0, health.in_use - 1)
+    
+    def report(self, path: Optional[str], error: Optional[str] = None):
+        """Feed an extraction outcome into a jar's health score"""
+        if not path:
+            return
+        
+        bot_detected = error is not None and is_account_flagged(error)
+        throttled = error is not None and any(keyword in error.lower() for keyword in THROTTLE_KEYWORDS)
+        if error is not None and not (bot_detected or throttled):
+            # Unrelated failures (bad URL, ffmpeg, ...) say nothing about the account
+            return
+        
+        with self._health_lock:
+            health = self._health_of(path)
+            health.requests += 1
+            health.successes *= 0.95
+            health.failures *= 0.95
+            if error is None:
+                health.successes += 1
+                return
+            health.failures += 1
+            health.last_error = error[:200]
+            if bot_detected:
+                health.bot_detections += 1
+                health.cooldown_until = time.time() + self.cooldown_seconds
+        
+        if bot_detected:
+            count_bot_detection(path)
+            logger.warning(f"Bot detection with cookie jar {path}, cooling down for {self.cooldown_seconds}s")
+            self.request_check()
+    
+    def _validate_jar(self, path: str) -> bool:
+        _, cookies = self._parsed.get(path, (None, None))
+        valid = self._probe_cookies(cookies, path)
+        self._validation[path] = (valid, datetime.now())
+        return valid
     
     def validate_cookies(self, force: bool = False) -> bool:
-        """Validate cookies by testing with yt-dlp"""
-        if not force and self._cookies_valid is not None:
+        """Validate the primary cookies by testing with yt-dlp (makes a live request; background use only)"""
+        valid, validated_at = self._validation.get(str(self.cookie_path), (None, None))
+        if not force and valid is not None:
             # Use cached validation if recent (within 5 minutes)
-            if self._last_validation and (datetime.now() - self._last_validation) < timedelta(minutes=5):
-                return self._cookies_valid
+            if validated_at and (datetime.now() - validated_at) < timedelta(minutes=5):
+                return valid
         
-        if not self.cookie_path.exists():
-            self._cookies_valid = False
+        return self._validate_jar(str(self.cookie_path))
+    
+    def _probe_cookies(self, cookies: Optional[YoutubeDLCookieJar], cookie_path) -> bool:
+        """Test a parsed cookie jar with a simple YouTube request"""
+        if cookies is None:
             return False
         
         try:
-            # Test cookies with a simple YouTube request
             test_url = "https://www.youtube.com/shorts/dQw4w9WgXcQ"  # Rick Roll - always available
             
-            import yt_dlp
+            from upstream_pacer import PacedYoutubeDL
             ydl_opts = {
                 'quiet': True,
                 'no_warnings': True,
-                'cookiefile': str(self.cookie_path),
+                'cookiefile': str(cookie_path),
+                'cookie_jar': cookies,
                 'extract_flat': True,
                 'skip_download': True,
             }
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with PacedYoutubeDL(ydl_opts) as ydl:
                 info = ydl.extract_info(test_url, download=False)
-                
-            self._cookies_valid = True
-            self._last_validation = datetime.now()
-            logger.info("Cookie validation successful")
-            return True
             
+            logger.info(f"Cookie validation successful for {cookie_path}")
+            return True
+        
         except Exception as e:
-            self._cookies_valid = False
-            self._last_validation = datetime.now()
-            logger.warning(f"Cookie validation failed: {e}")
+            logger.warning(f"Cookie validation failed for {cookie_path}: {e}")
             return False
     
     def refresh_cookies(self) -> bool:
-        """Refresh cookies from browser"""
+        """Refresh the primary cookies from browser (blocking; call from a background thread)"""
+        with self._lock:
+            return self._refresh_locked()
+    
+    def _refresh_locked(self) -> bool:
         try:
             # Import the refresh script functionality
             import sys
@@ -161,43 +562,63 @@ class CookieManager:
             browsers = ['chrome', 'firefox', 'edge']
             
             for browser in browsers:
+                # Extract next to the live file so requests keep using the old cookies meanwhile
+                fd, tmp_name = tempfile.mkstemp(dir=self.cookie_path.parent, prefix='.cookies.', suffix='.tmp')
+                os.close(fd)
+                tmp_path = Path(tmp_name)
                 try:
                     logger.info(f"Attempting to extract cookies from {browser}...")
                     
-                    # Create backup of existing cookies
-                    if self.cookie_path.exists():
-                        backup_path = self.cookie_path.with_suffix('.backup')
-                        self.cookie_path.rename(backup_path)
-                        logger.info(f"Backed up existing cookies to {backup_path}")
-                    
                     # Extract cookies using browser_cookie3 or similar
-                    success = self._extract_cookies_from_browser(browser)
+                    success = self._extract_cookies_from_browser(browser, tmp_path)
+                    parsed = parse_cookie_file(tmp_path) if success else None
                     
-                    if success and self.validate_cookies(force=True):
-                        self.last_refresh = datetime.now()
-                        self.last_modified = self.cookie_path.stat().st_mtime
+                    if parsed and self._probe_cookies(parsed[1], tmp_path):
+                        # Create backup of existing cookies
+                        if self.cookie_path.exists():
+                            backup_path = self.cookie_path.with_suffix('.backup')
+                            shutil.copy2(self.cookie_path, backup_path)
+                            logger.info(f"Backed up existing cookies to {backup_path}")
+                        
+                        with self._reload_lock:
+                            # The rename keeps the inode and mtime, so the watcher won't re-parse it
+                            os.replace(tmp_path, self.cookie_path)
+                            self._parsed[str(self.cookie_path)] = parsed
+                            self.last_refresh = datetime.now()
+                            self._validation[str(self.cookie_path)] = (True, datetime.now())
+                            self.last_modified[str(self.cookie_path)] = parsed[0][1] / 1e9
+                            with self._health_lock:
+                                # Fresh cookies start with a clean record
+                                self._health.pop(str(self.cookie_path), None)
+                            self.snapshot = self._build_snapshot(check_writable=True)
                         logger.info(f"Successfully refreshed cookies from {browser}")
+                        count_cookie_refresh(True)
                         return True
-                    
+                
                 except Exception as e:
                     logger.warning(f"Failed to extract from {browser}: {e}")
                     continue
+                finally:
+                    tmp_path.unlink(missing_ok=True)
             
             logger.error("Failed to refresh cookies from any browser")
+            self._publish_snapshot()
+            count_cookie_refresh(False)
             return False
-            
+        
         except Exception as e:
             logger.error(f"Cookie refresh failed: {e}")
+            count_cookie_refresh(False)
             return False
     
-    def _extract_cookies_from_browser(self, browser: str) -> bool:
-        """Extract cookies from specified browser"""
+    def _extract_cookies_from_browser(self, browser: str, output_path: Path) -> bool:
+        """Extract cookies from specified browser into output_path"""
         try:
             # Use yt-dlp's built-in cookie extraction
             cmd = [
                 'yt-dlp',
                 '--cookies-from-browser', browser,
-                '--cookies', str(self.cookie_path),
+                '--cookies', str(output_path),
                 '--extract-flat',
                 '--skip-download',
                 'https://www.youtube.com/shorts/dQw4w9WgXcQ'
@@ -205,12 +626,12 @@ class CookieManager:
             
             result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
             
-            if result.returncode == 0 and self.cookie_path.exists():
+            if result.returncode == 0 and output_path.stat().st_size > 0:
                 return True
             else:
                 logger.warning(f"yt-dlp cookie extraction failed: {result.stderr}")
                 return False
-                
+        
         except subprocess.TimeoutExpired:
             logger.warning(f"Cookie extraction from {browser} timed out")
             return False
@@ -218,15 +639,41 @@ class CookieManager:
             logger.warning(f"Cookie extraction error: {e}")
             return False
     
+    def get_jar_stats(self) -> List[Dict[str, Any]]:
+        """Get per-jar validation and health statistics"""
+        now = time.time()
+        jars = []
+        with self._health_lock:
+            for jar in self.snapshot:
+                health = self._health.get(jar.path) if jar.path else None
+                jars.append({
+                    "path": jar.path,
+                    "cookies": len(jar.cookies) if jar.cookies is not None else 0,
+                    "valid": jar.valid,
+                    "last_validation": jar.validated_at.isoformat() if jar.validated_at else None,
+                    "in_use": health.in_use if health else 0,
+                    "max_concurrency": self.jar_concurrency,
+                    "requests": health.requests if health else 0,
+                    "error_rate": round(health.error_rate, 3) if health else 0.0,
+                    "bot_detections": health.bot_detections if health else 0,
+                    "cooldown_remaining_seconds": round(max(0.0, health.cooldown_until - now)) if health else 0,
+                    "last_error": health.last_error if health else None,
+                })
+        return jars
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get cookie manager statistics"""
+        valid, validated_at = self._validation.get(str(self.cookie_path), (None, None))
         stats = {
             "cookie_path": str(self.cookie_path),
+            "cookie_dir": str(self.cookie_dir) if self.cookie_dir else None,
             "cookies_exist": self.cookie_path.exists(),
             "last_refresh": self.last_refresh.isoformat() if self.last_refresh else None,
-            "last_validation": self._last_validation.isoformat() if self._last_validation else None,
-            "cookies_valid": self._cookies_valid,
+            "last_validation": validated_at.isoformat() if validated_at else None,
+            "cookies_valid": valid,
             "auto_refresh_active": self._refresh_thread and self._refresh_thread.is_alive(),
+            "refresh_enabled": not self.passive and self._primary_writable(),
+            "jars": self.get_jar_stats(),
         }
         
         if self.cookie_path.exists():
@@ -242,12 +689,26 @@ class CookieManager:
 # Global cookie manager instance
 _cookie_manager = None
 
-def get_cookie_manager() -> CookieManager:
-    """Get or create global cookie manager instance"""
+def get_cookie_manager(passive: bool = False) -> CookieManager:
+    """Get or create global cookie manager instance
+    
+    ``passive`` (only honoured on first use) creates a manager that tracks
+    the cookie files but never validates or refreshes them.
+    """
     global _cookie_manager
     if _cookie_manager is None:
-        cookie_path = os.getenv('YOUTUBE_COOKIES_PATH', 'cookies.txt')
-        _cookie_manager = CookieManager(cookie_path)
+        cookie_dir = os.getenv('YOUTUBE_COOKIES_DIR')
+        default_path = os.path.join(cookie_dir, 'cookies.txt') if cookie_dir else 'cookies.txt'
+        cookie_path = os.getenv('YOUTUBE_COOKIES_PATH', default_path)
+        _cookie_manager = CookieManager(
+            cookie_path,
+            check_interval_seconds=int(os.getenv('COOKIE_CHECK_INTERVAL_SECONDS', '60')),
+            validation_interval_minutes=int(os.getenv('COOKIE_VALIDATION_INTERVAL_MINUTES', '30')),
+            passive=passive,
+            cookie_dir=cookie_dir,
+            jar_concurrency=int(os.getenv('COOKIE_JAR_CONCURRENCY', '4')),
+            cooldown_seconds=int(os.getenv('COOKIE_JAR_COOLDOWN_SECONDS', '900'))
+        )
         _cookie_manager.start_auto_refresh()
     return _cookie_manager
 
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Bounded Extraction Executors for the Social Media Audio Extractor
+Dedicated thread/process pools with admission control so bursts are shed instead of queued forever
+"""
+
+import os
+import time
+import asyncio
+import cProfile
+import functools
+import contextvars
+import threading
+import logging
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Any, AsyncIterator, Callable, Optional, TypeVar
+
+from metrics import observe_stage
+from request_trace import current_trace
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+class ExecutorSaturated(Exception):
+    """Raised when a pool's admission queue is full; maps to 503 with Retry-After"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"Server is busy ({name} queue is full), retry in {retry_after}s")
+        self.name = name
+        self.retry_after = retry_after
+
+def _timed_call(fn: Callable[..., T], args: tuple, profile: bool = False) -> tuple[float, float, T, Optional[dict]]:
+    """Run fn in the pool and report wall-clock start/end (works across processes)
+
+    With ``profile`` the call runs under cProfile and its raw stats are
+    returned as well (or attached to the exception as ``profile_stats``),
+    so they can cross the process boundary.
+    """
+    started_at = time.time()
+    if not profile:
+        result = fn(*args)
+        return started_at, time.time(), result, None
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(fn, *args)
+    except Exception as e:
+        profiler.create_stats()
+        e.profile_stats = profiler.stats
+        raise
+    profiler.create_stats()
+    return started_at, time.time(), result, profiler.stats
+
+class BoundedExecutor:
+    """Thread or process pool with a bounded admission queue and queue/wait statistics
+
+    At most ``max_workers`` calls run at once and at most ``max_queue`` more
+    may wait for a worker. Further calls are rejected immediately with
+    ``ExecutorSaturated`` unless the caller opts out of shedding (used by
+    callers that are already bounded, like the job workers). Work that has
+    to run outside the pool (like a streaming pipeline) holds a slot with
+    ``reserve`` and counts toward the same limits.
+
+    In process mode the workers are long-lived processes started with
+    ``initializer`` and recycled after ``max_tasks_per_child`` jobs; ``fn``
+    and its arguments must then be picklable.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, use_processes: bool = False,
+                 initializer: Optional[Callable[[], None]] = None, max_tasks_per_child: Optional[int] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.mode = 'process' if use_processes else 'thread'
+        if use_processes:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers, initializer=initializer,
+                                                 max_tasks_per_child=max_tasks_per_child)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker",
+                                                initializer=initializer)
+        self._lock = threading.Lock()
+        # Pool calls and reservations together; the pool itself never has a backlog
+        self._capacity = asyncio.Semaphore(max_workers)
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._avg_service = 0.0  # exponentially weighted, seconds
+
+    def _queued(self) -> int:
+        return max(0, self._in_flight - self.max_workers)
+
+    def _retry_after(self) -> int:
+        # Roughly how long until the current backlog has drained
+        return max(1, int(self._avg_service * self._in_flight / self.max_workers) + 1)
+
+    def _admit(self, shed: bool):
+        with self._lock:
+            if shed and self._in_flight >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturated(self.name, self._retry_after())
+            self._in_flight += 1
+
+    def _record(self, wait: float, service: float):
+        with self._lock:
+            self._completed += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._avg_service = service if self._completed == 1 else 0.9 * self._avg_service + 0.1 * service
+        observe_stage(f"{self.name}_queue", wait)
+
+    async def run(self, fn: Callable[..., T], *args, shed: bool = True) -> T:
+        """Run ``fn(*args)`` on the pool, rejecting when the queue is full and ``shed`` is set"""
+        self._admit(shed)
+        submitted_at = time.time()
+
+        trace = current_trace()
+        call = functools.partial(_timed_call, fn, args, bool(trace and trace.profile))
+        if self.mode == 'thread':
+            # Stages timed inside the call land in the request's trace
+            call = functools.partial(contextvars.copy_context().run, call)
+
+        loop = asyncio.get_event_loop()
+        try:
+            async with self._capacity:
+                started_at, finished_at, result, profile_stats = await loop.run_in_executor(self._executor, call)
+        except BaseException as e:
+            with self._lock:
+                self._failed += 1
+            if getattr(e, 'profile_stats', None):
+                trace.add_profile(e.profile_stats)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        self._record(max(0.0, started_at - submitted_at), finished_at - started_at)
+        if profile_stats:
+            trace.add_profile(profile_stats)
+        return result
+
+    @asynccontextmanager
+    async def reserve(self, shed: bool = True) -> AsyncIterator[None]:
+        """Hold a worker slot for the duration of the block, admitted like ``run``"""
+        self._admit(shed)
+        submitted_at = time.time()
+        try:
+            async with self._capacity:
+                started_at = time.time()
+                try:
+                    yield
+                except BaseException:
+                    with self._lock:
+                        self._failed += 1
+                    raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        self._record(started_at - submitted_at, time.time() - started_at)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics"""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.max_workers,
+                "active": min(self._in_flight, self.max_workers),
+                "queue_depth": self._queued(),
+                "max_queue": self.max_queue,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_wait_seconds": round(self._total_wait / self._completed, 3) if self._completed else 0.0,
+                "max_wait_seconds": round(self._max_wait, 3),
+                "avg_service_seconds": round(self._avg_service, 3),
+            }
+
+# Global executor instances
+_metadata_executor = None
+_download_executor = None
+_stream_io_executor = None
+
+def get_metadata_executor() -> BoundedExecutor:
+    """Get or create the pool for info/metadata resolution"""
+    global _metadata_executor
+    if _metadata_executor is None:
+        _metadata_executor = BoundedExecutor(
+            'metadata',
+            int(os.getenv('METADATA_WORKERS', '8')),
+            int(os.getenv('METADATA_QUEUE_DEPTH', '32'))
+        )
+    return _metadata_executor
+
+def get_download_executor() -> BoundedExecutor:
+    """Get or create the pool for download and transcode work
+
+    ``EXTRACTION_EXECUTOR_MODE=process`` runs downloads in warm worker
+    processes that keep preinitialized YoutubeDL instances and are
+    recycled after ``EXTRACTION_WORKER_MAX_JOBS`` jobs.
+    """
+    global _download_executor
+    if _download_executor is None:
+        use_processes = os.getenv('EXTRACTION_EXECUTOR_MODE', 'thread').lower() == 'process'
+        initializer = None
+        if use_processes:
+            from extraction_worker import init_worker
+            initializer = init_worker
+        _download_executor = BoundedExecutor(
+            'download',
+            int(os.getenv('DOWNLOAD_WORKERS', '4')),
+            int(os.getenv('DOWNLOAD_QUEUE_DEPTH', '16')),
+            use_processes=use_processes,
+            initializer=initializer,
+            max_tasks_per_child=int(os.getenv('EXTRACTION_WORKER_MAX_JOBS', '100')) if use_processes else None
+        )
+        logger.info(f"Download executor started in {_download_executor.mode} mode")
+    return _download_executor
+
+def get_stream_io_executor() -> ThreadPoolExecutor:
+    """Get or create the threads for blocking reads of streaming pipelines
+
+    Streaming pipelines each hold a download slot (see ``reserve``) and
+    read one chunk at a time, so one thread per download worker suffices.
+    """
+    global _stream_io_executor
+    if _stream_io_executor is None:
+        _stream_io_executor = ThreadPoolExecutor(max_workers=int(os.getenv('DOWNLOAD_WORKERS', '4')),
+                                                 thread_name_prefix='stream-io')
+    return _stream_io_executor
+
+def get_executor_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistics of the executors that have been started (never starts one)"""
+    executors = {'metadata': _metadata_executor, 'download': _download_executor}
+    return {name: executor.get_stats() for name, executor in executors.items() if executor}
+
+def shutdown_executors():
+    """Shutdown global executors"""
+    global _metadata_executor, _download_executor, _stream_io_executor
+    for executor in (_metadata_executor, _download_executor):
+        if executor:
+            executor.shutdown()
+    if _stream_io_executor:
+        _stream_io_executor.shutdown(wait=False, cancel_futures=True)
+    _metadata_executor = None
+    _download_executor = None
+    _stream_io_executor = None
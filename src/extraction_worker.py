@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Extraction Worker for the Social Media Audio Extractor
+Download + transcode entry point, run in the download thread pool or in warm worker processes
+"""
+
+import os
+import time
+import atexit
+import shutil
+import tempfile
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Tuple, Iterator
+
+import yt_dlp
+
+from advanced_youtube_extractor import AdvancedYouTubeExtractor
+from cookie_manager import get_cookie_manager, CookieLease, is_bot_detection
+from format_negotiation import is_negotiated, NegotiatedExtractAudioPP
+from output_profiles import ProfileExtractAudioPP
+from metadata_cache import get_metadata_cache
+from upstream_pacer import PacedYoutubeDL, DeadlineExceeded
+from ydl_options import get_ydl_opts
+
+logger = logging.getLogger(__name__)
+
+# Long-lived YoutubeDL instances, one per option profile. Only used inside
+# process-pool workers, which run one job at a time; YoutubeDL is not
+# thread-safe, so the thread pool builds a fresh instance per job.
+_warm_instances: Dict[Tuple, PacedYoutubeDL] = {}
+_reuse_instances = False
+
+# The stage clock of the job running on this thread (jobs never share a thread)
+_current = threading.local()
+
+class _StageClock:
+    """Splits one yt-dlp run into metadata, download and post-processing time
+
+    Fed by the progress and post-processor hooks of the YoutubeDL instance,
+    since a single ``extract_info(download=True)`` call covers all three.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.download_started = None
+        self.download_finished = None
+        self.postprocess_started = None
+        self.postprocess = 0.0
+        self._postprocessor_started = None
+
+    def on_progress(self, status: str):
+        now = time.perf_counter()
+        if self.download_started is None:
+            self.download_started = now
+        if status == 'finished':
+            self.download_finished = now
+
+    def on_postprocess(self, status: str):
+        now = time.perf_counter()
+        if status == 'started':
+            self._postprocessor_started = now
+            if self.postprocess_started is None:
+                self.postprocess_started = now
+        elif status == 'finished' and self._postprocessor_started is not None:
+            self.postprocess += now - self._postprocessor_started
+            self._postprocessor_started = None
+
+    def timings(self) -> Dict[str, float]:
+        """Seconds per stage (stages that never ran are left out)"""
+        first_transfer = self.download_started or self.postprocess_started or time.perf_counter()
+        timings = {'metadata': first_transfer - self.started}
+        if self.download_started is not None and self.download_finished is not None:
+            timings['download'] = self.download_finished - self.download_started
+        if self.postprocess_started is not None:
+            timings['postprocess'] = self.postprocess
+        return timings
+
+def _progress_hook(progress: Dict[str, Any]):
+    clock = getattr(_current, 'clock', None)
+    if clock:
+        clock.on_progress(progress.get('status'))
+
+def _postprocessor_hook(progress: Dict[str, Any]):
+    clock = getattr(_current, 'clock', None)
+    if clock:
+        clock.on_postprocess(progress.get('status'))
+
+def init_worker():
+    """Process-pool initializer: enable instance reuse and pay the setup cost up front"""
+    global _reuse_instances
+    _reuse_instances = True
+    logging.basicConfig(level=logging.INFO)
+
+    # Workers only follow the cookie file; the API process validates and refreshes it
+    get_cookie_manager(passive=True)
+
+    # Building one instance loads the extractor classes and the HTTP handlers
+    with _open_ydl('mp3', '192', tempfile.gettempdir()):
+        pass
+    atexit.register(_close_warm_instances)
+    logger.info(f"Extraction worker {os.getpid()} ready")
+
+def _close_warm_instances():
+    for ydl in _warm_instances.values():
+        try:
+            ydl.close()
+        except Exception:
+            pass
+    _warm_instances.clear()
+
+def _new_ydl(opts: Dict[str, Any], output_format: str, quality: str, profile: Optional[str]) -> PacedYoutubeDL:
+    ydl = PacedYoutubeDL(opts)
+    if is_negotiated(output_format):
+        ydl.add_post_processor(NegotiatedExtractAudioPP(ydl, output_format, quality), when='post_process')
+    elif profile:
+        ydl.add_post_processor(ProfileExtractAudioPP(ydl, output_format, quality, profile), when='post_process')
+    return ydl
+
+def _profile_key(output_format: str, quality: str, profile: Optional[str], opts: Dict[str, Any]) -> Tuple:
+    # A reloaded cookie jar needs a new instance, since the jar is copied at construction.
+    # The instance's params keep the jar alive, so its id is not reused while the key exists.
+    return output_format, quality, profile, opts.get('cookiefile'), id(opts.get('cookie_jar'))
+
+@contextmanager
+def _open_ydl(output_format: str, quality: str, work_dir: str, deadline: Optional[float] = None,
+              cookie_lease: Optional[CookieLease] = None, profile: Optional[str] = None,
+              time_range: Optional[Tuple[float, Optional[float]]] = None) -> Iterator[PacedYoutubeDL]:
+    opts = get_ydl_opts(output_format, quality, output_dir=work_dir, deadline=deadline,
+                        cookie_lease=cookie_lease, profile=profile, time_range=time_range)
+    opts['progress_hooks'] = [_progress_hook]
+    opts['postprocessor_hooks'] = [_postprocessor_hook]
+    if not _reuse_instances:
+        with _new_ydl(opts, output_format, quality, profile) as ydl:
+            yield ydl
+        return
+
+    # YoutubeDL normalizes opts['outtmpl'] in place when it is constructed
+    outtmpl = opts['outtmpl']
+    key = _profile_key(output_format, quality, profile, opts)
+    ydl = _warm_instances.get(key)
+    if ydl is None:
+        stale = [k for k in _warm_instances if k[:4] == key[:4]]
+        for stale_key in stale:
+            _warm_instances.pop(stale_key).close()
+        ydl = _warm_instances[key] = _new_ydl(opts, output_format, quality, profile)
+
+    # Point the shared instance at this job's work directory, latency budget and time range
+    ydl.params['outtmpl']['default'] = outtmpl
+    ydl.params['deadline'] = opts['deadline']
+    ydl.params['retry_sleep_functions'] = opts['retry_sleep_functions']
+    # Its request handlers keep the timeout they were built with; urlopen applies this one per request
+    ydl.params['socket_timeout'] = opts['socket_timeout']
+    if 'download_ranges' in opts:
+        ydl.params['download_ranges'] = opts['download_ranges']
+    else:
+        # yt-dlp only falls back to the whole file when the option is absent
+        ydl.params.pop('download_ranges', None)
+    yield ydl
+
+def get_downloaded_filepath(info: dict) -> Optional[str]:
+    """Return the final (post-processed) file path recorded by yt-dlp for a download"""
+    downloads = info.get('requested_downloads') or []
+    for download in reversed(downloads):
+        if download.get('filepath'):
+            return download['filepath']
+    return info.get('filepath')
+
+def extract_audio_to_dir(url: str, output_format: str, quality: str, work_root: str,
+                         deadline: Optional[float] = None, profile: Optional[str] = None,
+                         time_range: Optional[Tuple[float, Optional[float]]] = None
+                         ) -> Tuple[str, Dict[str, Any], Dict[str, float]]:
+    """Download and transcode into a fresh directory under ``work_root``
+
+    Returns (audio_file, info, timings) where info is JSON-safe so it can
+    cross the process boundary and timings holds the seconds spent on
+    metadata, download and post-processing. The work directory is removed
+    on failure.
+    Upstream requests stop with DeadlineExceeded once ``deadline`` (a
+    ``time.time()`` timestamp) has passed. An output ``profile`` (see
+    ``output_profiles``) is applied in the same ffmpeg pass. With a
+    ``time_range`` of (start, end) seconds only that section is downloaded,
+    and info's ``duration`` describes the section.
+    """
+    os.makedirs(work_root, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix='req-', dir=work_root)
+    metadata_cache = get_metadata_cache()
+    clock = _current.clock = _StageClock()
+
+    try:
+        try:
+            with get_cookie_manager().lease(url) as cookie_lease, \
+                    _open_ydl(output_format, quality, work_dir, deadline, cookie_lease, profile, time_range) as ydl:
+                cached_info = metadata_cache.get(url, require_formats=True)
+                info = None
+
+                if cached_info:
+                    # Download from the already-resolved formats (same path as --load-info-json)
+                    try:
+                        info = ydl.process_ie_result(cached_info, download=True)
+                    except yt_dlp.utils.DownloadError as e:
+                        logger.warning(f"Cached formats rejected for {url}, re-resolving: {e}")
+                        metadata_cache.invalidate(url)
+
+                if info is None:
+                    # Resolve, download and post-process in a single pass
+                    info = ydl.extract_info(url, download=True)
+                    metadata_cache.put(url, ydl.sanitize_info(info, remove_private_keys=True))
+
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"Standard audio extraction failed: {error_msg}")
+
+            # Check if it's a bot detection error
+            if not is_bot_detection(error_msg):
+                raise
+
+            logger.info("Bot detection in audio extraction, trying advanced method...")
+
+            # For advanced extraction, we need to get the direct audio URL
+            extractor = AdvancedYouTubeExtractor(deadline=deadline)
+            advanced_info = extractor.extract_info(url)
+
+            if not advanced_info:
+                raise Exception("Advanced extraction also failed")
+
+            # Download from the formats the advanced extractor resolved
+            with get_cookie_manager().lease(url) as cookie_lease, \
+                    _open_ydl(output_format, quality, work_dir, deadline, cookie_lease, profile, time_range) as ydl:
+                info = ydl.process_ie_result(advanced_info, download=True)
+
+        # yt-dlp records where the post-processed file ended up
+        audio_file = get_downloaded_filepath(info)
+        if not audio_file or not os.path.exists(audio_file):
+            raise Exception("yt-dlp did not report an output file")
+
+        info = yt_dlp.YoutubeDL.sanitize_info(info)
+        if time_range:
+            start, end = time_range
+            full_duration = info.get('duration')
+            if full_duration and (end is None or end > full_duration):
+                end = full_duration
+            info.update(section_start=start, section_end=end)
+            if end is not None:
+                info['duration'] = round(end - start, 3)
+            else:
+                # Open-ended section of a source that does not report its length
+                info.pop('duration', None)
+
+        return audio_file, info, clock.timings()
+
+    except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if _reuse_instances and not isinstance(e, DeadlineExceeded):
+            # Exceptions cross the process boundary by pickling; keep them simple
+            raise Exception(str(e)) from None
+        raise
+    finally:
+        _current.clock = None
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+File Serving for the Social Media Audio Extractor
+Byte-range, conditional (ETag) and zero-copy responses for /files downloads
+"""
+
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple, Mapping
+from urllib.parse import quote
+
+import anyio
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Scope, Receive, Send
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def make_etag(stat_result: os.stat_result) -> str:
+    """Strong ETag from inode, size and nanosecond mtime
+
+    Files are written to a temporary name and renamed into place, so any
+    content change produces a new inode/mtime and therefore a new tag.
+    """
+    return '"{:x}-{:x}-{:x}"'.format(stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range ``Range`` header into an inclusive (start, end) pair
+
+    Returns None when the header should be ignored (malformed or multiple
+    ranges, which we answer with the full file) and raises ValueError when
+    the range cannot be satisfied.
+    """
+    match = _RANGE_RE.match(range_header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+class RangeFileResponse(Response):
+    """File response with Range, If-None-Match/If-Range support and zero-copy sending
+
+    The body is sent through the ASGI ``http.response.zerocopysend``
+    extension when the server offers it, through an nginx
+    ``X-Accel-Redirect`` when ``accel_redirect_prefix`` is set (nginx then
+    serves the file with sendfile), and in chunks read off the event loop
+    otherwise. ``background`` runs once the response has been sent.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, request_headers: Mapping[str, str], method: str = "GET",
+                 media_type: Optional[str] = None, filename: Optional[str] = None,
+                 accel_redirect_prefix: Optional[str] = None, background: Optional[BackgroundTask] = None):
+        self.path = path
+        self.request_headers = request_headers
+        self.send_header_only = method.upper() == "HEAD"
+        self.accel_redirect_prefix = accel_redirect_prefix
+        self.media_type = media_type or "application/octet-stream"
+        self.status_code = 200
+        self.background = background
+        self.init_headers({})
+        if filename is not None:
+            quoted = quote(filename)
+            if quoted != filename:
+                self.headers["content-disposition"] = f"attachment; filename*=utf-8''{quoted}"
+            else:
+                self.headers["content-disposition"] = f'attachment; filename="{filename}"'
+
+    def _not_modified(self, etag: str, stat_result: os.stat_result) -> bool:
+        if_none_match = self.request_headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+        if_modified_since = self.request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(stat_result.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _range_applies(self, etag: str) -> bool:
+        # If-Range only accepts strong validators; anything else means "send it all"
+        if_range = self.request_headers.get("if-range")
+        return if_range is None or if_range.strip() == etag
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self._send_file(scope, receive, send)
+        if self.background is not None:
+            await self.background()
+
+    async def _send_file(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+        except FileNotFoundError:
+            await Response(status_code=404)(scope, receive, send)
+            return
+        if not stat.S_ISREG(stat_result.st_mode):
+            await Response(status_code=404)(scope, receive, send)
+            return
+
+        size = stat_result.st_size
+        etag = make_etag(stat_result)
+        self.headers["etag"] = etag
+        self.headers["last-modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+        self.headers["accept-ranges"] = "bytes"
+
+        if self._not_modified(etag, stat_result):
+            del self.headers["content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if self.accel_redirect_prefix:
+            # nginx re-applies Range/conditional handling and serves the file with sendfile
+            self.headers["x-accel-redirect"] = quote(self.accel_redirect_prefix.rstrip("/") + self.path)
+            await send({"type": "http.response.start", "status": 200, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        start, end = 0, size - 1
+        status_code = 200
+        range_header = self.request_headers.get("range")
+        if range_header and size and self._range_applies(etag):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                self.headers["content-range"] = f"bytes */{size}"
+                self.headers["content-length"] = "0"
+                await send({"type": "http.response.start", "status": 416, "headers": self.raw_headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            if byte_range:
+                start, end = byte_range
+                status_code = 206
+                self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+        count = end - start + 1 if size else 0
+        self.headers["content-length"] = str(count)
+        await send({"type": "http.response.start", "status": status_code, "headers": self.raw_headers})
+
+        if self.send_header_only or count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        with open(self.path, "rb") as file:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopysend", "file": file.fileno(),
+                            "offset": start, "count": count})
+                return
+
+            file.seek(start)
+            remaining = count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(file.read, min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank under us; close the response rather than hang the client
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
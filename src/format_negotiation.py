@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Output Format Negotiation for the Social Media Audio Extractor
+Lets callers accept several audio formats so a fitting source stream is remuxed instead of re-encoded
+"""
+
+import logging
+from typing import List, Optional
+
+from yt_dlp.postprocessor import FFmpegExtractAudioPP
+
+from metrics import count_conversion
+
+logger = logging.getLogger(__name__)
+
+# Output formats a source can be remuxed into, in the order "auto" prefers them
+REMUXABLE_FORMATS = ('m4a', 'opus', 'mp3', 'ogg', 'flac')
+
+# Source audio codec (as ffprobe names it) -> the output format it remuxes into
+CODEC_OUTPUT_FORMATS = {
+    'aac': 'm4a',
+    'opus': 'opus',
+    'mp3': 'mp3',
+    'vorbis': 'ogg',
+    'flac': 'flac',
+}
+
+# Format-selector filter matching audio streams that remux into each output format
+STREAM_FILTERS = {
+    'm4a': '[acodec^=mp4a]',
+    'opus': '[acodec=opus]',
+    'mp3': '[acodec=mp3]',
+    'ogg': '[acodec=vorbis]',
+    'flac': '[acodec=flac]',
+}
+
+# Our output format -> yt-dlp's FFmpegExtractAudio codec name
+YTDLP_CODECS = {'ogg': 'vorbis'}
+
+def is_negotiated(output_format: str) -> bool:
+    """Whether a request format lets the source codec decide ("auto" or "m4a,opus,...")"""
+    return output_format == 'auto' or ',' in output_format
+
+def accepted_formats(output_format: str) -> List[str]:
+    """Formats a negotiated request accepts, most preferred first; the first is the transcode fallback"""
+    if output_format == 'auto':
+        return list(REMUXABLE_FORMATS)
+    return output_format.split(',')
+
+def normalize_output_format(output_format: str) -> str:
+    """Canonical form of a request format (lowercase, no blanks); raises ValueError for bad lists"""
+    output_format = output_format.strip().lower()
+    if output_format == 'auto' or not is_negotiated(output_format):
+        return output_format
+
+    formats = []
+    for fmt in (part.strip() for part in output_format.split(',')):
+        if fmt == 'auto' or fmt not in REMUXABLE_FORMATS:
+            raise ValueError(f"Accepted formats must be among {', '.join(REMUXABLE_FORMATS)}; got {fmt!r}")
+        if fmt not in formats:
+            formats.append(fmt)
+    return ','.join(formats)
+
+def format_selector(output_format: str) -> str:
+    """yt-dlp format selector preferring audio-only streams in an accepted codec"""
+    preferred = [f"bestaudio{STREAM_FILTERS[fmt]}" for fmt in accepted_formats(output_format)]
+    return '/'.join(preferred + ['bestaudio', 'best'])
+
+class NegotiatedExtractAudioPP(FFmpegExtractAudioPP):
+    """Remux the downloaded audio if its codec is accepted, otherwise transcode to the fallback
+
+    The codec is probed from the downloaded file rather than taken from the
+    format metadata, which generic sources often leave out.
+    """
+
+    def __init__(self, downloader=None, output_format: str = 'auto', preferredquality: Optional[str] = None):
+        self.accepted = accepted_formats(output_format)
+        super().__init__(downloader, YTDLP_CODECS.get(self.accepted[0], self.accepted[0]), preferredquality)
+        self._probed = None
+
+    def get_audio_codec(self, path):
+        # The base class probes the file again; answer from the probe made in run()
+        if self._probed and self._probed[0] == path:
+            return self._probed[1]
+        return super().get_audio_codec(path)
+
+    def run(self, information):
+        path = information['filepath']
+        self._probed = None
+        codec = self.get_audio_codec(path)
+        self._probed = (path, codec)
+
+        remux_format = CODEC_OUTPUT_FORMATS.get(codec)
+        target = remux_format if remux_format in self.accepted else self.accepted[0]
+        self.mapping = YTDLP_CODECS.get(target, target)
+        count_conversion('remux' if target == remux_format else 'transcode')
+        logger.info(f"Source audio codec {codec}: {'remuxing' if target == remux_format else 'transcoding'} to {target}")
+        try:
+            return super().run(information)
+        finally:
+            self._probed = None
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Asynchronous Extraction Job Manager for the Social Media Audio Extractor
+Runs long extractions on a bounded worker pool while clients poll for the result
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import tempfile
+import threading
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Any, Callable, Awaitable, List
+
+logger = logging.getLogger(__name__)
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at its configured depth"""
+
+def _process_token(pid: int) -> Optional[str]:
+    """``pid:start_time`` identifying a live process (so a reused pid does not match), or None"""
+    try:
+        with open(f"/proc/{pid}/stat", 'r') as f:
+            # Fields after the parenthesized command name; start time is field 22 overall
+            return f"{pid}:{f.read().rsplit(')', 1)[1].split()[19]}"
+    except (OSError, IndexError):
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        pass
+    return str(pid)
+
+class JobManager:
+    """Bounded pool of asyncio workers draining a bounded job queue
+
+    Job records are JSON files in ``jobs_dir`` so that any uvicorn worker can
+    answer status polls, while the queue and the workers that run jobs live
+    in the process that accepted the job. Each record names that process;
+    on start, queued or running jobs whose process is gone (a crash or
+    restart) are marked failed instead of staying pending forever.
+    """
+
+    def __init__(self, runner: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]], jobs_dir: str,
+                 workers: int = 4, queue_depth: int = 100, ttl_seconds: int = 24 * 3600):
+        self.runner = runner
+        self.jobs_dir = Path(jobs_dir)
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.ttl_seconds = ttl_seconds
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running = 0
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+        logger.info(f"Job manager initialized ({workers} workers, queue depth {queue_depth})")
+
+    def start(self):
+        """Start the worker tasks (must be called from the running event loop)"""
+        if self._tasks:
+            return
+        self._owner = _process_token(os.getpid())
+        self._fail_orphaned_jobs()
+        self._queue = asyncio.Queue(maxsize=self.queue_depth)
+        self._tasks = [asyncio.ensure_future(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._prune_loop()))
+        logger.info("Job workers started")
+
+    async def stop(self):
+        """Cancel the worker tasks; queued jobs are marked failed"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        while self._queue and not self._queue.empty():
+            job_id = self._queue.get_nowait()
+            self._update(job_id, status='failed', error='Server shut down before the job ran',
+                         finished_at=time.time())
+        logger.info("Job workers stopped")
+
+    def _fail_orphaned_jobs(self):
+        """Mark pending jobs of processes that no longer exist as failed"""
+        orphaned = 0
+        for job_path in self.jobs_dir.glob('*.json'):
+            job = self.get(job_path.stem)
+            if job is None or job['status'] not in ('queued', 'running'):
+                continue
+            owner = job.get('owner')
+            if owner and _process_token(int(owner.split(':')[0])) == owner:
+                continue
+            self._update(job['job_id'], status='failed', error='Interrupted by a server restart',
+                         finished_at=time.time())
+            orphaned += 1
+        if orphaned:
+            logger.warning(f"Marked {orphaned} interrupted jobs as failed")
+
+    def _job_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _write(self, job: Dict[str, Any]):
+        fd, tmp_path = tempfile.mkstemp(dir=self.jobs_dir, prefix=f".{job['job_id']}.", suffix='.part')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, self._job_path(job['job_id']))
+
+    def _update(self, job_id: str, **fields) -> Optional[Dict[str, Any]]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.update(fields)
+        self._write(job)
+        return job
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def submit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job and return its record; raises JobQueueFull when the queue is full"""
+        if self._queue is None:
+            raise RuntimeError("Job manager is not started")
+        if self._queue.full():
+            self._count('_rejected')
+            raise JobQueueFull(f"Job queue is full ({self.queue_depth} jobs waiting)")
+
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'status': 'queued',
+            'owner': self._owner,
+            'request': request,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None,
+        }
+        self._write(job)
+        self._queue.put_nowait(job['job_id'])
+        self._count('_submitted')
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Read a job record (from any worker process)"""
+        # Job ids are uuid4 hex; refuse anything that could escape the jobs dir
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._job_path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            job = self._update(job_id, status='running', started_at=time.time())
+            if job is None:
+                continue
+
+            self._running += 1
+            try:
+                result = await self.runner(job['request'])
+                self._update(job_id, status='completed', result=result, finished_at=time.time())
+                self._count('_completed')
+            except asyncio.CancelledError:
+                self._update(job_id, status='failed', error='Job was cancelled', finished_at=time.time())
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}")
+                self._update(job_id, status='failed', error=str(e), finished_at=time.time())
+                self._count('_failed')
+            finally:
+                self._running -= 1
+                self._queue.task_done()
+
+    async def _prune_loop(self):
+        """Drop job records older than the TTL"""
+        while True:
+            await asyncio.sleep(600)
+            cutoff = time.time() - self.ttl_seconds
+            for job_path in self.jobs_dir.glob('*.json'):
+                try:
+                    if job_path.stat().st_mtime < cutoff:
+                        job_path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get job queue statistics for this process"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "queued": self._queue.qsize() if self._queue else 0,
+                "running": self._running,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+
+# Global job manager instance
+_job_manager = None
+
+def get_job_manager(runner: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]] = None) -> JobManager:
+    """Get or create global job manager instance"""
+    global _job_manager
+    if _job_manager is None:
+        if runner is None:
+            raise RuntimeError("The job manager must be created with a runner")
+        jobs_dir = os.getenv('JOBS_DIR', os.path.join(tempfile.gettempdir(), 'audio_jobs'))
+        workers = int(os.getenv('JOB_WORKERS', '4'))
+        queue_depth = int(os.getenv('JOB_QUEUE_DEPTH', '100'))
+        ttl_hours = float(os.getenv('JOB_TTL_HOURS', '24'))
+        _job_manager = JobManager(runner, jobs_dir, workers, queue_depth, int(ttl_hours * 3600))
+    return _job_manager
+
+async def shutdown_job_manager():
+    """Shutdown global job manager"""
+    global _job_manager
+    if _job_manager:
+        await _job_manager.stop()
+        _job_manager = None
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Live Artifacts for the Social Media Audio Extractor
+Registry of outputs still being written, so later requests can follow them as they grow
+"""
+
+import os
+import asyncio
+import threading
+import logging
+from typing import Optional, Dict, Any, AsyncIterator
+
+import anyio
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+class LiveArtifact:
+    """An append-only output file that readers follow until the writer finishes
+
+    The writer appends through ``append`` and ends with ``finish``; every
+    reader gets the bytes written so far and then waits for more. Files are
+    opened, written and read on worker threads, never on the event loop.
+    Readers keep the file open, so the writer may delete it once finished
+    and ``wait_readers_opened`` returns, without cutting them off.
+    """
+
+    def __init__(self, key: str, path: str, media_type: str):
+        self.key = key
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.media_type = media_type
+        self.info: Dict[str, Any] = {}
+        self.size = 0
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self._file = None
+        self._opening = 0
+        self._changed = asyncio.Condition()
+
+    def _write(self, data: bytes):
+        if self._file is None:
+            self._file = open(self.path, 'wb')
+        self._file.write(data)
+        self._file.flush()
+
+    async def append(self, data: bytes):
+        await anyio.to_thread.run_sync(self._write, data)
+        self.size += len(data)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def finish(self, error: Optional[BaseException] = None):
+        """Mark the file complete (or failed with ``error``) and wake every reader"""
+        if self._file is not None:
+            await anyio.to_thread.run_sync(self._file.close)
+        self.error = error
+        self.finished = True
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def wait_ready(self):
+        """Wait for the first bytes, raising the writer's error if it failed before producing any"""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.size > 0 or self.finished)
+        if self.size == 0 and self.error is not None:
+            raise self.error
+
+    async def reader(self, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Iterator over the whole file: what is written already, then the rest as it arrives
+
+        Waits for the first bytes and opens the file, raising the writer's
+        error if it failed before producing any. Otherwise a failed
+        writer's error is raised once the reader has caught up with what
+        was written.
+        """
+        self._opening += 1
+        try:
+            await self.wait_ready()
+            f = await anyio.to_thread.run_sync(open, self.path, 'rb') if self.size else None
+        finally:
+            self._opening -= 1
+            async with self._changed:
+                self._changed.notify_all()
+        return self._follow(f, chunk_size)
+
+    async def wait_readers_opened(self):
+        """Wait until every reader created so far has its own handle on the file"""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._opening == 0)
+
+    async def _follow(self, f, chunk_size: int) -> AsyncIterator[bytes]:
+        if f is None:
+            # Finished without writing anything
+            return
+        try:
+            offset = 0
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: self.size > offset or self.finished)
+                if offset >= self.size:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                data = await anyio.to_thread.run_sync(f.read, min(chunk_size, self.size - offset))
+                offset += len(data)
+                yield data
+        finally:
+            f.close()
+
+class LiveArtifactRegistry:
+    """In-progress outputs by audio cache key and by their /files filename
+
+    Entries live from the moment an extraction starts writing until its
+    result has been stored, after which requests find it in the audio
+    cache. The registry is per process; requests handled by another
+    uvicorn worker fall back to the usual coalescing.
+    """
+
+    def __init__(self):
+        self._by_key: Dict[str, LiveArtifact] = {}
+        self._by_filename: Dict[str, LiveArtifact] = {}
+        self._lock = threading.Lock()
+        self._writers = 0
+        self._followers = 0
+
+    def register(self, key: str, path: str, media_type: str) -> LiveArtifact:
+        artifact = LiveArtifact(key, path, media_type)
+        with self._lock:
+            self._by_key[key] = artifact
+            self._by_filename[artifact.filename] = artifact
+            self._writers += 1
+        return artifact
+
+    def remove(self, artifact: LiveArtifact):
+        with self._lock:
+            if self._by_key.get(artifact.key) is artifact:
+                del self._by_key[artifact.key]
+            if self._by_filename.get(artifact.filename) is artifact:
+                del self._by_filename[artifact.filename]
+
+    def get(self, key: str) -> Optional[LiveArtifact]:
+        return self._by_key.get(key)
+
+    def find(self, filename: str) -> Optional[LiveArtifact]:
+        return self._by_filename.get(filename)
+
+    def count_follower(self):
+        with self._lock:
+            self._followers += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get live artifact statistics"""
+        with self._lock:
+            return {
+                "in_progress": len(self._by_key),
+                "writers": self._writers,
+                "followers": self._followers,
+            }
+
+# Global live artifact registry
+_live_artifacts = None
+
+def get_live_artifacts() -> LiveArtifactRegistry:
+    """Get or create global live artifact registry"""
+    global _live_artifacts
+    if _live_artifacts is None:
+        _live_artifacts = LiveArtifactRegistry()
+    return _live_artifacts
@@ -5,22 +5,44 @@ Optimized for n8n integration with binary data return
 """
 
 import os
+import time
+import uuid
+import shutil
 import tempfile
 import asyncio
 import logging
-from typing import Optional
+import json
+from typing import Optional, List, Dict, Tuple, AsyncIterator
 from pathlib import Path
-import random
 
 from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
-from fastapi.responses import Response, JSONResponse
+from fastapi.responses import Response, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, HttpUrl, Field, field_validator, model_validator
 import yt_dlp
 import aiofiles
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from advanced_youtube_extractor import AdvancedYouTubeExtractor
-from cookie_manager import get_cookie_manager, shutdown_cookie_manager
+from cookie_manager import get_cookie_manager, shutdown_cookie_manager, is_bot_detection, CookieLease
+from ydl_options import get_ydl_opts
+from extraction_worker import extract_audio_to_dir
+from audio_cache import get_audio_cache
+from metadata_cache import get_metadata_cache
+from strategy_stats import get_strategy_stats
+from upstream_pacer import PacedYoutubeDL, DeadlineExceeded, get_upstream_pacer
+from single_flight import get_single_flight
+from live_artifacts import get_live_artifacts, LiveArtifact
+from file_serving import RangeFileResponse
+from job_manager import get_job_manager, shutdown_job_manager, JobQueueFull
+from extraction_executor import get_metadata_executor, get_download_executor, shutdown_executors, ExecutorSaturated
+from stream_pipeline import AudioStreamPipeline, STREAM_ENCODERS, select_stream_format
+from format_negotiation import normalize_output_format, is_negotiated
+from output_profiles import get_output_profile
+from audio_chunking import split_audio_file
+from video_keys import get_video_key
+from metrics import render_metrics, observe_stage, observe_since, time_stage, count_rejection, watch_disk_usage
+from request_trace import ServerTimingMiddleware, request_timings, get_profile_store
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
@@ -28,8 +50,8 @@ from slowapi.errors import RateLimitExceeded
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Rate limiting setup
-limiter = Limiter(key_func=get_remote_address)
+# Rate limiting setup (RATE_LIMIT_ENABLED=false lifts the per-client limits, e.g. for load tests)
+limiter = Limiter(key_func=get_remote_address, enabled=os.getenv('RATE_LIMIT_ENABLED', 'true').lower() != 'false')
 app = FastAPI(
     title="Social Media Audio Extractor",
     description="Extract audio from YouTube Shorts and Instagram Reels",
@@ -37,7 +59,29 @@ app = FastAPI(
 )
 
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+def _rate_limited_handler(request: Request, exc: RateLimitExceeded) -> Response:
+    count_rejection('client_rate_limit')
+    return _rate_limit_exceeded_handler(request, exc)
+
+app.add_exception_handler(RateLimitExceeded, _rate_limited_handler)
+
+async def _executor_saturated_handler(request: Request, exc: ExecutorSaturated) -> JSONResponse:
+    """Shed load with 503 + Retry-After instead of queueing work we can't finish in time"""
+    count_rejection('executor_saturated')
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+app.add_exception_handler(ExecutorSaturated, _executor_saturated_handler)
+
+async def _deadline_exceeded_handler(request: Request, exc: DeadlineExceeded) -> JSONResponse:
+    """The request's latency budget ran out before upstream answered"""
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+app.add_exception_handler(DeadlineExceeded, _deadline_exceeded_handler)
 
 # CORS middleware
 app.add_middleware(
@@ -46,14 +90,67 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
 
+# Per-stage Server-Timing on every response; REQUEST_PROFILING=header|all|off controls cProfile capture
+app.add_middleware(ServerTimingMiddleware, profiling=os.getenv('REQUEST_PROFILING', 'header'))
+
 # Request models
+def apply_output_profile(request: BaseModel):
+    """Fill in a profile's default format and quality unless the request set them"""
+    if request.profile is None:
+        return request
+    profile = get_output_profile(request.profile)
+    if 'format' not in request.model_fields_set:
+        request.format = profile.default_format
+    if 'quality' not in request.model_fields_set:
+        request.quality = profile.default_quality
+    if is_negotiated(request.format):
+        raise ValueError("An output profile always re-encodes; give a single format")
+    return request
+
 class AudioExtractionRequest(BaseModel):
     url: HttpUrl
-    format: str = "mp3"
+    format: str = "mp3"  # Or "auto" / "m4a,opus,...": remux the source when its codec is accepted
     quality: str = "192"
+    profile: Optional[str] = None  # Named output profile, e.g. "speech" (16 kHz mono Opus)
+    start: Optional[float] = Field(None, ge=0)  # Only extract from this many seconds in...
+    end: Optional[float] = Field(None, gt=0)  # ...up to this many seconds (only the section is downloaded)
+    chunk_seconds: Optional[float] = Field(None, ge=5, le=3600)  # Split into chunks at nearby silence (returns a manifest)
     return_url: bool = False  # If True, return download URL instead of binary data
+    stream: bool = False  # If True, stream ffmpeg output while the download is still running
+    deadline_seconds: Optional[float] = Field(None, gt=0, le=3600)  # Latency budget for upstream requests and retries
+    
+    @field_validator('format')
+    @classmethod
+    def normalize_format(cls, value: str) -> str:
+        return normalize_output_format(value)
+    
+    @model_validator(mode='after')
+    def apply_profile(self):
+        return apply_output_profile(self)
+    
+    @model_validator(mode='after')
+    def check_time_range(self):
+        if self.start is not None and self.end is not None and self.end <= self.start:
+            raise ValueError("end must be after start")
+        return self
+
+class BatchExtractionRequest(BaseModel):
+    urls: List[HttpUrl] = Field(..., min_length=1, max_length=200)
+    format: str = "mp3"
+    quality: str = "192"
+    profile: Optional[str] = None
+    
+    @field_validator('format')
+    @classmethod
+    def normalize_format(cls, value: str) -> str:
+        return normalize_output_format(value)
+    
+    @model_validator(mode='after')
+    def apply_profile(self):
+        return apply_output_profile(self)
 
 class AudioExtractionResponse(BaseModel):
     success: bool
@@ -62,179 +159,373 @@ class AudioExtractionResponse(BaseModel):
     duration: Optional[float] = None
     file_size: Optional[int] = None
 
-# yt-dlp configuration
-def get_ydl_opts(output_format: str = "mp3", quality: str = "192", cookies_path: str = None) -> dict:
-    """Configure yt-dlp options for audio extraction with enhanced anti-bot protection"""
-    temp_dir = tempfile.gettempdir()
-    
-    # Randomize user agents to avoid detection
-    user_agents = [
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0',
-    ]
-    
-    opts = {
-        'format': 'bestaudio/best',
-        'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': output_format,
-            'preferredquality': quality,
-        }],
-        'extractaudio': True,
-        'audioformat': output_format,
-        'audioquality': quality,
-        'no_warnings': True,
-        'quiet': True,
-        'no_playlist': True,
-        'writeinfojson': False,
-        'writethumbnail': False,
-        
-        # Enhanced anti-bot protection measures
-        'user_agent': random.choice(user_agents),
-        'referer': 'https://www.youtube.com/',
-        'origin': 'https://www.youtube.com',
-        'sleep_interval': random.uniform(1, 3),  # Random delay between 1-3 seconds
-        'max_sleep_interval': random.uniform(5, 10),  # Random max delay 5-10 seconds
-        'sleep_interval_requests': random.uniform(0.5, 1.5),  # Delay between HTTP requests
-        
-        # Add more realistic browser headers
-        'http_headers': {
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Cache-Control': 'max-age=0',
-        },
-        
-        # YouTube specific optimizations
-        'extractor_args': {
-            'youtube': {
-                'skip': ['dash', 'hls'],  # Skip complex formats
-                'player_skip': ['configs'],  # Skip some player configs that might trigger bot detection
-                'player_client': ['android', 'web'],  # Try multiple clients
-                'comment_sort': ['top'],  # Don't load all comments
-                'max_comments': [0],  # Don't load comments at all
-                'include_live_chat': False,
-            }
-        },
+# Content types for the audio formats we produce
+AUDIO_MEDIA_TYPES = {
+    'mp3': 'audio/mpeg',
+    'm4a': 'audio/mp4',
+    'aac': 'audio/aac',
+    'wav': 'audio/wav',
+    'opus': 'audio/ogg',
+    'ogg': 'audio/ogg',
+    'flac': 'audio/flac',
+}
+
+# Default latency budget for synchronous requests (0 = none)
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', '0'))
+
+def request_deadline(extraction_request: AudioExtractionRequest) -> Optional[float]:
+    """Absolute ``time.time()`` deadline for a request, if it has a latency budget"""
+    budget = extraction_request.deadline_seconds or REQUEST_DEADLINE_SECONDS
+    return time.time() + budget if budget else None
+
+def request_time_range(start: Optional[float], end: Optional[float]) -> Optional[Tuple[float, Optional[float]]]:
+    """(start, end) seconds of the section a request asks for, or None for the whole file"""
+    if not start and end is None:
+        return None
+    return float(start or 0), end
+
+def cache_variant(profile: Optional[str], time_range: Optional[Tuple[float, Optional[float]]]) -> Optional[str]:
+    """Audio cache key variant separating profile and time-range results from full extractions"""
+    if not time_range:
+        return profile
+    start, end = time_range
+    return f"{profile or ''}@{start:g}-{'' if end is None else f'{end:g}'}"
+
+# Each extraction writes into its own directory under this root
+EXTRACTION_WORK_ROOT = os.path.abspath(os.getenv('EXTRACTION_WORK_DIR', os.path.join(tempfile.gettempdir(), 'audio_work')))
+
+async def extract_audio_async(url: str, output_format: str = "mp3", quality: str = "192",
+                              shed: bool = True, deadline: Optional[float] = None,
+                              profile: Optional[str] = None,
+                              time_range: Optional[Tuple[float, Optional[float]]] = None) -> tuple[str, dict]:
+    """Asynchronously extract audio using yt-dlp with advanced fallback"""
+    # Run in the bounded download pool (threads or warm worker processes) to avoid blocking
+    audio_file_path, info, timings = await get_download_executor().run(
+        extract_audio_to_dir, url, output_format, quality, EXTRACTION_WORK_ROOT, deadline, profile, time_range,
+        shed=shed
+    )
+    for stage, seconds in timings.items():
+        observe_stage(stage, seconds)
+    return audio_file_path, info
+
+@time_stage('cleanup')
+def cleanup_file(filepath: str):
+    """Background task to clean up temporary files"""
+    try:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+            logger.info(f"Cleaned up temporary file: {filepath}")
         
-        # Additional anti-detection measures
-        'socket_timeout': 60,
-        'retries': 3,
-        'fragment_retries': 3,
-        'file_access_retries': 3,
-        'retry_sleep_functions': {
-            'http': lambda n: random.uniform(1, 3) * n,
-            'fragment': lambda n: random.uniform(1, 2) * n,
-            'file_access': lambda n: random.uniform(0.5, 1.5) * n,
-        },
+        # Drop the per-request work directory along with any leftovers in it
+        work_dir = os.path.dirname(filepath)
+        if os.path.dirname(work_dir) == EXTRACTION_WORK_ROOT:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    except Exception as e:
+        logger.error(f"Error cleaning up file {filepath}: {e}")
+
+async def chunk_audio(audio_file_path: str, info: dict, extraction_request: AudioExtractionRequest) -> dict:
+    """Split extracted audio into silence-aligned chunks under /files and describe them"""
+    with time_stage('chunking'):
+        # Decoding and the parallel encodes are CPU work; they count against the download pool
+        chunks = await get_download_executor().run(
+            split_audio_file, audio_file_path, extraction_request.chunk_seconds,
+            tempfile.gettempdir(), uuid.uuid4().hex, extraction_request.quality
+        )
+    for chunk in chunks:
+        chunk["download_url"] = f"/files/{chunk['filename']}"
+    
+    title = info.get('title', 'audio')
+    return {
+        "success": True,
+        "title": title,
+        "duration": info.get('duration', 0),
+        "chunk_seconds": extraction_request.chunk_seconds,
+        "chunks": chunks,
+        "message": f"Audio split into {len(chunks)} chunks",
+        "timings": request_timings()
     }
+
+def publish_file(filepath: str) -> str:
+    """Move an extracted file out of its work directory into the /files directory
+
+    The published name gets a short unique suffix, so videos (or formats)
+    sharing a title cannot overwrite each other's download.
+    """
+    stem, ext = os.path.splitext(os.path.basename(filepath))
+    published_path = os.path.join(tempfile.gettempdir(), f"{stem}-{uuid.uuid4().hex[:8]}{ext}")
+    shutil.move(filepath, published_path)
+    cleanup_file(filepath)
+    return published_path
+
+@time_stage('metadata')
+def resolve_info(url: str, ydl_opts: dict, cookie_lease: CookieLease, require_formats: bool = False) -> dict:
+    """Resolve the info dict for a URL, going through the metadata cache
+
+    ``ydl_opts`` use the jar of ``cookie_lease``, which the caller holds
+    for the whole extraction; a bot challenge is reported to it before
+    falling back to the advanced extractor.
+    """
+    metadata_cache = get_metadata_cache()
+    info = metadata_cache.get(url, require_formats=require_formats)
+    if info is not None:
+        return info
     
-    # Use dynamic cookie manager for automatic cookie handling
-    cookie_manager = get_cookie_manager()
-    cookies_to_use = cookie_manager.get_cookies_path()
+    try:
+        with PacedYoutubeDL(ydl_opts) as ydl:
+            info = ydl.sanitize_info(ydl.extract_info(url, download=False), remove_private_keys=True)
+        metadata_cache.put(url, info)
+        return info
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        error_msg = str(e)
+        if not is_bot_detection(error_msg):
+            raise
+        cookie_lease.report_error(error_msg)
+        
+        logger.info("Bot detection in info resolution, trying advanced method...")
+        info = AdvancedYouTubeExtractor(deadline=ydl_opts.get('deadline')).extract_info(url)
+        if not info:
+            raise Exception("Advanced extraction also failed")
+        return info
+
+# Background tasks producing live artifacts (the event loop only keeps weak references to tasks)
+_live_streams = set()
+
+async def stream_audio(url: str, extraction_request: AudioExtractionRequest, cache_key: str) -> StreamingResponse:
+    """Stream audio from the upstream download through ffmpeg to the client
+
+    Bytes reach the client as soon as ffmpeg produces them. The encoded
+    output goes to a live artifact (see ``live_artifacts``) that later
+    requests for the same output follow, and into the audio cache once the
+    stream completes.
+    """
+    output_format = extraction_request.format
+    os.makedirs(EXTRACTION_WORK_ROOT, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix='req-', dir=EXTRACTION_WORK_ROOT)
     
-    if cookies_to_use and os.path.exists(cookies_to_use):
-        opts['cookiefile'] = cookies_to_use
-        logger.info(f"Using dynamic cookies from: {cookies_to_use}")
-    else:
-        logger.warning("No cookies available - may encounter bot detection on some videos")
-        logger.info("Tip: The cookie manager will try to auto-refresh cookies when needed")
+    # Named like its audio cache entry, so a /files URL handed out now keeps working afterwards
+    artifact = get_live_artifacts().register(
+        cache_key,
+        os.path.join(work_dir, f"{cache_key}.{output_format}"),
+        AUDIO_MEDIA_TYPES.get(output_format, 'application/octet-stream')
+    )
+    # The stream is its own task, so followers keep receiving it when this client goes away
+    task = asyncio.ensure_future(produce_stream(url, extraction_request, artifact, work_dir))
+    _live_streams.add(task)
+    task.add_done_callback(_live_streams.discard)
     
-    return opts
+    body = await open_live_body(artifact)
+    return StreamingResponse(body, headers=live_headers(artifact, "MISS"), media_type=artifact.media_type)
 
-async def extract_audio_async(url: str, output_format: str = "mp3", quality: str = "192") -> tuple[str, dict]:
-    """Asynchronously extract audio using yt-dlp with advanced fallback"""
+async def produce_stream(url: str, extraction_request: AudioExtractionRequest, artifact: LiveArtifact, work_dir: str):
+    """Run the streaming pipeline into a live artifact, then store the result for later requests"""
+    output_format = extraction_request.format
+    quality = extraction_request.quality
+    loop = asyncio.get_event_loop()
     
-    def extract_audio():
-        ydl_opts = get_ydl_opts(output_format, quality)
-        
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # Extract info first
-                info = ydl.extract_info(url, download=False)
-                
-                # Download and extract audio
-                ydl.download([url])
-                
-                # Find the extracted audio file
-                temp_dir = tempfile.gettempdir()
-                title = info.get('title', 'audio')
-                
-                # Clean filename
-                safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                audio_file = os.path.join(temp_dir, f"{safe_title}.{output_format}")
-                
-                # Sometimes yt-dlp creates files with different names
-                if not os.path.exists(audio_file):
-                    # Look for any audio files in temp directory created recently
-                    import glob
-                    pattern = os.path.join(temp_dir, f"*.{output_format}")
-                    files = glob.glob(pattern)
-                    if files:
-                        # Get the most recent file
-                        audio_file = max(files, key=os.path.getctime)
+    try:
+        # The download thread and ffmpeg count against the download pool like any other extraction,
+        # and resolution and download share one cookie lease whose outcome feeds the jar's health
+        async with get_download_executor().reserve():
+            with get_cookie_manager().lease(url) as cookie_lease:
+                ydl_opts = get_ydl_opts(output_format, quality, deadline=request_deadline(extraction_request),
+                                        cookie_lease=cookie_lease)
+                info = await get_metadata_executor().run(resolve_info, url, ydl_opts, cookie_lease, True)
                 
-                return audio_file, info
+                stream_format = select_stream_format(info)
+                if not stream_format:
+                    raise HTTPException(status_code=500, detail="No streamable audio format found")
                 
+                artifact.info = info
+                pipeline = AudioStreamPipeline(ydl_opts, stream_format, output_format, quality,
+                                               profile=extraction_request.profile)
+                try:
+                    pipeline.start()
+                    async for chunk in pipeline.iter_chunks():
+                        await artifact.append(chunk)
+                finally:
+                    pipeline.close()
+                # Followers and the cache only get a file ffmpeg is known to have finished
+                if not pipeline.completed:
+                    raise RuntimeError("Audio stream ended before ffmpeg finished")
+        await artifact.finish()
+        
+        # Copies, so readers that open the artifact until it is unregistered still find it
+        if not await loop.run_in_executor(None, get_audio_cache().put, artifact.key, artifact.path, info):
+            await loop.run_in_executor(None, shutil.copyfile, artifact.path,
+                                       os.path.join(tempfile.gettempdir(), artifact.filename))
+    except Exception as e:
+        logger.error(f"Audio streaming failed for {url}: {e}")
+        if not artifact.finished:
+            await artifact.finish(error=e)
+    finally:
+        if not artifact.finished:
+            await artifact.finish(error=RuntimeError("Audio streaming was interrupted"))
+        get_live_artifacts().remove(artifact)
+        # Requests that found the artifact before it was removed may still be opening it
+        await artifact.wait_readers_opened()
+        await loop.run_in_executor(None, shutil.rmtree, work_dir, True)
+
+async def open_live_body(artifact: LiveArtifact) -> AsyncIterator[bytes]:
+    """Response body following a live artifact, once its first bytes are there"""
+    try:
+        # Wait for the first encoded bytes so failures still produce a proper error status
+        reader = await artifact.reader()
+        first_chunk = await reader.__anext__()
+    except StopAsyncIteration:
+        first_chunk = b''
+    except (HTTPException, ExecutorSaturated, DeadlineExceeded):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Audio streaming failed: {str(e)}")
+    
+    async def body():
+        try:
+            yield first_chunk
+            async for chunk in reader:
+                yield chunk
+        finally:
+            await reader.aclose()
+    
+    return body()
+
+def live_headers(artifact: LiveArtifact, cache_status: str) -> Dict[str, str]:
+    """Response headers for a live artifact (its length is not known yet)"""
+    title = artifact.info.get('title', 'audio')
+    return {
+        "Content-Disposition": f'attachment; filename="{title}{os.path.splitext(artifact.filename)[1]}"',
+        "X-Audio-Duration": str(artifact.info.get('duration', 0)),
+        "X-Original-Title": title,
+        "X-Download-URL": f"/files/{artifact.filename}",
+        "X-Cache": cache_status
+    }
+
+async def follow_live_extraction(artifact: LiveArtifact, extraction_request: AudioExtractionRequest):
+    """Answer an /extract-audio request from an extraction that is still in progress"""
+    get_live_artifacts().count_follower()
+    logger.info(f"Following in-progress extraction {artifact.key}")
+    
+    if extraction_request.return_url:
+        try:
+            await artifact.wait_ready()
+        except (HTTPException, ExecutorSaturated, DeadlineExceeded):
+            raise
         except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Standard audio extraction failed: {error_msg}")
-            
-            # Check if it's a bot detection error
-            if any(keyword in error_msg.lower() for keyword in ['bot', 'sign in', 'confirm', 'not available']):
-                logger.info("Bot detection in audio extraction, trying advanced method...")
-                
-                # For advanced extraction, we need to get the direct audio URL
-                extractor = AdvancedYouTubeExtractor()
-                info = extractor.extract_info(url)
-                
-                if info:
-                    # For now, if advanced method works for info, retry standard download
-                    # with the info we got (sometimes the second attempt works)
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        ydl.download([url])
-                        
-                        temp_dir = tempfile.gettempdir()
-                        title = info.get('title', 'audio')
-                        safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                        audio_file = os.path.join(temp_dir, f"{safe_title}.{output_format}")
-                        
-                        if not os.path.exists(audio_file):
-                            import glob
-                            pattern = os.path.join(temp_dir, f"*.{output_format}")
-                            files = glob.glob(pattern)
-                            if files:
-                                audio_file = max(files, key=os.path.getctime)
-                        
-                        return audio_file, info
-                else:
-                    raise Exception("Advanced extraction also failed")
-            else:
-                raise e
+            raise HTTPException(status_code=500, detail=f"Audio streaming failed: {str(e)}")
+        download_url = f"/files/{artifact.filename}"
+        return {
+            "success": True,
+            "download_url": download_url,
+            "filename": artifact.filename,
+            "title": artifact.info.get('title', 'audio'),
+            "duration": artifact.info.get('duration', 0),
+            "file_size": None,  # Still growing; the download follows it to the end
+            "in_progress": not artifact.finished,
+            "message": f"Audio extraction in progress. Download at: {download_url}",
+            "timings": request_timings()
+        }
+    
+    body = await open_live_body(artifact)
+    return StreamingResponse(body, headers=live_headers(artifact, "LIVE"), media_type=artifact.media_type)
+
+async def stream_file(file_path: str, chunk_size: int = 64 * 1024):
+    """Yield a file in chunks without loading it into memory"""
+    async with aiofiles.open(file_path, 'rb') as f:
+        while True:
+            chunk = await f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+async def obtain_audio(url: str, output_format: str, quality: str,
+                       cached: Optional[tuple] = None, shed: bool = True,
+                       deadline: Optional[float] = None, profile: Optional[str] = None,
+                       time_range: Optional[Tuple[float, Optional[float]]] = None) -> tuple[str, dict, bool, bool]:
+    """Get the audio for a request from the cache, a coalesced extraction or a fresh one
+    
+    Returns (audio_file_path, info, from_cache, owns_file). Only an owned
+    file may be deleted by the caller; cached results are shared. Concurrent
+    identical requests share one extraction; without the cache each of them
+    gets its own hard link to the result. With ``shed`` a full download pool
+    raises ExecutorSaturated instead of queueing. ``deadline`` bounds
+    upstream requests and retries of the extraction this request starts; a
+    request that joined an extraction which failed on its leader's pool or
+    deadline limits retries under its own. Results of an output ``profile``
+    or a ``time_range`` section are cached separately.
+    """
+    audio_cache = get_audio_cache()
+    platform, video_id = get_video_key(url)
+    cache_key = audio_cache.make_key(platform, video_id, output_format, quality, cache_variant(profile, time_range))
+    
+    if cached is None:
+        cached = audio_cache.get(cache_key)
+    if cached:
+        # Serve straight from the cache without touching yt-dlp or ffmpeg
+        logger.info(f"Audio cache hit for {platform}:{video_id}")
+        return cached[0], cached[1], True, False
+    
+    logger.info(f"Extracting audio from: {url}")
+    
+    def retry_on_own_limits(error: BaseException) -> bool:
+        if isinstance(error, ExecutorSaturated):
+            return not shed
+        if isinstance(error, DeadlineExceeded):
+            return deadline is None or time.time() < deadline
+        return False
+    
+    # Concurrent requests for the same output share one extraction
+    if audio_cache.enabled:
+        audio_file_path, info = await get_single_flight().run(
+            cache_key,
+            lambda: extract_audio_cached(url, output_format, quality, cache_key, shed=shed, deadline=deadline,
+                                         profile=profile, time_range=time_range),
+            recheck=lambda: audio_cache.get(cache_key),
+            retry=retry_on_own_limits
+        )
+        return audio_file_path, info, False, False
+    
+    audio_file_path, info = await get_single_flight().run(
+        cache_key,
+        lambda: extract_audio_async(url, output_format, quality, shed=shed, deadline=deadline,
+                                    profile=profile, time_range=time_range),
+        retry=retry_on_own_limits,
+        share=link_extracted_file,
+        release=lambda result: cleanup_file(result[0])
+    )
+    return audio_file_path, info, False, True
+
+def link_extracted_file(result: tuple[str, dict]) -> tuple[str, dict]:
+    """Hard link a shared extraction result into a work directory of its own"""
+    audio_file_path, info = result
+    work_dir = tempfile.mkdtemp(prefix='req-', dir=EXTRACTION_WORK_ROOT)
+    linked_path = os.path.join(work_dir, os.path.basename(audio_file_path))
+    os.link(audio_file_path, linked_path)
+    return linked_path, info
+
+async def extract_audio_cached(url: str, output_format: str, quality: str, cache_key: str,
+                               shed: bool = True, deadline: Optional[float] = None,
+                               profile: Optional[str] = None,
+                               time_range: Optional[Tuple[float, Optional[float]]] = None) -> tuple[str, dict]:
+    """Extract audio and hand back the copy stored in the audio cache
+
+    The returned file is shared by every request coalesced onto this
+    extraction, so callers must not delete it.
+    """
+    audio_file_path, info = await extract_audio_async(url, output_format, quality, shed=shed, deadline=deadline,
+                                                      profile=profile, time_range=time_range)
     
-    # Run in thread pool to avoid blocking
     loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, extract_audio)
+    cached_path = await loop.run_in_executor(None, get_audio_cache().put, cache_key, audio_file_path, info)
+    if cached_path:
+        cleanup_file(audio_file_path)
+        return cached_path, info
+    
+    # The cache could not take the file; keep it where /files can still serve it
+    return await loop.run_in_executor(None, publish_file, audio_file_path), info
 
-def cleanup_file(filepath: str):
-    """Background task to clean up temporary files"""
-    try:
-        if os.path.exists(filepath):
-            os.remove(filepath)
-            logger.info(f"Cleaned up temporary file: {filepath}")
-    except Exception as e:
-        logger.error(f"Error cleaning up file {filepath}: {e}")
+# Extra accepted URL fragments, e.g. a local media stand-in for benchmarks ("127.0.0.1:8765/media/")
+EXTRA_ALLOWED_URLS = [fragment.strip().lower() for fragment in os.getenv('EXTRA_ALLOWED_URLS', '').split(',') if fragment.strip()]
 
 def validate_url(url: str) -> bool:
     """Validate if URL is from supported platforms"""
@@ -244,7 +535,7 @@ def validate_url(url: str) -> bool:
         'instagram.com/reel/',
         'instagram.com/p/',
         'instagram.com/tv/',
-    ]
+    ] + EXTRA_ALLOWED_URLS
     
     return any(platform in url.lower() for platform in supported_platforms)
 
@@ -273,7 +564,17 @@ async def health_check():
                 "cookies_valid": cookie_stats["cookies_valid"],
                 "auto_refresh_active": cookie_stats["auto_refresh_active"],
                 "last_validation": cookie_stats["last_validation"]
-            }
+            },
+            "audio_cache": get_audio_cache().get_stats(),
+            "metadata_cache": get_metadata_cache().get_stats(),
+            "single_flight": get_single_flight().get_stats(),
+            "live_artifacts": get_live_artifacts().get_stats(),
+            "jobs": get_job_manager().get_stats(),
+            "executors": {
+                "metadata": get_metadata_executor().get_stats(),
+                "download": get_download_executor().get_stats()
+            },
+            "upstream_pacer": get_upstream_pacer().get_stats()
         }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
@@ -289,12 +590,53 @@ async def cookie_status():
         logger.error(f"Cookie status check failed: {e}")
         raise HTTPException(status_code=500, detail="Failed to get cookie status")
 
+@app.get("/strategy-stats")
+async def strategy_stats():
+    """Get learned success rates and latencies of the fallback extraction strategies"""
+    return get_strategy_stats().get_stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage latency histograms, outcome counters and saturation gauges"""
+    loop = asyncio.get_event_loop()
+    # Measuring temp-disk usage walks directories; keep it off the event loop
+    body, content_type = await loop.run_in_executor(None, render_metrics)
+    return Response(content=body, headers={"Content-Type": content_type})
+
+@app.get("/profiles")
+async def list_profiles():
+    """List saved request profiles (send ``X-Profile: 1`` with a request to capture one)"""
+    return {"profiles": get_profile_store().list()}
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "pstats"):
+    """Download a saved request profile as a pstats file, or a text summary with ``format=text``"""
+    profile_store = get_profile_store()
+    if format == "text":
+        loop = asyncio.get_event_loop()
+        text = await loop.run_in_executor(None, profile_store.render_text, profile_id)
+        if text is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return Response(content=text, media_type="text/plain")
+    
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return RangeFileResponse(
+        path=path,
+        request_headers={},
+        media_type="application/octet-stream",
+        filename=f"{profile_id}.prof"
+    )
+
 @app.post("/refresh-cookies")
 async def refresh_cookies():
     """Manually refresh cookies"""
     try:
         cookie_manager = get_cookie_manager()
-        success = cookie_manager.refresh_cookies()
+        # Refreshing runs yt-dlp and makes live requests; keep it off the event loop
+        loop = asyncio.get_event_loop()
+        success = await loop.run_in_executor(None, cookie_manager.refresh_cookies)
         
         if success:
             return {"success": True, "message": "Cookies refreshed successfully"}
@@ -304,30 +646,48 @@ async def refresh_cookies():
         logger.error(f"Cookie refresh failed: {e}")
         raise HTTPException(status_code=500, detail="Failed to refresh cookies")
 
-@app.get("/files/{filename}")
-async def serve_file(filename: str):
-    """Serve audio files for download"""
-    import os
-    from fastapi.responses import FileResponse
-    
-    # Security: Only allow mp3, wav, m4a files
-    allowed_extensions = ['.mp3', '.wav', '.m4a']
-    file_ext = os.path.splitext(filename)[1].lower()
+def find_served_file(filename: str) -> Optional[str]:
+    """Locate a /files download in the temp directory, then in the audio cache"""
+    for directory in (tempfile.gettempdir(), str(get_audio_cache().cache_dir)):
+        file_path = os.path.join(directory, filename)
+        if os.path.exists(file_path):
+            return file_path
+    return None
+
+@app.api_route("/files/{filename}", methods=["GET", "HEAD"])
+async def serve_file(filename: str, request: Request):
+    """Serve audio files for download (supports Range and conditional requests)"""
+    # Security: Only allow the audio formats we produce
+    file_ext = os.path.splitext(filename)[1].lower().lstrip('.')
     
-    if file_ext not in allowed_extensions:
+    if file_ext not in AUDIO_MEDIA_TYPES or os.path.basename(filename) != filename:
         raise HTTPException(status_code=400, detail="File type not allowed")
     
-    # Look for file in temp directory
-    temp_dir = tempfile.gettempdir()
-    file_path = os.path.join(temp_dir, filename)
+    artifact = get_live_artifacts().find(filename)
+    if artifact is not None:
+        # Still being written: send what is there and follow the rest (no ranges or validators until it is done)
+        get_live_artifacts().count_follower()
+        headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"}
+        if request.method == "HEAD":
+            response = Response(headers=headers, media_type=artifact.media_type)
+            # The length is not known yet; an empty Response would claim zero
+            del response.headers['content-length']
+            return response
+        body = await open_live_body(artifact)
+        return StreamingResponse(body, headers=headers, media_type=artifact.media_type)
     
-    if not os.path.exists(file_path):
+    file_path = find_served_file(filename)
+    if not file_path:
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(
+    return RangeFileResponse(
         path=file_path,
+        request_headers=request.headers,
+        method=request.method,
+        media_type=AUDIO_MEDIA_TYPES[file_ext],
         filename=filename,
-        media_type="audio/mpeg"
+        accel_redirect_prefix=os.getenv('FILES_ACCEL_REDIRECT_PREFIX'),
+        background=BackgroundTask(observe_since, 'file_response', time.perf_counter())
     )
 
 @app.post("/extract-audio")
@@ -348,23 +708,64 @@ async def extract_audio(
             detail="URL must be from YouTube Shorts or Instagram Reels"
         )
     
+    time_range = request_time_range(extraction_request.start, extraction_request.end)
+    # Sections come from ffmpeg seeking into the source, which the streaming pipeline cannot do
+    streaming = (extraction_request.stream and not extraction_request.return_url
+                 and not extraction_request.chunk_seconds and time_range is None)
+    if streaming and extraction_request.format not in STREAM_ENCODERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Streaming is not supported for format: {extraction_request.format}"
+        )
+    
     try:
-        logger.info(f"Extracting audio from: {url}")
+        cached = None
+        audio_cache = get_audio_cache()
+        platform, video_id = get_video_key(url)
+        cache_key = audio_cache.make_key(platform, video_id, extraction_request.format, extraction_request.quality,
+                                         cache_variant(extraction_request.profile, time_range))
+        
+        # Join an extraction that is still streaming instead of waiting for it (chunking needs the whole file)
+        live = get_live_artifacts().get(cache_key)
+        if live is not None and not extraction_request.chunk_seconds:
+            return await follow_live_extraction(live, extraction_request)
+        
+        if streaming:
+            cached = audio_cache.get(cache_key)
+            if not cached:
+                logger.info(f"Streaming audio from: {url}")
+                return await stream_audio(url, extraction_request, cache_key)
         
-        # Extract audio
-        audio_file_path, info = await extract_audio_async(
-            url, 
-            extraction_request.format, 
-            extraction_request.quality
+        audio_file_path, info, from_cache, owns_file = await obtain_audio(
+            url,
+            extraction_request.format,
+            extraction_request.quality,
+            cached=cached,
+            deadline=request_deadline(extraction_request),
+            profile=extraction_request.profile,
+            time_range=time_range
         )
         
         if not os.path.exists(audio_file_path):
             raise HTTPException(status_code=500, detail="Audio extraction failed")
         
-        # Get file info
+        if extraction_request.chunk_seconds:
+            # A list of chunks can only be returned as URLs
+            try:
+                return await chunk_audio(audio_file_path, info, extraction_request)
+            finally:
+                if owns_file:
+                    cleanup_file(audio_file_path)
+        
+        if owns_file and extraction_request.return_url:
+            loop = asyncio.get_event_loop()
+            audio_file_path = await loop.run_in_executor(None, publish_file, audio_file_path)
+        
+        # Get file info (a negotiated format is only known once the file exists)
         file_size = os.path.getsize(audio_file_path)
         duration = info.get('duration', 0)
         title = info.get('title', 'audio')
+        output_format = os.path.splitext(audio_file_path)[1].lstrip('.') or extraction_request.format
         
         logger.info(f"Successfully extracted audio: {title} ({file_size} bytes)")
         
@@ -382,27 +783,49 @@ async def extract_audio(
                 "title": title,
                 "duration": duration,
                 "file_size": file_size,
-                "message": f"Audio extracted successfully. Download at: {download_url}"
+                "message": f"Audio extracted successfully. Download at: {download_url}",
+                "timings": request_timings()
+            }
+        
+        # Time from here until the body has been sent (background tasks run after sending)
+        background_tasks.add_task(observe_since, 'file_response', time.perf_counter())
+        
+        if streaming:
+            # Cache hit in streaming mode: send the cached file chunk by chunk
+            headers = {
+                "Content-Disposition": f'attachment; filename="{title}.{extraction_request.format}"',
+                "Content-Length": str(file_size),
+                "X-Audio-Duration": str(duration),
+                "X-File-Size": str(file_size),
+                "X-Original-Title": title,
+                "X-Cache": "HIT"
             }
+            media_type = AUDIO_MEDIA_TYPES.get(extraction_request.format, 'application/octet-stream')
+            return StreamingResponse(stream_file(audio_file_path), headers=headers, media_type=media_type)
         else:
             # Read file as binary data
             async with aiofiles.open(audio_file_path, 'rb') as f:
                 audio_data = await f.read()
             
-            # Schedule cleanup
-            background_tasks.add_task(cleanup_file, audio_file_path)
+            # Schedule cleanup (cached and shared files are owned by the cache)
+            if owns_file:
+                background_tasks.add_task(cleanup_file, audio_file_path)
             
             # Return binary data with appropriate headers
+            media_type = AUDIO_MEDIA_TYPES.get(output_format, 'application/octet-stream')
             headers = {
-                "Content-Type": "audio/mpeg",
-                "Content-Disposition": f'attachment; filename="{title}.{extraction_request.format}"',
+                "Content-Type": media_type,
+                "Content-Disposition": f'attachment; filename="{title}.{output_format}"',
                 "X-Audio-Duration": str(duration),
                 "X-File-Size": str(file_size),
-                "X-Original-Title": title
+                "X-Original-Title": title,
+                "X-Cache": "HIT" if from_cache else "MISS"
             }
             
-            return Response(content=audio_data, headers=headers, media_type="audio/mpeg")
+            return Response(content=audio_data, headers=headers, media_type=media_type)
         
+    except (HTTPException, ExecutorSaturated, DeadlineExceeded):
+        raise
     except Exception as e:
         logger.error(f"Error extracting audio from {url}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Audio extraction failed: {str(e)}")
@@ -423,19 +846,28 @@ async def extract_audio_info(
             detail="URL must be from YouTube Shorts or Instagram Reels"
         )
     
+    metadata_cache = get_metadata_cache()
+    deadline = request_deadline(extraction_request)
+    
     try:
-        # Use the same anti-bot configuration for info extraction
-        ydl_opts = get_ydl_opts()
-        ydl_opts.update({
-            'skip_download': True,  # Don't download for info extraction
-        })
-        
-        def get_info():
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                return ydl.extract_info(url, download=False)
+        info = metadata_cache.get(url)
         
-        loop = asyncio.get_event_loop()
-        info = await loop.run_in_executor(None, get_info)
+        if info is None:
+            @time_stage('metadata')
+            def get_info():
+                # Use the same anti-bot configuration for info extraction, with the healthiest cookie jar
+                with get_cookie_manager().lease(url) as cookie_lease:
+                    ydl_opts = get_ydl_opts(deadline=deadline, cookie_lease=cookie_lease)
+                    ydl_opts.update({
+                        'skip_download': True,  # Don't download for info extraction
+                    })
+                    
+                    with PacedYoutubeDL(ydl_opts) as ydl:
+                        info = ydl.sanitize_info(ydl.extract_info(url, download=False), remove_private_keys=True)
+                        metadata_cache.put(url, info)
+                        return info
+            
+            info = await get_metadata_executor().run(get_info)
         
         return {
             "success": True,
@@ -445,24 +877,28 @@ async def extract_audio_info(
             "upload_date": info.get('upload_date'),
             "view_count": info.get('view_count'),
             "platform": info.get('extractor_key'),
-            "thumbnail": info.get('thumbnail')
+            "thumbnail": info.get('thumbnail'),
+            "timings": request_timings()
         }
         
+    except (ExecutorSaturated, DeadlineExceeded):
+        raise
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Standard extraction failed for {url}: {error_msg}")
         
         # Check if it's a bot detection error
-        if any(keyword in error_msg.lower() for keyword in ['bot', 'sign in', 'confirm', 'not available']):
+        if is_bot_detection(error_msg):
             logger.info("Bot detection suspected, trying advanced extractor...")
             
             try:
                 # Use advanced extractor as fallback
+                @time_stage('metadata')
                 def get_info_advanced():
-                    extractor = AdvancedYouTubeExtractor()
+                    extractor = AdvancedYouTubeExtractor(deadline=deadline)
                     return extractor.extract_info(url)
                 
-                info = await loop.run_in_executor(None, get_info_advanced)
+                info = await get_metadata_executor().run(get_info_advanced)
                 
                 if info:
                     logger.info("Advanced extractor succeeded!")
@@ -475,7 +911,8 @@ async def extract_audio_info(
                         "view_count": info.get('view_count'),
                         "platform": info.get('extractor_key'),
                         "thumbnail": info.get('thumbnail'),
-                        "extraction_method": "advanced_fallback"
+                        "extraction_method": "advanced_fallback",
+                        "timings": request_timings()
                     }
                 else:
                     logger.error("Advanced extractor also failed")
@@ -485,9 +922,214 @@ async def extract_audio_info(
         
         raise HTTPException(status_code=500, detail=f"Failed to get audio info: {error_msg}")
 
+async def run_extraction_job(job_request: dict) -> dict:
+    """Extract audio for a queued job or batch entry and describe the resulting file"""
+    # Jobs and batches are already bounded by their own workers/semaphores, so they wait instead of shedding
+    audio_file_path, info, from_cache, owns_file = await obtain_audio(
+        job_request['url'],
+        job_request['format'],
+        job_request['quality'],
+        shed=False,
+        profile=job_request.get('profile'),
+        time_range=request_time_range(job_request.get('start'), job_request.get('end'))
+    )
+    
+    if owns_file:
+        # Keep the file around until the client collects it
+        loop = asyncio.get_event_loop()
+        audio_file_path = await loop.run_in_executor(None, publish_file, audio_file_path)
+    
+    filename = os.path.basename(audio_file_path)
+    return {
+        "filename": filename,
+        "download_url": f"/files/{filename}",
+        "title": info.get('title', 'audio'),
+        "duration": info.get('duration', 0),
+        "file_size": os.path.getsize(audio_file_path),
+        "from_cache": from_cache
+    }
+
+def _parse_platform_limits(spec: str) -> Dict[str, int]:
+    """Parse "youtube=4,instagram=2" into {"youtube": 4, "instagram": 2}"""
+    limits = {}
+    for item in spec.split(','):
+        if '=' in item:
+            platform, limit = item.split('=', 1)
+            limits[platform.strip().lower()] = max(1, int(limit))
+    return limits
+
+# Per-platform cap on concurrent batch extractions (shared by all batches in this process)
+BATCH_PLATFORM_CONCURRENCY = _parse_platform_limits(os.getenv('BATCH_PLATFORM_CONCURRENCY', 'youtube=4,instagram=2'))
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv('BATCH_DEFAULT_CONCURRENCY', '2'))
+_batch_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+def get_batch_semaphore(platform: str) -> asyncio.Semaphore:
+    """Get the concurrency limiter for a platform"""
+    if platform not in _batch_semaphores:
+        limit = BATCH_PLATFORM_CONCURRENCY.get(platform, BATCH_DEFAULT_CONCURRENCY)
+        _batch_semaphores[platform] = asyncio.Semaphore(limit)
+    return _batch_semaphores[platform]
+
+def describe_job(job: dict) -> dict:
+    """Public view of a job record"""
+    job_id = job['job_id']
+    response = {
+        "job_id": job_id,
+        "status": job['status'],
+        "url": job['request']['url'],
+        "created_at": job['created_at'],
+        "started_at": job['started_at'],
+        "finished_at": job['finished_at'],
+        "status_url": f"/jobs/{job_id}",
+    }
+    if job['status'] == 'completed':
+        response["result_url"] = f"/jobs/{job_id}/result"
+        response["result"] = job['result']
+    elif job['status'] == 'failed':
+        response["error"] = job['error']
+    return response
+
+@app.post("/extract-audio/batch")
+@limiter.limit("5/minute")
+async def extract_audio_batch(
+    request: Request,
+    batch_request: BatchExtractionRequest
+):
+    """Extract audio for many URLs, streaming one NDJSON line per URL as each finishes"""
+    
+    async def extract_one(index: int, url: str) -> dict:
+        line = {"index": index, "url": url}
+        if not validate_url(url):
+            line.update({"success": False, "error": "URL must be from YouTube Shorts or Instagram Reels"})
+            return line
+        
+        platform, _ = get_video_key(url)
+        try:
+            async with get_batch_semaphore(platform):
+                result = await run_extraction_job({
+                    "url": url,
+                    "format": batch_request.format,
+                    "quality": batch_request.quality,
+                    "profile": batch_request.profile
+                })
+            line.update({"success": True, **result})
+        except Exception as e:
+            logger.error(f"Batch extraction failed for {url}: {str(e)}")
+            line.update({"success": False, "error": f"Audio extraction failed: {str(e)}"})
+        return line
+    
+    urls = [str(url) for url in batch_request.urls]
+    logger.info(f"Batch extraction of {len(urls)} URLs")
+    
+    async def body():
+        tasks = [asyncio.ensure_future(extract_one(i, url)) for i, url in enumerate(urls)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                line = await next_done
+                yield json.dumps(line) + "\n"
+        finally:
+            # Client went away: stop extractions nobody will read
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+# /extract-audio options a queued job cannot honour
+JOB_UNSUPPORTED_FIELDS = ('chunk_seconds', 'stream', 'return_url', 'deadline_seconds')
+
+@app.post("/jobs", status_code=202)
+@limiter.limit("30/minute")
+async def create_job(
+    request: Request,
+    extraction_request: AudioExtractionRequest
+):
+    """Queue an audio extraction and return a job id to poll"""
+    
+    url = str(extraction_request.url)
+    
+    if not validate_url(url):
+        raise HTTPException(
+            status_code=400, 
+            detail="URL must be from YouTube Shorts or Instagram Reels"
+        )
+    
+    # Jobs always publish one file for /jobs/{id}/result and run without a latency budget
+    unsupported = [field for field in JOB_UNSUPPORTED_FIELDS if getattr(extraction_request, field)]
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Not supported for jobs: {', '.join(unsupported)}")
+    
+    try:
+        job = get_job_manager().submit({
+            "url": url,
+            "format": extraction_request.format,
+            "quality": extraction_request.quality,
+            "profile": extraction_request.profile,
+            "start": extraction_request.start,
+            "end": extraction_request.end
+        })
+    except JobQueueFull as e:
+        count_rejection('job_queue_full')
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    
+    return JSONResponse(
+        status_code=202,
+        content=describe_job(job),
+        headers={"Location": f"/jobs/{job['job_id']}"}
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status of an extraction job"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    response = describe_job(job)
+    if job['status'] in ('queued', 'running'):
+        return JSONResponse(content=response, headers={"Retry-After": "5"})
+    return response
+
+@app.api_route("/jobs/{job_id}/result", methods=["GET", "HEAD"])
+async def get_job_result(job_id: str, request: Request):
+    """Download the audio produced by a completed job"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job['status'] == 'failed':
+        raise HTTPException(status_code=500, detail=f"Audio extraction failed: {job['error']}")
+    if job['status'] != 'completed':
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}", headers={"Retry-After": "5"})
+    
+    filename = job['result']['filename']
+    file_path = find_served_file(filename)
+    if not file_path:
+        raise HTTPException(status_code=410, detail="Job result has expired")
+    
+    file_ext = os.path.splitext(filename)[1].lower().lstrip('.')
+    return RangeFileResponse(
+        path=file_path,
+        request_headers=request.headers,
+        method=request.method,
+        media_type=AUDIO_MEDIA_TYPES.get(file_ext, 'application/octet-stream'),
+        filename=filename,
+        background=BackgroundTask(observe_since, 'file_response', time.perf_counter())
+    )
+
+@app.on_event("startup")
+async def startup_event():
+    """Start background workers"""
+    get_job_manager(run_extraction_job).start()
+    watch_disk_usage('work', EXTRACTION_WORK_ROOT)
+    watch_disk_usage('published', tempfile.gettempdir(), tuple(f".{ext}" for ext in AUDIO_MEDIA_TYPES))
+    watch_disk_usage('cache', str(get_audio_cache().cache_dir))
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    logger.info("Shutting down job workers...")
+    await shutdown_job_manager()
+    shutdown_executors()
     logger.info("Shutting down cookie manager...")
     shutdown_cookie_manager()
 
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Metadata (info dict) Cache for the Social Media Audio Extractor
+Shares resolved yt-dlp info dicts between endpoints and across restarts
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlparse, parse_qs
+
+from video_keys import get_video_key
+
+logger = logging.getLogger(__name__)
+
+class MetadataCache:
+    """TTL'd on-disk cache of yt-dlp info dicts keyed by canonical video id
+
+    Entries carry two deadlines: ``expires_at`` for the metadata itself and
+    ``formats_expire_at`` for the signed stream URLs inside it. Metadata-only
+    callers (``/extract-audio-info``) can use an entry until the first one;
+    callers that download from the cached formats need the second one too.
+
+    Entries are written once, so a file's mtime is its creation time. Stores
+    sweep the directory at most every ``SWEEP_INTERVAL`` seconds, dropping
+    expired entries and then the oldest ones until under ``max_size_bytes``,
+    so URLs that are never requested again do not pile up.
+    """
+
+    # Stop handing out stream URLs this long before the CDN says they expire
+    FORMAT_EXPIRY_MARGIN = 300
+    SWEEP_INTERVAL = 60
+
+    def __init__(self, cache_dir: str, ttl_seconds: int = 3600, default_format_ttl_seconds: int = 3600,
+                 max_size_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.default_format_ttl_seconds = default_format_ttl_seconds
+        self.max_size_bytes = max_size_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._stale_formats = 0
+        self._stores = 0
+        self._evictions = 0
+
+        logger.info(f"Metadata cache initialized at {self.cache_dir} (ttl {ttl_seconds}s)")
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _entry_path(self, url: str) -> Path:
+        platform, video_id = get_video_key(url)
+        return self.cache_dir / f"{platform}_{video_id}.json"
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    @staticmethod
+    def _url_expiry(format_url: str) -> Optional[float]:
+        """Read the expiry timestamp embedded in a signed CDN URL, if any"""
+        try:
+            query = parse_qs(urlparse(format_url).query)
+        except ValueError:
+            return None
+        # googlevideo.com uses a decimal unix timestamp, Instagram's CDN a hex one
+        if 'expire' in query:
+            try:
+                return float(query['expire'][0])
+            except ValueError:
+                return None
+        if 'oe' in query:
+            try:
+                return float(int(query['oe'][0], 16))
+            except ValueError:
+                return None
+        return None
+
+    def _formats_expire_at(self, info: Dict[str, Any], now: float) -> float:
+        format_urls: List[str] = [f.get('url') for f in info.get('formats') or [] if f.get('url')]
+        if info.get('url'):
+            format_urls.append(info['url'])
+
+        expiries = [e for e in (self._url_expiry(u) for u in format_urls) if e]
+        if expiries:
+            return min(expiries) - self.FORMAT_EXPIRY_MARGIN
+        return now + self.default_format_ttl_seconds
+
+    def get(self, url: str, require_formats: bool = False) -> Optional[Dict[str, Any]]:
+        """Return a cached info dict, or None on a miss
+
+        With ``require_formats`` the entry only counts as a hit while its
+        stream URLs are still valid.
+        """
+        if not self.enabled:
+            return None
+
+        entry_path = self._entry_path(url)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count('_misses')
+            return None
+
+        now = time.time()
+        if now > entry.get('expires_at', 0):
+            try:
+                entry_path.unlink()
+            except FileNotFoundError:
+                pass
+            self._count('_misses')
+            return None
+
+        if require_formats and now > entry.get('formats_expire_at', 0):
+            self._count('_stale_formats')
+            self._count('_misses')
+            return None
+
+        self._count('_hits')
+        return entry['info']
+
+    def put(self, url: str, info: Dict[str, Any]):
+        """Store a sanitized info dict (as returned by ``YoutubeDL.sanitize_info``)"""
+        if not self.enabled or not info:
+            return
+
+        # Cookies are re-attached from the jar at download time; never persist them
+        info = dict(info)
+        info['formats'] = [{k: v for k, v in f.items() if k != 'cookies'} for f in info.get('formats') or []]
+        info.pop('cookies', None)
+
+        now = time.time()
+        entry = {
+            'url': url,
+            'created_at': now,
+            'expires_at': now + self.ttl_seconds,
+            'formats_expire_at': self._formats_expire_at(info, now),
+            'info': info,
+        }
+
+        entry_path = self._entry_path(url)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{entry_path.stem}.", suffix='.part')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, entry_path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Failed to store metadata for {url}: {e}")
+            return
+
+        self._count('_stores')
+        with self._lock:
+            sweep_due = now >= self._next_sweep
+            if sweep_due:
+                self._next_sweep = now + self.SWEEP_INTERVAL
+        if sweep_due:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries (and stale temporary files), then the oldest until under the size cap"""
+        now = time.time()
+        entries = []
+        total_size = 0
+        evicted = 0
+
+        for path in self.cache_dir.iterdir():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    continue
+                if path.suffix == '.json':
+                    evicted += 1
+                continue
+            if path.suffix == '.json':
+                total_size += stat.st_size
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        if total_size > self.max_size_bytes:
+            for created_at, size, path in sorted(entries):
+                if total_size <= self.max_size_bytes:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total_size -= size
+                evicted += 1
+
+        if evicted:
+            self._count('_evictions', evicted)
+            logger.info(f"Metadata cache evicted {evicted} entries ({total_size} bytes remain)")
+
+    def invalidate(self, url: str):
+        """Drop the entry for a URL (e.g. after its stream URLs were rejected)"""
+        try:
+            self._entry_path(url).unlink()
+        except FileNotFoundError:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get metadata cache statistics"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "cache_dir": str(self.cache_dir),
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale_formats": self._stale_formats,
+                "stores": self._stores,
+                "evictions": self._evictions,
+                "ttl_seconds": self.ttl_seconds,
+                "max_size_mb": self.max_size_bytes // (1024 * 1024),
+            }
+
+# Global metadata cache instance
+_metadata_cache = None
+
+def get_metadata_cache() -> MetadataCache:
+    """Get or create global metadata cache instance"""
+    global _metadata_cache
+    if _metadata_cache is None:
+        cache_dir = os.getenv('METADATA_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'metadata_cache'))
+        ttl_minutes = float(os.getenv('METADATA_CACHE_TTL_MINUTES', '60'))
+        format_ttl_minutes = float(os.getenv('METADATA_CACHE_FORMAT_TTL_MINUTES', '60'))
+        max_size_mb = int(os.getenv('METADATA_CACHE_MAX_MB', '256'))
+        _metadata_cache = MetadataCache(cache_dir, int(ttl_minutes * 60), int(format_ttl_minutes * 60),
+                                        max_size_mb * 1024 * 1024)
+    return _metadata_cache
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Prometheus Metrics for the Social Media Audio Extractor
+Per-stage latency histograms, outcome counters and saturation gauges for /metrics
+"""
+
+import os
+import time
+import shutil
+import logging
+from contextlib import contextmanager
+from typing import Optional, Dict, Tuple, Iterator
+
+from prometheus_client import (
+    Counter, Histogram, CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from request_trace import record_stage
+
+logger = logging.getLogger(__name__)
+
+# Request stages span sub-second cache hits to multi-minute downloads
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    'audio_extractor_stage_seconds',
+    'Time spent in each stage of an extraction request',
+    ['stage'],  # metadata, fallback, download, postprocess, chunking, file_response, cleanup, <executor>_queue
+    buckets=STAGE_BUCKETS
+)
+STRATEGY_OUTCOMES = Counter(
+    'audio_extractor_strategy_outcomes_total',
+    'Outcomes of advanced extractor fallback strategy attempts',
+    ['platform', 'strategy', 'outcome']  # success, failure, cancelled, deadline
+)
+BOT_DETECTIONS = Counter(
+    'audio_extractor_bot_detections_total',
+    'Extractions that hit bot detection, by the cookie jar they used',
+    ['jar']
+)
+COOKIE_REFRESHES = Counter(
+    'audio_extractor_cookie_refreshes_total',
+    'Attempts to refresh the primary cookie jar from a browser',
+    ['result']  # success, failure
+)
+REJECTIONS = Counter(
+    'audio_extractor_rejections_total',
+    'Requests turned away by a rate limit or a full queue',
+    ['reason']  # client_rate_limit, executor_saturated, job_queue_full, upstream_deadline
+)
+CONVERSIONS = Counter(
+    'audio_extractor_output_conversions_total',
+    'How extracted audio reached its output format',
+    ['mode']  # remux (stream copy), transcode
+)
+
+def observe_stage(stage: str, seconds: float):
+    """Record how long one stage of a request took (also in the request's Server-Timing)"""
+    STAGE_SECONDS.labels(stage=stage).observe(seconds)
+    record_stage(stage, seconds)
+
+def observe_since(stage: str, started: float):
+    """Record a stage that began at ``started`` (a ``time.perf_counter()`` value) and ends now"""
+    observe_stage(stage, time.perf_counter() - started)
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """Time the enclosed block as ``stage`` (also when it raises)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_since(stage, started)
+
+def count_strategy_outcome(platform: str, strategy: str, outcome: str):
+    STRATEGY_OUTCOMES.labels(platform=platform, strategy=strategy, outcome=outcome).inc()
+
+def count_bot_detection(jar: Optional[str]):
+    BOT_DETECTIONS.labels(jar=os.path.basename(jar) if jar else 'none').inc()
+
+def count_cookie_refresh(success: bool):
+    COOKIE_REFRESHES.labels(result='success' if success else 'failure').inc()
+
+def count_rejection(reason: str):
+    REJECTIONS.labels(reason=reason).inc()
+
+def count_conversion(mode: str):
+    CONVERSIONS.labels(mode=mode).inc()
+
+def _directory_size(directory: str, suffixes: Optional[Tuple[str, ...]]) -> int:
+    """Total size of the files under ``directory`` (only those ending in ``suffixes`` when given)"""
+    total = 0
+    pending = [directory]
+    while pending:
+        try:
+            entries = list(os.scandir(pending.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    # Suffix-filtered areas (the shared temp dir) only count their top level
+                    if suffixes is None:
+                        pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and (suffixes is None or entry.name.endswith(suffixes)):
+                    total += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+    return total
+
+class _LiveCollector:
+    """Gauges computed at scrape time: executor saturation and temp-disk usage"""
+
+    def __init__(self):
+        self.disk_areas: Dict[str, Tuple[str, Optional[Tuple[str, ...]]]] = {}
+
+    def describe(self):
+        # Without this, registering calls collect() (and imports extraction_executor) right away
+        return []
+
+    def collect(self):
+        # Imported here so this module stays importable from the extraction workers
+        from extraction_executor import get_executor_stats
+
+        queue_depth = GaugeMetricFamily('audio_extractor_executor_queue_depth',
+                                        'Jobs waiting for an executor worker', labels=['executor'])
+        active = GaugeMetricFamily('audio_extractor_executor_active',
+                                   'Jobs currently running on an executor', labels=['executor'])
+        for name, stats in get_executor_stats().items():
+            queue_depth.add_metric([name], stats['queue_depth'])
+            active.add_metric([name], stats['active'])
+        yield queue_depth
+        yield active
+
+        disk_used = GaugeMetricFamily('audio_extractor_temp_disk_bytes',
+                                      'Bytes used by temporary and cached audio files', labels=['area'])
+        disk_free = GaugeMetricFamily('audio_extractor_temp_disk_free_bytes',
+                                      'Free bytes on the filesystem holding each area', labels=['area'])
+        for area, (directory, suffixes) in self.disk_areas.items():
+            disk_used.add_metric([area], _directory_size(directory, suffixes))
+            try:
+                disk_free.add_metric([area], shutil.disk_usage(directory).free)
+            except OSError:
+                pass
+        yield disk_used
+        yield disk_free
+
+_live_collector = _LiveCollector()
+REGISTRY.register(_live_collector)
+
+def watch_disk_usage(area: str, directory: str, suffixes: Optional[Tuple[str, ...]] = None):
+    """Report the size of ``directory`` as the ``area`` temp-disk gauge"""
+    _live_collector.disk_areas[area] = (directory, suffixes)
+
+_multiprocess_registry: Optional[CollectorRegistry] = None
+
+def _scrape_registry() -> CollectorRegistry:
+    global _multiprocess_registry
+    if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    if _multiprocess_registry is None:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_live_collector)
+        _multiprocess_registry = registry
+    return _multiprocess_registry
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus text exposition for this process (or every process, in multiprocess mode)
+
+    With ``PROMETHEUS_MULTIPROC_DIR`` set, counters and histograms from all
+    uvicorn and extraction worker processes are aggregated from that
+    directory; the gauges always describe the process serving the scrape.
+    """
+    return generate_latest(_scrape_registry()), CONTENT_TYPE_LATEST
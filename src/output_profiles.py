@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Output Profiles for the Social Media Audio Extractor
+Named ffmpeg output settings (sample rate, channels, default codec) applied in the transcode pass
+"""
+
+import logging
+from typing import List, NamedTuple, Optional
+
+from yt_dlp.postprocessor import FFmpegExtractAudioPP
+
+from format_negotiation import YTDLP_CODECS
+
+logger = logging.getLogger(__name__)
+
+class OutputProfile(NamedTuple):
+    """Output settings a profile applies on top of the requested format"""
+    default_format: str
+    default_quality: str
+    sample_rate: int
+    channels: int
+
+OUTPUT_PROFILES = {
+    # Speech-to-text models work on 16 kHz mono; Opus stays intelligible at very low bitrates
+    'speech': OutputProfile('opus', '24', 16000, 1),
+}
+
+def get_output_profile(name: str) -> OutputProfile:
+    """Look up a profile by name; raises ValueError for unknown names"""
+    try:
+        return OUTPUT_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown output profile {name!r}; available: {', '.join(OUTPUT_PROFILES)}") from None
+
+def profile_ffmpeg_args(name: Optional[str]) -> List[str]:
+    """ffmpeg output arguments for a profile (none without one)"""
+    if not name:
+        return []
+    profile = get_output_profile(name)
+    return ['-ar', str(profile.sample_rate), '-ac', str(profile.channels)]
+
+class ProfileExtractAudioPP(FFmpegExtractAudioPP):
+    """FFmpegExtractAudio that resamples and downmixes per an output profile while it encodes
+
+    Stream copy cannot change the sample rate, so the source codec is never
+    treated as matching the target and every file goes through one encode.
+    """
+
+    def __init__(self, downloader=None, preferredcodec: str = 'mp3', preferredquality: Optional[str] = None,
+                 profile: str = 'speech'):
+        super().__init__(downloader, YTDLP_CODECS.get(preferredcodec, preferredcodec), preferredquality)
+        self.profile = profile
+        self._profile_args = profile_ffmpeg_args(profile)
+
+    def get_audio_codec(self, path):
+        codec = super().get_audio_codec(path)
+        return f"{codec}+{self.profile}" if codec else codec
+
+    def run_ffmpeg(self, path, out_path, codec, more_opts):
+        super().run_ffmpeg(path, out_path, codec, [*more_opts, *self._profile_args])
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Request Tracing for the Social Media Audio Extractor
+Per-request stage timings for Server-Timing headers and opt-in profiles of the blocking work
+"""
+
+import io
+import os
+import re
+import time
+import uuid
+import pstats
+import tempfile
+import threading
+import logging
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List
+
+import anyio
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ID_RE = re.compile(r'^[0-9a-f]{16}$')
+
+_current_trace: ContextVar[Optional['RequestTrace']] = ContextVar('request_trace', default=None)
+
+class RequestTrace:
+    """Stage timings (and optionally profiler stats) collected while serving one request
+
+    Stages are recorded through ``metrics.observe_stage`` from the event
+    loop and from executor threads (which run in a copy of the request's
+    context), so additions are locked. A stage seen more than once is summed.
+    """
+
+    def __init__(self, profile: bool = False):
+        self.started = time.perf_counter()
+        self.profile = profile
+        self.stages: Dict[str, float] = {}
+        self.profile_id = None
+        self._profiles: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_profile(self, stats: Dict):
+        """Add raw ``cProfile`` stats (``Profile.stats``) of work done for this request"""
+        with self._lock:
+            self._profiles.append(stats)
+
+    def timings_ms(self) -> Dict[str, float]:
+        """Milliseconds per stage so far, plus the total time since the request arrived"""
+        with self._lock:
+            timings = {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()}
+        timings['total'] = round((time.perf_counter() - self.started) * 1000, 1)
+        return timings
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` header value"""
+        return ', '.join(f"{stage};dur={duration}" for stage, duration in self.timings_ms().items())
+
+    def take_profiles(self) -> List[Dict]:
+        with self._lock:
+            profiles, self._profiles = self._profiles, []
+        return profiles
+
+def current_trace() -> Optional[RequestTrace]:
+    """The trace of the request being served in this context, if any"""
+    return _current_trace.get()
+
+def record_stage(stage: str, seconds: float):
+    """Add a stage to the current request's trace (no-op outside a request)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+def request_timings() -> Optional[Dict[str, float]]:
+    """Stage breakdown for JSON responses, in milliseconds"""
+    trace = _current_trace.get()
+    return trace.timings_ms() if trace is not None else None
+
+class _RawStats:
+    """Adapter that lets ``pstats.Stats`` load stats that crossed a thread or process boundary"""
+
+    def __init__(self, stats: Dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+class ProfileStore:
+    """Directory of saved request profiles (``<id>.prof`` in pstats format), newest ``keep`` kept"""
+
+    def __init__(self, profile_dir: str, keep: int = 50):
+        self.profile_dir = profile_dir
+        self.keep = keep
+        os.makedirs(profile_dir, exist_ok=True)
+
+    def path(self, profile_id: str) -> Optional[str]:
+        if not PROFILE_ID_RE.match(profile_id):
+            return None
+        path = os.path.join(self.profile_dir, f"{profile_id}.prof")
+        return path if os.path.exists(path) else None
+
+    def save(self, profiles: List[Dict]) -> str:
+        """Merge raw profiler stats into one pstats file and return its id"""
+        stats = pstats.Stats(_RawStats(profiles[0]))
+        for other in profiles[1:]:
+            stats.add(_RawStats(other))
+        profile_id = uuid.uuid4().hex[:16]
+        tmp_path = os.path.join(self.profile_dir, f".{profile_id}.tmp")
+        stats.dump_stats(tmp_path)
+        os.replace(tmp_path, os.path.join(self.profile_dir, f"{profile_id}.prof"))
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        entries = self.list()
+        for entry in entries[self.keep:]:
+            try:
+                os.remove(os.path.join(self.profile_dir, f"{entry['profile_id']}.prof"))
+            except OSError:
+                pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Saved profiles, newest first"""
+        entries = []
+        try:
+            names = os.listdir(self.profile_dir)
+        except OSError:
+            return entries
+        for name in names:
+            profile_id, ext = os.path.splitext(name)
+            if ext != '.prof' or not PROFILE_ID_RE.match(profile_id):
+                continue
+            try:
+                stat_result = os.stat(os.path.join(self.profile_dir, name))
+            except OSError:
+                continue
+            entries.append({"profile_id": profile_id, "created_at": stat_result.st_mtime, "size": stat_result.st_size})
+        entries.sort(key=lambda entry: entry['created_at'], reverse=True)
+        return entries
+
+    def render_text(self, profile_id: str, limit: int = 50) -> Optional[str]:
+        """Human-readable summary of a saved profile, sorted by cumulative time"""
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+class ServerTimingMiddleware:
+    """ASGI middleware: trace each request and report it in a ``Server-Timing`` header
+
+    ``profiling`` is ``header`` (profile requests sent with ``X-Profile: 1``),
+    ``all`` or ``off``. Profiled requests run their executor work under
+    cProfile; the merged profile is saved to the profile store and its id
+    returned in ``X-Profile-Id``.
+    """
+
+    def __init__(self, app: ASGIApp, profiling: str = 'header'):
+        self.app = app
+        self.profiling = profiling.lower()
+
+    def _wants_profile(self, scope: Scope) -> bool:
+        if self.profiling == 'all':
+            return True
+        if self.profiling != 'header':
+            return False
+        for name, value in scope.get('headers', []):
+            if name == b'x-profile':
+                return value.strip().lower() in (b'1', b'true', b'yes')
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(profile=self._wants_profile(scope))
+        token = _current_trace.set(trace)
+
+        async def send_with_timing(message: Message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', trace.server_timing().encode('latin-1')))
+                profiles = trace.take_profiles() if trace.profile else []
+                if profiles:
+                    try:
+                        trace.profile_id = await anyio.to_thread.run_sync(get_profile_store().save, profiles)
+                        headers.append((b'x-profile-id', trace.profile_id.encode('latin-1')))
+                    except Exception as e:
+                        logger.error(f"Failed to save request profile: {e}")
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+
+# Global profile store instance
+_profile_store = None
+
+def get_profile_store() -> ProfileStore:
+    """Get or create global profile store instance"""
+    global _profile_store
+    if _profile_store is None:
+        _profile_store = ProfileStore(
+            os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'request_profiles')),
+            keep=int(os.getenv('PROFILE_KEEP', '50'))
+        )
+    return _profile_store
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Request Coalescing (single-flight) for the Social Media Audio Extractor
+Deduplicates concurrent identical extractions within a process and across workers on a host
+"""
+
+import os
+import time
+import fcntl
+import asyncio
+import tempfile
+import threading
+import logging
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    """One in-flight piece of work and the callers still waiting to take its result"""
+
+    def __init__(self, task: asyncio.Task, release: Optional[Callable[[Any], None]]):
+        self.task = task
+        self.release = release
+        self.callers = 0
+
+class SingleFlight:
+    """Runs one piece of work per key while followers await the leader's result
+
+    Within a process, the first caller for a key starts the work as its own
+    task and later callers await that task, so a disconnecting leader does
+    not cancel the work for its followers. Across processes (the uvicorn
+    workers), the leader also holds an exclusive ``flock`` on a per-key file
+    in ``lock_dir``. A process that has to wait for that lock calls
+    ``recheck`` once it gets it, which picks up the result the other worker
+    just produced (e.g. from the audio cache) instead of redoing the work.
+    The holder deletes the lock file before releasing it, so the directory
+    only holds files for extractions in flight. A process that locked a file
+    which was deleted in the meantime retries on the current one. Without a
+    ``recheck`` there is nothing to reuse, so no host lock is taken.
+
+    A result that must not be shared as is (a file each caller deletes when
+    done) goes through ``share``, called in every caller, and ``release``,
+    called once every caller has shared it. A follower whose own limits
+    would not have produced the leader's failure (``retry``) runs the work
+    again instead of inheriting it.
+    """
+
+    def __init__(self, lock_dir: str, poll_interval: float = 0.2, lock_timeout: float = 600):
+        self.lock_dir = lock_dir
+        self.poll_interval = poll_interval
+        self.lock_timeout = lock_timeout
+        os.makedirs(lock_dir, exist_ok=True)
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._followers = 0
+        self._cross_process_hits = 0
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def run(self, key: str, work: Callable[[], Awaitable[Any]],
+                  recheck: Optional[Callable[[], Any]] = None,
+                  retry: Optional[Callable[[BaseException], bool]] = None,
+                  share: Optional[Callable[[Any], Any]] = None,
+                  release: Optional[Callable[[Any], None]] = None) -> Any:
+        """Run ``work`` once for all concurrent callers with the same key"""
+        while True:
+            flight = self._inflight.get(key)
+            leader = flight is None or flight.task.done()
+            if leader:
+                self._count('_leaders')
+                flight = _Flight(asyncio.ensure_future(self._run_leader(key, work, recheck)), release)
+                self._inflight[key] = flight
+                flight.task.add_done_callback(lambda t, flight=flight: self._finish(key, flight))
+            else:
+                self._count('_followers')
+                logger.info(f"Coalescing request onto in-flight extraction {key}")
+
+            flight.callers += 1
+            try:
+                result = await asyncio.shield(flight.task)
+                return share(result) if share else result
+            except Exception as e:
+                if leader or retry is None or not retry(e):
+                    raise
+                logger.info(f"Extraction {key} failed for its leader ({e}), retrying within this request's limits")
+            finally:
+                flight.callers -= 1
+                self._release_if_unclaimed(flight)
+
+    def _finish(self, key: str, flight: _Flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter went away
+        if not flight.task.cancelled():
+            flight.task.exception()
+        self._release_if_unclaimed(flight)
+
+    def _release_if_unclaimed(self, flight: _Flight):
+        """Hand a finished result to ``release`` once no caller still has to share it"""
+        if flight.callers or flight.release is None or not flight.task.done():
+            return
+        release, flight.release = flight.release, None
+        if not flight.task.cancelled() and flight.task.exception() is None:
+            release(flight.task.result())
+
+    async def _run_leader(self, key: str, work: Callable[[], Awaitable[Any]],
+                          recheck: Optional[Callable[[], Any]]) -> Any:
+        if recheck is None:
+            return await work()
+        lock_fd, waited = await self._acquire_host_lock(key)
+        try:
+            if waited and recheck is not None:
+                result = recheck()
+                if result is not None:
+                    self._count('_cross_process_hits')
+                    logger.info(f"Reusing result of extraction {key} from another worker")
+                    return result
+            return await work()
+        finally:
+            if lock_fd is not None:
+                # Unlink while still holding the lock; waiters on this file notice and reopen
+                try:
+                    os.unlink(self._lock_path(key))
+                except FileNotFoundError:
+                    pass
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+                os.close(lock_fd)
+
+    def _lock_path(self, key: str) -> str:
+        return os.path.join(self.lock_dir, f"{key}.lock")
+
+    def _is_current(self, lock_fd: int, path: str) -> bool:
+        """Whether the locked file is still the one at ``path`` (not deleted by its previous holder)"""
+        try:
+            return os.fstat(lock_fd).st_ino == os.stat(path).st_ino
+        except FileNotFoundError:
+            return False
+
+    async def _acquire_host_lock(self, key: str) -> tuple[Optional[int], bool]:
+        """Take the per-key host-wide lock without blocking the event loop"""
+        path = self._lock_path(key)
+        try:
+            lock_fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            logger.warning(f"Cannot open single-flight lock for {key}, continuing without it: {e}")
+            return None, False
+
+        waited = False
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                if self._is_current(lock_fd, path):
+                    return lock_fd, waited
+                # The previous holder finished and deleted this file; queue on the current one
+                os.close(lock_fd)
+                waited = True
+                try:
+                    lock_fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+                except OSError as e:
+                    logger.warning(f"Cannot open single-flight lock for {key}, continuing without it: {e}")
+                    return None, True
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    logger.warning(f"Timed out waiting for another worker on {key}, continuing without lock")
+                    os.close(lock_fd)
+                    return None, True
+                waited = True
+                await asyncio.sleep(self.poll_interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request coalescing statistics"""
+        with self._lock:
+            return {
+                "in_flight": len(self._inflight),
+                "leaders": self._leaders,
+                "followers": self._followers,
+                "cross_process_hits": self._cross_process_hits,
+            }
+
+# Global single-flight instance
+_single_flight = None
+
+def get_single_flight() -> SingleFlight:
+    """Get or create global single-flight instance"""
+    global _single_flight
+    if _single_flight is None:
+        lock_dir = os.getenv('SINGLE_FLIGHT_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'audio_locks'))
+        _single_flight = SingleFlight(lock_dir)
+    return _single_flight
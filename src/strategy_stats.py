@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Strategy Statistics for the Social Media Audio Extractor
+Learns which fallback extraction strategies currently work, per platform, and orders them accordingly
+"""
+
+import os
+import json
+import time
+import fcntl
+import random
+import tempfile
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, List, Iterator
+
+logger = logging.getLogger(__name__)
+
+class StrategyStats:
+    """Rolling success/latency statistics per (platform, strategy) with a bandit ordering policy
+
+    Successes and failures are exponentially decayed counts, so roughly the
+    last ``1 / (1 - decay)`` attempts matter. ``order`` Thompson-samples a
+    success probability for every strategy from its Beta posterior and sorts
+    by that probability discounted by the strategy's typical latency, so
+    strategies that are currently working and fast go first while the others
+    still get explored now and then. Strategies without any attempts yet go
+    ahead of all of those, in their default order. Strategies whose decayed
+    success rate has dropped below ``skip_below`` are left out entirely
+    except for an occasional exploration attempt.
+
+    The table is shared through ``state_path`` by every process on the
+    host: each update re-reads the file, applies the outcome and writes it
+    back under an exclusive ``flock`` on ``<state_path>.lock``, and
+    ``order`` reloads the file when another process has changed it. A
+    restart keeps what was learned.
+    """
+
+    def __init__(self, state_path: str, decay: float = 0.95, latency_scale: float = 10.0,
+                 skip_below: float = 0.05, min_attempts: int = 5, explore_rate: float = 0.1):
+        self.state_path = state_path
+        self.decay = decay
+        self.latency_scale = latency_scale
+        self.skip_below = skip_below
+        self.min_attempts = min_attempts
+        self.explore_rate = explore_rate
+        self._lock = threading.Lock()
+        self._mtime_ns = None
+        self._stats: Dict[str, Dict[str, Dict[str, Any]]] = self._load()
+
+        logger.info(f"Strategy stats initialized at {state_path}")
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self._mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable strategy stats {self.state_path}: {e}")
+            return {}
+
+    def _save(self):
+        directory = os.path.dirname(self.state_path) or '.'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.strategy_stats.', suffix='.part')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._stats, f)
+            os.replace(tmp_path, self.state_path)
+            self._mtime_ns = os.stat(self.state_path).st_mtime_ns
+        except OSError as e:
+            logger.warning(f"Failed to save strategy stats: {e}")
+
+    @contextmanager
+    def _host_lock(self) -> Iterator[None]:
+        """Exclusive lock on the shared table across processes (best effort)"""
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+            lock_fd = os.open(f"{self.state_path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            logger.warning(f"Cannot lock strategy stats, updating without the lock: {e}")
+            yield
+            return
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+
+    def _refresh(self):
+        """Reload the table if another process saved it since we last read it"""
+        try:
+            mtime_ns = os.stat(self.state_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime_ns != self._mtime_ns:
+            self._stats = self._load()
+
+    def _entry(self, platform: str, strategy: str) -> Dict[str, Any]:
+        return self._stats.setdefault(platform, {}).setdefault(strategy, {
+            'successes': 0.0,
+            'failures': 0.0,
+            'attempts': 0,
+            'avg_latency': None,
+            'last_success_at': None,
+            'last_failure_at': None,
+        })
+
+    def record(self, platform: str, strategy: str, success: bool, latency: float):
+        """Record the outcome of one attempt"""
+        with self._lock, self._host_lock():
+            # Apply the outcome to the latest shared table so other processes' updates are kept
+            self._stats = self._load()
+            entry = self._entry(platform, strategy)
+            entry['successes'] = entry['successes'] * self.decay + (1.0 if success else 0.0)
+            entry['failures'] = entry['failures'] * self.decay + (0.0 if success else 1.0)
+            entry['attempts'] += 1
+            if success:
+                previous = entry['avg_latency']
+                entry['avg_latency'] = latency if previous is None else 0.8 * previous + 0.2 * latency
+                entry['last_success_at'] = time.time()
+            else:
+                entry['last_failure_at'] = time.time()
+            self._save()
+
+    def _success_rate(self, entry: Dict[str, Any]) -> float:
+        return (entry['successes'] + 1) / (entry['successes'] + entry['failures'] + 2)
+
+    def order(self, platform: str, strategies: List[str]) -> List[str]:
+        """Return the strategies to attempt for ``platform``, best first"""
+        with self._lock:
+            self._refresh()
+            known = self._stats.get(platform, {})
+            untried = []
+            scored = []
+            skipped = []
+            for index, name in enumerate(strategies):
+                entry = known.get(name)
+                if entry is None:
+                    # Nothing to sample yet; try it before the others, in the tuned default order
+                    untried.append(name)
+                    continue
+
+                if (entry['attempts'] >= self.min_attempts and self._success_rate(entry) < self.skip_below
+                        and random.random() >= self.explore_rate):
+                    skipped.append(name)
+                    continue
+
+                sampled = random.betavariate(entry['successes'] + 1, entry['failures'] + 1)
+                latency = entry['avg_latency'] or 0.0
+                scored.append((sampled / (1 + latency / self.latency_scale), -index, name))
+
+        if not scored and not untried:
+            # Everything looks broken; try them all in the default order rather than nothing
+            return list(strategies)
+        scored.sort(reverse=True)
+        return untried + [name for _, _, name in scored]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-platform strategy statistics"""
+        with self._lock:
+            return {
+                platform: {
+                    name: {
+                        "attempts": entry['attempts'],
+                        "success_rate": round(self._success_rate(entry), 3),
+                        "avg_latency_seconds": round(entry['avg_latency'], 2) if entry['avg_latency'] is not None else None,
+                        "last_success_at": entry['last_success_at'],
+                        "last_failure_at": entry['last_failure_at'],
+                    }
+                    for name, entry in strategies.items()
+                }
+                for platform, strategies in self._stats.items()
+            }
+
+# Global strategy stats instance
+_strategy_stats = None
+
+def get_strategy_stats() -> StrategyStats:
+    """Get or create global strategy stats instance"""
+    global _strategy_stats
+    if _strategy_stats is None:
+        state_path = os.getenv('STRATEGY_STATS_PATH', os.path.join(tempfile.gettempdir(), 'strategy_stats.json'))
+        _strategy_stats = StrategyStats(
+            state_path,
+            decay=float(os.getenv('STRATEGY_STATS_DECAY', '0.95')),
+            skip_below=float(os.getenv('STRATEGY_SKIP_BELOW', '0.05')),
+            explore_rate=float(os.getenv('STRATEGY_EXPLORE_RATE', '0.1'))
+        )
+    return _strategy_stats
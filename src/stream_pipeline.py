@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Streaming Audio Pipeline for the Social Media Audio Extractor
+Feeds the upstream download straight into ffmpeg and streams ffmpeg's output to the client
+"""
+
+import re
+import asyncio
+import tempfile
+import threading
+import subprocess
+import logging
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+
+import yt_dlp
+from yt_dlp.networking import Request
+
+from upstream_pacer import PacedYoutubeDL
+from extraction_executor import get_stream_io_executor
+from output_profiles import profile_ffmpeg_args
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Per output format: (ffmpeg codec arguments, pipe-friendly muxer)
+STREAM_ENCODERS = {
+    'mp3': (['-c:a', 'libmp3lame'], 'mp3'),
+    'm4a': (['-c:a', 'aac', '-movflags', 'frag_keyframe+empty_moov'], 'ipod'),
+    'aac': (['-c:a', 'aac'], 'adts'),
+    'opus': (['-c:a', 'libopus'], 'ogg'),
+    'ogg': (['-c:a', 'libvorbis'], 'ogg'),
+    'wav': (['-c:a', 'pcm_s16le'], 'wav'),
+    'flac': (['-c:a', 'flac'], 'flac'),
+}
+
+# Lines ffmpeg's -progress report writes to stderr; at -loglevel error anything else is an error
+PROGRESS_LINE_RE = re.compile(r'^\w+=')
+
+def select_stream_format(info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Pick the format to stream from a resolved info dict
+
+    Prefers the format yt-dlp already selected, then the highest bitrate
+    audio-only format, then anything with audio.
+    """
+    if info.get('url'):
+        return info
+
+    formats = info.get('formats') or []
+    audio_only = [f for f in formats if f.get('url') and f.get('acodec') != 'none' and f.get('vcodec') == 'none']
+    if audio_only:
+        return max(audio_only, key=lambda f: f.get('abr') or 0)
+
+    with_audio = [f for f in formats if f.get('url') and f.get('acodec') != 'none']
+    return with_audio[-1] if with_audio else None
+
+def build_ffmpeg_command(output_format: str, quality: str, profile: Optional[str] = None) -> List[str]:
+    """ffmpeg command that reads the source on stdin and writes encoded audio to stdout
+
+    ``-xerror`` makes demuxing errors fail the process (ffmpeg otherwise
+    exits 0 with a header-only output when it cannot read the input), and
+    ``-progress`` reports how much audio was encoded.
+    """
+    if output_format not in STREAM_ENCODERS:
+        raise ValueError(f"Streaming is not supported for format: {output_format}")
+
+    codec_args, muxer = STREAM_ENCODERS[output_format]
+    cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-xerror', '-progress', 'pipe:2',
+           '-i', 'pipe:0', '-vn', *codec_args]
+    if output_format not in ('wav', 'flac'):
+        cmd += ['-b:a', f"{quality}k"]
+    cmd += profile_ffmpeg_args(profile)
+    cmd += ['-f', muxer, 'pipe:1']
+    return cmd
+
+class AudioStreamPipeline:
+    """Upstream download -> ffmpeg stdin, ffmpeg stdout -> async chunk iterator
+
+    A feeder thread pulls the source through yt-dlp's networking stack
+    (cookies, proxy and headers included), in ranged chunks when the
+    extractor asks for them, and writes into ffmpeg's stdin. Only one chunk
+    is held in memory at a time. Callers bound how many pipelines run at
+    once by holding a download executor slot for each.
+    """
+
+    def __init__(self, ydl_opts: Dict[str, Any], stream_format: Dict[str, Any], output_format: str,
+                 quality: str, chunk_size: int = CHUNK_SIZE, profile: Optional[str] = None):
+        self.ydl_opts = ydl_opts
+        self.stream_format = stream_format
+        self.output_format = output_format
+        self.quality = quality
+        self.chunk_size = chunk_size
+        self.profile = profile
+        self.completed = False
+        self._process: Optional[subprocess.Popen] = None
+        self._stderr = None
+        self._feeder: Optional[threading.Thread] = None
+        self._feeder_error: Optional[Exception] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        # stderr goes to a file: an unread pipe would fill up and stall ffmpeg
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            build_ffmpeg_command(self.output_format, self.quality, self.profile),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=self._stderr,
+        )
+        self._feeder = threading.Thread(target=self._feed, daemon=True)
+        self._feeder.start()
+
+    def _open_ranges(self, ydl: yt_dlp.YoutubeDL):
+        """Yield upstream data in chunk_size reads, using ranged requests if needed"""
+        url = self.stream_format['url']
+        headers = dict(self.stream_format.get('http_headers') or {})
+        range_size = (self.stream_format.get('downloader_options') or {}).get('http_chunk_size')
+
+        if not range_size:
+            with ydl.urlopen(Request(url, headers=headers)) as response:
+                while not self._stop.is_set():
+                    data = response.read(self.chunk_size)
+                    if not data:
+                        return
+                    yield data
+            return
+
+        # Some CDNs (googlevideo) throttle long unranged reads; fetch in ranges like yt-dlp does
+        start = 0
+        while not self._stop.is_set():
+            end = start + range_size - 1
+            received = 0
+            with ydl.urlopen(Request(url, headers={**headers, 'Range': f'bytes={start}-{end}'})) as response:
+                # A plain 200 means the server ignored the range and sent the whole file
+                ranged = response.status == 206
+                while not self._stop.is_set():
+                    data = response.read(self.chunk_size)
+                    if not data:
+                        break
+                    received += len(data)
+                    yield data
+            if not ranged or received < range_size:
+                return
+            start = end + 1
+
+    def _feed(self):
+        try:
+            with PacedYoutubeDL(self.ydl_opts) as ydl, ydl.download_in_progress():
+                for data in self._open_ranges(ydl):
+                    self._process.stdin.write(data)
+        except (BrokenPipeError, ValueError):
+            # ffmpeg exited or the pipeline was closed under us
+            pass
+        except Exception as e:
+            self._feeder_error = e
+            logger.error(f"Streaming download failed: {e}")
+        finally:
+            try:
+                self._process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+    async def read_chunk(self) -> bytes:
+        """Read the next encoded chunk (empty bytes at end of stream)"""
+        loop = asyncio.get_event_loop()
+        io_executor = get_stream_io_executor()
+        data = await loop.run_in_executor(io_executor, self._process.stdout.read1, self.chunk_size)
+        if data:
+            return data
+
+        returncode = await loop.run_in_executor(io_executor, self._process.wait)
+        if self._feeder_error:
+            raise RuntimeError(f"Upstream download failed: {self._feeder_error}")
+        errors, encoded_us = await loop.run_in_executor(io_executor, self._read_stderr)
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with code {returncode}: {errors[-500:]}")
+        if errors:
+            raise RuntimeError(f"ffmpeg reported errors: {errors[-500:]}")
+        if not encoded_us:
+            raise RuntimeError("ffmpeg produced no audio")
+        self.completed = True
+        return b''
+
+    def _read_stderr(self) -> Tuple[str, int]:
+        """Error lines and microseconds of audio encoded, from ffmpeg's stderr"""
+        self._stderr.seek(0)
+        errors = []
+        encoded_us = 0
+        for line in self._stderr.read().decode('utf-8', 'replace').splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if not PROGRESS_LINE_RE.match(line):
+                errors.append(line)
+            elif line.startswith('out_time_us=') and line[12:].isdigit():
+                encoded_us = int(line[12:])
+        return '\n'.join(errors), encoded_us
+
+    async def iter_chunks(self, first_chunk: bytes = b'') -> AsyncIterator[bytes]:
+        """Yield encoded chunks until ffmpeg finishes"""
+        try:
+            chunk = first_chunk or await self.read_chunk()
+            while chunk:
+                yield chunk
+                chunk = await self.read_chunk()
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the feeder and ffmpeg (safe to call more than once)"""
+        self._stop.set()
+        if self._process and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        if self._stderr is not None:
+            self._stderr.close()
+            self._stderr = None
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Upstream Pacer for the Social Media Audio Extractor
+Host-wide token buckets per upstream host, replacing per-request random sleeps
+"""
+
+import os
+import time
+import fcntl
+import functools
+import ipaddress
+import struct
+import tempfile
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterator, Tuple
+from urllib.parse import urlparse
+
+import yt_dlp
+from yt_dlp.cookies import YoutubeDLCookieJar
+from yt_dlp.networking import Request
+
+from metrics import count_rejection
+
+logger = logging.getLogger(__name__)
+
+_BUCKET_STATE = struct.Struct('dd')  # tokens, updated_at
+
+class DeadlineExceeded(Exception):
+    """Raised when an upstream request would start after the request's latency deadline"""
+
+def host_key(url: str) -> str:
+    """Bucket key for a URL: the last two labels of its host (all CDN edges share one bucket), or its IP"""
+    host = (urlparse(url).hostname or '').rstrip('.')
+    try:
+        return str(ipaddress.ip_address(host))
+    except ValueError:
+        return '.'.join(host.split('.')[-2:]) or 'unknown'
+
+class UpstreamPacer:
+    """Token bucket per upstream host, shared by every process on the host
+
+    Each bucket holds up to ``burst`` tokens and refills at ``rate`` tokens
+    per second. A request takes one token; while tokens are available it
+    goes out immediately, otherwise it sleeps until its token is due. The
+    bucket state lives in ``<state_dir>/<host>.bucket`` and is updated under
+    ``flock`` so all uvicorn and extraction worker processes draw from the
+    same budget. Without a ``state_dir`` the buckets are process-wide.
+    """
+
+    def __init__(self, state_dir: Optional[str], limits: Dict[str, Tuple[float, float]],
+                 default_limit: Tuple[float, float]):
+        self.state_dir = state_dir
+        self.limits = limits
+        self.default_limit = default_limit
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._fds: Dict[str, int] = {}
+        self._memory: Dict[str, Tuple[float, float]] = {}
+        self._requests: Dict[str, int] = {}
+        self._delayed: Dict[str, int] = {}
+        self._waited: Dict[str, float] = {}
+        self._deadline_rejections = 0
+
+        logger.info(f"Upstream pacer initialized ({'host-wide at ' + state_dir if state_dir else 'process-wide'})")
+
+    def _host_lock(self, host: str) -> threading.Lock:
+        with self._lock:
+            if host not in self._host_locks:
+                self._host_locks[host] = threading.Lock()
+            return self._host_locks[host]
+
+    def _read_state(self, host: str) -> Optional[Tuple[float, float]]:
+        if not self.state_dir:
+            return self._memory.get(host)
+        fd = self._fds.get(host)
+        if fd is None:
+            fd = self._fds[host] = os.open(os.path.join(self.state_dir, f"{host}.bucket"), os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        data = os.pread(fd, _BUCKET_STATE.size, 0)
+        return _BUCKET_STATE.unpack(data) if len(data) == _BUCKET_STATE.size else None
+
+    def _write_state(self, host: str, tokens: float, updated_at: float):
+        if not self.state_dir:
+            self._memory[host] = (tokens, updated_at)
+        else:
+            os.pwrite(self._fds[host], _BUCKET_STATE.pack(tokens, updated_at), 0)
+
+    def _release(self, host: str):
+        if self.state_dir and host in self._fds:
+            fcntl.flock(self._fds[host], fcntl.LOCK_UN)
+
+    def reserve(self, url: str, deadline: Optional[float] = None) -> float:
+        """Take a token for ``url``'s host and return how long to wait before sending
+
+        Raises DeadlineExceeded (without taking the token) when the wait
+        would end after ``deadline`` (a ``time.time()`` timestamp).
+        """
+        host = host_key(url)
+        rate, burst = self.limits.get(host, self.default_limit)
+        if rate <= 0:
+            return 0.0
+
+        with self._host_lock(host):
+            try:
+                state = self._read_state(host)
+                now = time.time()
+                tokens, updated_at = state if state else (burst, now)
+                tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+                wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+                if deadline is not None and now + wait > deadline:
+                    with self._lock:
+                        self._deadline_rejections += 1
+                    count_rejection('upstream_deadline')
+                    raise DeadlineExceeded(f"Upstream deadline exceeded before contacting {host}")
+                self._write_state(host, tokens - 1, now)
+            finally:
+                self._release(host)
+
+        with self._lock:
+            self._requests[host] = self._requests.get(host, 0) + 1
+            if wait > 0:
+                self._delayed[host] = self._delayed.get(host, 0) + 1
+                self._waited[host] = self._waited.get(host, 0.0) + wait
+        return wait
+
+    def acquire(self, url: str, deadline: Optional[float] = None):
+        """Block until a request to ``url`` may be sent"""
+        wait = self.reserve(url, deadline)
+        if wait > 0:
+            time.sleep(wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-host pacing statistics for this process"""
+        with self._lock:
+            return {
+                "host_wide": bool(self.state_dir),
+                "deadline_rejections": self._deadline_rejections,
+                "hosts": {
+                    host: {
+                        "rate_per_second": self.limits.get(host, self.default_limit)[0],
+                        "burst": self.limits.get(host, self.default_limit)[1],
+                        "requests": count,
+                        "delayed": self._delayed.get(host, 0),
+                        "total_wait_seconds": round(self._waited.get(host, 0.0), 2),
+                    }
+                    for host, count in self._requests.items()
+                },
+            }
+
+class PacedYoutubeDL(yt_dlp.YoutubeDL):
+    """YoutubeDL whose HTTP requests go through the upstream pacer
+
+    Every request yt-dlp makes (extractor API calls and media downloads
+    alike) goes through ``urlopen``. An optional ``deadline`` param (a
+    ``time.time()`` timestamp) stops extractor requests and new downloads
+    once the caller's latency budget is spent. Requests of a download that
+    started in time (``download_in_progress``, entered by ``dl``) are not
+    cut off, so a chunked download is never aborted halfway; its retries
+    stop in the deadline-aware retry backoff instead. The current
+    ``socket_timeout`` param is applied to each request, since the request
+    handlers keep the one the instance was built with (warm instances are
+    reused with other budgets).
+
+    An optional ``cookie_jar`` param (a parsed jar from the cookie manager)
+    replaces reading ``cookiefile``: the instance starts from a copy of it,
+    and never writes its cookies back to the file.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._downloads_in_progress = 0
+        super().__init__(*args, **kwargs)
+
+    def check_deadline(self):
+        deadline = self.params.get('deadline')
+        if deadline is not None and time.time() >= deadline:
+            raise DeadlineExceeded("Upstream deadline exceeded")
+
+    @contextmanager
+    def download_in_progress(self) -> Iterator[None]:
+        """Start a download if the deadline allows, and let its requests run past it"""
+        self.check_deadline()
+        self._downloads_in_progress += 1
+        try:
+            yield
+        finally:
+            self._downloads_in_progress -= 1
+
+    def dl(self, name, info, subtitle=False, test=False):
+        with self.download_in_progress():
+            return super().dl(name, info, subtitle=subtitle, test=test)
+
+    @functools.cached_property
+    def cookiejar(self):
+        shared = self.params.get('cookie_jar')
+        if shared is None:
+            return super().cookiejar
+        # The shared jar is never mutated, so copying its Cookie objects is safe
+        cookies = YoutubeDLCookieJar()
+        for cookie in shared:
+            cookies.set_cookie(cookie)
+        return cookies
+
+    def save_cookies(self):
+        if self.params.get('cookie_jar') is None:
+            super().save_cookies()
+
+    def urlopen(self, req):
+        url = req if isinstance(req, str) else getattr(req, 'url', None) or req.get_full_url()
+        deadline = self.params.get('deadline')
+        if self._downloads_in_progress:
+            deadline = None
+        elif deadline is not None and time.time() >= deadline:
+            raise DeadlineExceeded("Upstream deadline exceeded")
+        get_upstream_pacer().acquire(url, deadline)
+        if isinstance(req, str):
+            req = Request(req)
+        timeout = self.params.get('socket_timeout')
+        if isinstance(req, Request) and timeout and 'timeout' not in req.extensions:
+            req.extensions['timeout'] = timeout
+        return super().urlopen(req)
+
+def _parse_rate(spec: str) -> Tuple[float, float]:
+    """Parse "rate:burst" (or just "rate", burst = 2x rate)"""
+    rate, _, burst = spec.partition(':')
+    return float(rate), float(burst) if burst else 2 * float(rate)
+
+def _parse_rate_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """Parse "youtube.com=5:10,instagram.com=2:4" into {host: (rate, burst)}"""
+    limits = {}
+    for item in spec.split(','):
+        if '=' in item:
+            host, rate = item.split('=', 1)
+            try:
+                limits[host.strip().lower()] = _parse_rate(rate.strip())
+            except ValueError:
+                logger.warning(f"Ignoring invalid upstream rate limit: {item}")
+    return limits
+
+# Global pacer instance
+_upstream_pacer = None
+
+def get_upstream_pacer() -> UpstreamPacer:
+    """Get or create global upstream pacer instance"""
+    global _upstream_pacer
+    if _upstream_pacer is None:
+        state_dir = os.getenv('UPSTREAM_PACER_DIR', os.path.join(tempfile.gettempdir(), 'upstream_pacer'))
+        limits = _parse_rate_limits(os.getenv('UPSTREAM_RATE_LIMITS', 'youtube.com=5:10,instagram.com=2:5'))
+        default_limit = _parse_rate(os.getenv('UPSTREAM_DEFAULT_RATE', '20:40'))
+        _upstream_pacer = UpstreamPacer(state_dir or None, limits, default_limit)
+    return _upstream_pacer
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Video key helpers for the Social Media Audio Extractor
+Maps supported social media URLs to a canonical (platform, video id) pair
+"""
+
+import hashlib
+import re
+from typing import Tuple
+from urllib.parse import urlparse, parse_qs
+
+# Ordered (platform, pattern) pairs; the first group of each pattern is the video id
+_VIDEO_ID_PATTERNS = [
+    ('youtube', re.compile(r'(?:www\.|m\.)?youtube\.com/shorts/([A-Za-z0-9_-]{6,})', re.IGNORECASE)),
+    ('youtube', re.compile(r'youtu\.be/([A-Za-z0-9_-]{6,})', re.IGNORECASE)),
+    ('youtube', re.compile(r'(?:www\.|m\.)?youtube\.com/embed/([A-Za-z0-9_-]{6,})', re.IGNORECASE)),
+    ('instagram', re.compile(r'instagram\.com/(?:reel|reels|p|tv)/([A-Za-z0-9_-]+)', re.IGNORECASE)),
+]
+
+def is_youtube_url(url: str) -> bool:
+    """Whether a URL points at YouTube (youtube.com or youtu.be)"""
+    host = urlparse(url).netloc.lower().split(':')[0]
+    return host == 'youtu.be' or host == 'youtube.com' or host.endswith('.youtube.com')
+
+def get_video_key(url: str) -> Tuple[str, str]:
+    """Return the canonical (platform, video_id) for a URL
+
+    Different spellings of the same video (``youtu.be`` vs ``/shorts/``,
+    tracking query parameters, trailing slashes) map to the same key.
+    Unknown URLs fall back to a hash of the normalized URL.
+    """
+    for platform, pattern in _VIDEO_ID_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return platform, match.group(1)
+
+    parsed = urlparse(url)
+    if parsed.netloc.lower().endswith('youtube.com'):
+        video_id = parse_qs(parsed.query).get('v', [None])[0]
+        if video_id:
+            return 'youtube', video_id
+
+    normalized = f"{parsed.netloc.lower()}{parsed.path.rstrip('/')}"
+    return 'generic', hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+yt-dlp Options for the Social Media Audio Extractor
+Shared by the API process and the extraction worker processes
+"""
+
+import os
+import time
+import random
+import tempfile
+import logging
+from typing import Callable, Optional, Tuple
+
+from yt_dlp.utils import download_range_func
+
+from cookie_manager import get_cookie_manager, CookieLease
+from format_negotiation import is_negotiated, format_selector
+from upstream_pacer import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+def deadline_backoff(low: float, high: float, deadline: Optional[float]) -> Callable[[int], float]:
+    """Jittered linear retry backoff that never sleeps past ``deadline`` and refuses retries after it"""
+    def sleep_for(n: int) -> float:
+        # yt-dlp calls this before every retry, with the number of retries so far as ``n``
+        delay = random.uniform(low, high) * n
+        if deadline is not None:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise DeadlineExceeded("Upstream deadline exceeded, not retrying")
+            delay = min(delay, remaining)
+        return delay
+    return sleep_for
+
+def apply_deadline(opts: dict, deadline: Optional[float]) -> dict:
+    """Bound retries, retry backoff and socket timeouts by a ``time.time()`` deadline
+
+    The deadline itself is carried in ``opts['deadline']``, where
+    ``PacedYoutubeDL`` refuses to start extractor requests and downloads
+    once it has passed; retries of any kind stop in the backoff. A download
+    that started in time is allowed to finish.
+    """
+    opts['deadline'] = deadline
+    opts['retry_sleep_functions'] = {
+        'extractor': deadline_backoff(1, 3, deadline),
+        'http': deadline_backoff(1, 3, deadline),
+        'fragment': deadline_backoff(1, 2, deadline),
+        'file_access': deadline_backoff(0.5, 1.5, deadline),
+    }
+    if deadline is not None:
+        opts['socket_timeout'] = max(1.0, min(60.0, deadline - time.time()))
+    return opts
+
+def with_cookie_lease(opts: dict, cookie_lease: CookieLease) -> dict:
+    """Copy of ``opts`` that uses the leased cookie jar (or none)"""
+    opts = {key: value for key, value in opts.items() if key not in ('cookiefile', 'cookie_jar')}
+    if cookie_lease.path:
+        opts['cookiefile'] = cookie_lease.path
+        opts['cookie_jar'] = cookie_lease.cookies
+    return opts
+
+# yt-dlp configuration
+def get_ydl_opts(output_format: str = "mp3", quality: str = "192", cookies_path: str = None,
+                 output_dir: str = None, deadline: Optional[float] = None,
+                 cookie_lease: Optional[CookieLease] = None, profile: Optional[str] = None,
+                 time_range: Optional[Tuple[float, Optional[float]]] = None) -> dict:
+    """Configure yt-dlp options for audio extraction with enhanced anti-bot protection
+
+    Upstream request rates are governed by the shared upstream pacer rather
+    than per-request sleeps. ``deadline`` (a ``time.time()`` timestamp)
+    limits how long retries may keep going. Cookies come from
+    ``cookie_lease`` when given (see ``CookieManager.lease``), otherwise
+    from ``cookies_path`` or the currently healthiest jar. Managed jars are
+    passed pre-parsed as ``cookie_jar`` (see ``PacedYoutubeDL``).
+    A negotiated ``output_format`` ("auto" or "m4a,opus,...") selects a
+    stream in an accepted codec and leaves post-processing to
+    ``NegotiatedExtractAudioPP``; an output ``profile`` likewise leaves it
+    to ``ProfileExtractAudioPP``. The caller adds those to its instance.
+    A ``time_range`` of (start, end) seconds (end None: to the end) makes
+    yt-dlp hand the download to ffmpeg, which seeks the input so only that
+    section is fetched.
+    """
+    temp_dir = output_dir or tempfile.gettempdir()
+    
+    # Randomize user agents to avoid detection
+    user_agents = [
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0',
+    ]
+    
+    opts = {
+        'format': 'bestaudio/best',
+        'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
+        'postprocessors': [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': output_format,
+            'preferredquality': quality,
+        }],
+        'extractaudio': True,
+        'audioformat': output_format,
+        'audioquality': quality,
+        'no_warnings': True,
+        'quiet': True,
+        'no_playlist': True,
+        'writeinfojson': False,
+        'writethumbnail': False,
+        
+        # Enhanced anti-bot protection measures
+        'user_agent': random.choice(user_agents),
+        'referer': 'https://www.youtube.com/',
+        'origin': 'https://www.youtube.com',
+        
+        # Add more realistic browser headers
+        'http_headers': {
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'DNT': '1',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+            'Sec-Fetch-Dest': 'document',
+            'Sec-Fetch-Mode': 'navigate',
+            'Sec-Fetch-Site': 'none',
+            'Sec-Fetch-User': '?1',
+            'Cache-Control': 'max-age=0',
+        },
+        
+        # YouTube specific optimizations
+        'extractor_args': {
+            'youtube': {
+                'skip': ['dash', 'hls'],  # Skip complex formats
+                'player_skip': ['configs'],  # Skip some player configs that might trigger bot detection
+                'player_client': ['android', 'web'],  # Try multiple clients
+                'comment_sort': ['top'],  # Don't load all comments
+                'max_comments': [0],  # Don't load comments at all
+                'include_live_chat': False,
+            }
+        },
+        
+        # Additional anti-detection measures
+        'socket_timeout': 60,
+        'retries': 3,
+        'fragment_retries': 3,
+        'file_access_retries': 3,
+    }
+    if is_negotiated(output_format):
+        opts['format'] = format_selector(output_format)
+        opts['postprocessors'] = []
+    elif profile:
+        opts['postprocessors'] = []
+    if time_range:
+        start, end = time_range
+        opts['download_ranges'] = download_range_func(None, [(start, float('inf') if end is None else end)])
+    apply_deadline(opts, deadline)
+    
+    # Use dynamic cookie manager for automatic cookie handling (reads a snapshot, never blocks)
+    if cookies_path:
+        cookies_to_use, cookie_jar = cookies_path, None
+    elif cookie_lease is not None:
+        cookies_to_use, cookie_jar = cookie_lease.path, cookie_lease.cookies
+    else:
+        jar = get_cookie_manager().get_jar()
+        cookies_to_use, cookie_jar = (jar.path, jar.cookies) if jar else (None, None)
+    
+    if cookies_to_use:
+        opts['cookiefile'] = cookies_to_use
+        if cookie_jar is not None:
+            opts['cookie_jar'] = cookie_jar
+        logger.info(f"Using dynamic cookies from: {cookies_to_use}")
+    else:
+        logger.warning("No cookies available - may encounter bot detection on some videos")
+        logger.info("Tip: The cookie manager will try to auto-refresh cookies when needed")
+    
+    return opts
@@ -0,0 +1,74 @@
+"""Admission control of the bounded extraction executors"""
+
+import os
+import sys
+import asyncio
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from extraction_executor import BoundedExecutor, ExecutorSaturated
+
+def test_zero_queue_admits_up_to_max_workers():
+    executor = BoundedExecutor('test', 2, 0)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.1)
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+        # Idle again: a call is admitted even though nothing may queue
+        assert await executor.run(lambda: 'done') == 'done'
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+    assert executor.get_stats()['rejected'] == 1
+
+def test_queue_admits_max_workers_plus_depth():
+    executor = BoundedExecutor('test', 1, 1)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.1)
+        assert executor.get_stats()['queue_depth'] == 1
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(release.wait)
+        # Callers that opt out of shedding still queue
+        waiting = asyncio.ensure_future(executor.run(release.wait, shed=False))
+        release.set()
+        await asyncio.gather(*running, waiting)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+
+def test_reservations_share_the_worker_limit():
+    executor = BoundedExecutor('test', 1, 0)
+
+    async def scenario():
+        async with executor.reserve():
+            assert executor.get_stats()['active'] == 1
+            with pytest.raises(ExecutorSaturated):
+                await executor.run(lambda: None)
+            with pytest.raises(ExecutorSaturated):
+                async with executor.reserve():
+                    pass
+        assert await executor.run(lambda: 'done') == 'done'
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    stats = executor.get_stats()
+    assert (stats['completed'], stats['rejected']) == (2, 2)